@@ -1,28 +1,93 @@
+import os
 from pathlib import Path
 from sqlmodel import SQLModel
 from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
+from .migraciones import aplicar_migraciones, asegurar_vacuum_incremental
+
 # Carpeta del paquete backend (donde vive este db.py)
 BASE_DIR = Path(__file__).resolve().parent
-DB_PATH = BASE_DIR / "app.db"
+
+# ─────────────────────────────────────────────────────────────
+# Configuración (variables de entorno)
+# ─────────────────────────────────────────────────────────────
+DB_PATH = Path(os.environ.get("SAPAL_DB_PATH", BASE_DIR / "app.db")).resolve()
+POOL_LECTURA = int(os.environ.get("SAPAL_DB_POOL_LECTURA", "8"))          # conexiones de sólo lectura
+ESPERA_POOL_SEGUNDOS = float(os.environ.get("SAPAL_DB_ESPERA_POOL_S", "30"))
+BUSY_TIMEOUT_MS = int(os.environ.get("SAPAL_DB_BUSY_TIMEOUT_MS", "5000"))  # espera ante otro escritor (otro worker, backfill)
+CACHE_MB = int(os.environ.get("SAPAL_DB_CACHE_MB", "64"))                 # caché de páginas por conexión
+MMAP_MB = int(os.environ.get("SAPAL_DB_MMAP_MB", "256"))
+SYNCHRONOUS = os.environ.get("SAPAL_DB_SYNCHRONOUS", "NORMAL").upper()    # NORMAL es seguro con WAL
+
+if SYNCHRONOUS not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+    raise ValueError(f"SAPAL_DB_SYNCHRONOUS inválido: {SYNCHRONOUS!r}")
+
 print(f"[DEBUG] Database path: {DB_PATH}")
 DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
 
-ASYNC_ENGINE = create_async_engine(DATABASE_URL, echo=False, future=True)
+# Un solo escritor por proceso: los commits (escritor diferido, ACKs, backfill)
+# se forman en el pool en vez de pelear por el candado de SQLite. Las lecturas
+# del tablero van por su propio pool y en WAL nunca bloquean al escritor.
+ASYNC_ENGINE = create_async_engine(
+    DATABASE_URL, echo=False, future=True,
+    pool_size=1, max_overflow=0, pool_timeout=ESPERA_POOL_SEGUNDOS,
+    connect_args={"timeout": BUSY_TIMEOUT_MS / 1000},
+)
+LECTURA_ENGINE = create_async_engine(
+    DATABASE_URL, echo=False, future=True,
+    pool_size=POOL_LECTURA, max_overflow=0, pool_timeout=ESPERA_POOL_SEGUNDOS,
+    connect_args={"timeout": BUSY_TIMEOUT_MS / 1000},
+)
 SessionLocal = async_sessionmaker(bind=ASYNC_ENGINE, class_=AsyncSession, expire_on_commit=False)
+SessionLectura = async_sessionmaker(bind=LECTURA_ENGINE, class_=AsyncSession, expire_on_commit=False)
 
 async def init_db():
     async with ASYNC_ENGINE.begin() as conn:
+        # Con varios workers arrancando a la vez, el candado de escritura
+        # serializa create_all + migraciones (los demás esperan y ya no hacen nada).
+        await conn.exec_driver_sql("BEGIN IMMEDIATE")
         await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(aplicar_migraciones)
+        # sólo avisa: el VACUUM de conversión es mantenimiento explícito, no del arranque
+        await conn.run_sync(asegurar_vacuum_incremental)
+
+async def cerrar_db():
+    """Cierra ambos pools (CLI y scripts, antes de salir del event loop)."""
+    await LECTURA_ENGINE.dispose()
+    await ASYNC_ENGINE.dispose()
+
+def _pragmas_comunes(cursor):
+    cursor.execute("PRAGMA foreign_keys=ON;")
+    cursor.execute(f"PRAGMA synchronous={SYNCHRONOUS};")
+    cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS};")
+    cursor.execute(f"PRAGMA cache_size={-CACHE_MB * 1024};")  # negativo = KiB
+    cursor.execute(f"PRAGMA mmap_size={MMAP_MB * 1024 * 1024};")
+    cursor.execute("PRAGMA temp_store=MEMORY;")
 
 @event.listens_for(ASYNC_ENGINE.sync_engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
+    # antes de WAL, que ya escribe la cabecera: en un archivo nuevo queda INCREMENTAL
+    # sin VACUUM; en uno existente no cambia nada hasta un VACUUM explícito
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL;")
     cursor.execute("PRAGMA journal_mode=WAL;")
-    cursor.execute("PRAGMA foreign_keys=ON;")
+    _pragmas_comunes(cursor)
+    cursor.close()
+
+@event.listens_for(LECTURA_ENGINE.sync_engine, "connect")
+def set_sqlite_pragma_lectura(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    _pragmas_comunes(cursor)
+    cursor.execute("PRAGMA query_only=ON;")  # una escritura por aquí es un error, no un candado
     cursor.close()
 
+def metricas_pools() -> dict:
+    return {
+        nombre: dict(tamano=motor.sync_engine.pool.size(), en_uso=motor.sync_engine.pool.checkedout())
+        for nombre, motor in (("escritor", ASYNC_ENGINE), ("lectura", LECTURA_ENGINE))
+    }
+
 async def get_session():
     async with SessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
@@ -1,11 +1,12 @@
 # app/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from contextlib import asynccontextmanager
 
 from .db import init_db
 from .routers.sim import router as sim_router
+from .services.metricas import REGISTRO, TIPO_CONTENIDO, MiddlewareLatencia
 from .services.sim import iniciar_simulacion_segundo_plano, detener_simulacion_segundo_plano
 
 
@@ -15,7 +16,7 @@ async def lifespan(app: FastAPI):
     Ciclo de vida de la aplicación.
 
     Al iniciar:
-      - Inicializa la base de datos (tablas si no existen).
+      - Inicializa la base de datos (tablas si no existen + migraciones pendientes).
       - Arranca la simulación en segundo plano (genera lecturas y alertas sintéticas).
 
     Al apagar:
@@ -38,7 +39,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],  # revalidación con If-None-Match desde otro origen
 )
+# Latencia por ruta para /metrics (ASGI puro: no interfiere con SSE ni WebSocket)
+app.add_middleware(MiddlewareLatencia)
 
 
 @app.get("/", include_in_schema=False)
@@ -57,5 +61,15 @@ async def health_check():
     return {"status": "healthy", "message": mensaje}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metricas_prometheus():
+    """
+    Métricas de este worker en formato de texto de Prometheus: duración del
+    tick por fase, filas y alertas escritas, alertas suprimidas, clientes
+    SSE/WebSocket y latencia por ruta.
+    """
+    return PlainTextResponse(REGISTRO.exposicion(), media_type=TIPO_CONTENIDO)
+
+
 # Rutas principales de la simulación / tablero
 app.include_router(sim_router, prefix="/sim", tags=["Simulacion"])
\ No newline at end of file
@@ -0,0 +1,110 @@
+# app/migraciones.py
+"""
+Evolución de esquema administrada con `PRAGMA user_version`.
+
+`SQLModel.metadata.create_all` sólo crea tablas que no existen: no agrega
+índices nuevos a tablas existentes ni migra datos. Cada paso de MIGRACIONES
+corre una sola vez, en orden, dentro de la transacción de `init_db`, y deja
+`user_version` en su número. Los pasos deben ser idempotentes (una base nueva
+también los ejecuta, justo después de create_all).
+
+auto_vacuum=INCREMENTAL: una base nueva lo toma gratis (el pragma se fija al
+conectar, antes de crear la primera tabla). Una base existente necesita un
+VACUUM completo, que bloquea a todos los escritores y no corre al arrancar:
+`init_db` sólo avisa, y la conversión es un paso explícito de mantenimiento
+(`python -m backend.services.retencion --vacuum-completo`).
+"""
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Connection
+from sqlmodel import SQLModel
+
+from .services import rollups
+
+# Índices de una sola columna que quedaron cubiertos por un compuesto
+# (mismo prefijo): sólo encarecían cada INSERT del tick.
+_INDICES_REDUNDANTES = ("ix_reading_sector_id", "ix_alert_sector_id")
+
+
+def _m001_poblar_rollups(conn: Connection) -> None:
+    rollups.poblar_desde_lecturas(conn)
+
+
+def _crear_indices_faltantes(conn: Connection) -> None:
+    """Crea los índices declarados en los modelos que la base todavía no tiene."""
+    for tabla in SQLModel.metadata.sorted_tables:
+        for indice in tabla.indexes:
+            indice.create(conn, checkfirst=True)
+
+
+def _m002_indices_compuestos(conn: Connection) -> None:
+    _crear_indices_faltantes(conn)
+    for nombre in _INDICES_REDUNDANTES:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {nombre}")
+    conn.exec_driver_sql("PRAGMA optimize")
+
+
+def _m003_indice_alertas_por_sector(conn: Connection) -> None:
+    _crear_indices_faltantes(conn)
+    conn.exec_driver_sql("PRAGMA optimize")
+
+
+def _m004_indice_bitacora_ts(conn: Connection) -> None:
+    _crear_indices_faltantes(conn)
+
+
+def _m005_indices_bucket_rollups(conn: Connection) -> None:
+    _crear_indices_faltantes(conn)
+
+
+def _m006_quitar_indice_abiertas(conn: Connection) -> None:
+    # el parcial (sector_id, tipo) WHERE estado='abierta' no lo elegía ningún
+    # plan: ix_alert_sector_tipo_estado ya cubre esas búsquedas
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_alert_abiertas")
+
+
+MIGRACIONES: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "poblar rollups desde reading", _m001_poblar_rollups),
+    (2, "índices compuestos y parciales", _m002_indices_compuestos),
+    (3, "índice (sector_id, ts) para paginar alertas", _m003_indice_alertas_por_sector),
+    (4, "índice ts de actionlog para la retención", _m004_indice_bitacora_ts),
+    (5, "índices bucket de rollups minuto/hora para la retención", _m005_indices_bucket_rollups),
+    (6, "quitar el índice parcial de alertas abiertas (redundante)", _m006_quitar_indice_abiertas),
+]
+
+
+def version_actual(conn: Connection) -> int:
+    return int(conn.exec_driver_sql("PRAGMA user_version").scalar_one())
+
+
+def asegurar_vacuum_incremental(conn: Connection, convertir: bool = False) -> bool:
+    """
+    auto_vacuum=INCREMENTAL para que la retención pueda devolver espacio.
+    En una base existente sólo se aplica con un VACUUM completo (fuera de
+    transacción); sin `convertir` únicamente avisa. True si lo hizo.
+    """
+    if int(conn.exec_driver_sql("PRAGMA auto_vacuum").scalar_one()) == 2:
+        return False
+    if not convertir:
+        print(
+            "[DEBUG] auto_vacuum no es INCREMENTAL: se omite la conversión (VACUUM completo); "
+            "la retención no devuelve espacio hasta correr `python -m backend.services.retencion --vacuum-completo`"
+        )
+        return False
+    conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.exec_driver_sql("VACUUM")
+    print("[DEBUG] auto_vacuum=INCREMENTAL aplicado (VACUUM)")
+    return True
+
+
+def aplicar_migraciones(conn: Connection) -> int:
+    """Aplica los pasos pendientes y devuelve la versión final del esquema."""
+    version = version_actual(conn)
+    for numero, descripcion, paso in MIGRACIONES:
+        if numero <= version:
+            continue
+        paso(conn)
+        conn.exec_driver_sql(f"PRAGMA user_version = {numero}")
+        version = numero
+        print(f"[DEBUG] Migración {numero} aplicada: {descripcion}")
+    return version
@@ -1,5 +1,6 @@
 # app/models.py
 from datetime import datetime
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 class Sector(SQLModel, table=True):
@@ -25,9 +26,16 @@ class Reading(SQLModel, table=True):
     - consumo_m3: volumen consumido/medido (m³).
     - presion_psi: presión estimada (PSI).
     - eficiencia: inyección/consumo (adimensional). >1 puede indicar pérdidas o modelado.
+
+    Índices: (sector_id, ts) para "últimas lecturas del sector"; ts para
+    tendencias globales y retención.
     """
+    __table_args__ = (
+        Index("ix_reading_sector_ts", "sector_id", "ts"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
-    sector_id: int = Field(index=True)
+    sector_id: int
     ts: datetime = Field(default_factory=datetime.utcnow, index=True)
     inyeccion_m3: float
     consumo_m3: float
@@ -45,9 +53,21 @@ class Alert(SQLModel, table=True):
     - estado: 'abierta' | 'atendida' | 'escalada'.
     - atendida_por / atendida_en: tracking cuando se marca como atendida (ACK).
     - escalada_a / escalada_en: tracking cuando se escala.
+
+    Índices: (estado, ts) y (sector_id, ts) para el listado paginado por
+    (ts, id) (el id va implícito al final de cada índice); (estado, atendida_en)
+    para ACKs recientes; (sector_id, tipo, estado) para la deduplicación y
+    el conteo por sector.
     """
+    __table_args__ = (
+        Index("ix_alert_estado_ts", "estado", "ts"),
+        Index("ix_alert_sector_ts", "sector_id", "ts"),
+        Index("ix_alert_estado_atendida_en", "estado", "atendida_en"),
+        Index("ix_alert_sector_tipo_estado", "sector_id", "tipo", "estado"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
-    sector_id: int = Field(index=True)
+    sector_id: int
     ts: datetime = Field(default_factory=datetime.utcnow, index=True)
     nivel: str
     tipo: str
@@ -67,11 +87,55 @@ class ActionLog(SQLModel, table=True):
     - actor: correo/usuario que ejecuta la acción.
     - accion: 'ack' (atender) | 'escalar'.
     - nota: observaciones libres.
-    - ts: timestamp de la acción.
+    - ts: timestamp de la acción (indexado para la retención).
     """
     id: int | None = Field(default=None, primary_key=True)
     alert_id: int = Field(index=True)
     actor: str
     accion: str  # "ack" | "escalar"
     nota: str | None = None
-    ts: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    ts: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class _ReadingRollupBase(SQLModel):
+    """
+    Agregado incremental de Reading por sector y cubeta de tiempo.
+    - bucket: inicio de la cubeta (UTC, truncado a la resolución de la tabla).
+    - conteo: lecturas acumuladas en la cubeta.
+    - <métrica>_suma / _min / _max: para inyeccion_m3, consumo_m3, presion_psi y eficiencia.
+    """
+    sector_id: int = Field(primary_key=True)
+    bucket: datetime = Field(primary_key=True)
+    conteo: int = 0
+    inyeccion_m3_suma: float = 0.0
+    inyeccion_m3_min: float
+    inyeccion_m3_max: float
+    consumo_m3_suma: float = 0.0
+    consumo_m3_min: float
+    consumo_m3_max: float
+    presion_psi_suma: float = 0.0
+    presion_psi_min: float
+    presion_psi_max: float
+    eficiencia_suma: float = 0.0
+    eficiencia_min: float
+    eficiencia_max: float
+
+
+class ReadingRollupMinuto(_ReadingRollupBase, table=True):
+    """Rollup de Reading por minuto (la retención lo poda por `bucket`)."""
+    __tablename__ = "reading_rollup_minuto"
+    __table_args__ = (
+        Index("ix_reading_rollup_minuto_bucket", "bucket"),
+    )
+
+
+class ReadingRollupHora(_ReadingRollupBase, table=True):
+    """Rollup de Reading por hora (la retención lo poda por `bucket`)."""
+    __tablename__ = "reading_rollup_hora"
+    __table_args__ = (
+        Index("ix_reading_rollup_hora_bucket", "bucket"),
+    )
+
+
+class ReadingRollupDia(_ReadingRollupBase, table=True):
+    """Rollup de Reading por día."""
+    __tablename__ = "reading_rollup_dia"
@@ -1,12 +1,11 @@
 # app/routers/sim.py
-import json
+from contextlib import aclosing
 from datetime import datetime, timezone
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
 
-from backend.models import Alert
-
 from ..schemas import (
     KPIResponse,
     SectorsResponse,
@@ -14,47 +13,124 @@ from ..schemas import (
     AckRequest,
     AckResponse,
     AckBulkRequest,
-    AckBulkResponse
+    AckBulkResponse,
+    BackfillRequest,
+    BackfillStatus,
+    HistoryResponse,
+    HistoryAggregateResponse,
 )
+from ..services import analitica as servicios_analitica
+from ..services import backfill as servicios_backfill
+from ..services.eventos import trama_sse
 from ..services import sim as servicios_sim
 
 router = APIRouter()
 
 
+def _coincide_etag(cabecera: Optional[str], etag: str) -> bool:
+    if not cabecera:
+        return False
+    candidatos = [c.strip() for c in cabecera.split(",")]
+    return "*" in candidatos or etag in candidatos
+
+
+async def _respuesta_versionada(request: Request, ruta: str, **parametros) -> Response:
+    """
+    ETag fuerte por versión de datos (sube con cada tick y cada ACK).
+    Si el cliente ya tiene esa versión (If-None-Match) responde 304 sin tocar
+    la DB; si no, sirve los bytes pre-serializados de esa versión (caché que
+    el bucle rellena tras cada tick). La versión se lee antes de calcular: si
+    entra un tick a mitad, el cliente sólo revalida de más.
+    """
+    etag = servicios_sim.etag_datos()
+    cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _coincide_etag(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cabeceras)
+    cuerpo = await servicios_sim.respuesta_json(ruta, **parametros)
+    return Response(content=cuerpo, media_type="application/json", headers=cabeceras)
+
+
 # app/routers/sim.py
 @router.get("/kpis/current", response_model=KPIResponse)
-async def obtener_kpis_actuales():
+async def obtener_kpis_actuales(request: Request):
     """
     KPIs del encabezado del tablero, con tendencia global de eficiencia y
     conteo de alertas atendidas en las últimas 24h.
     """
-    datos = await servicios_sim.calcular_kpis()
-    return {
-        "ts": datos["ts"],
-        "eficiencia": round(datos["eficiencia"], 4),
-        "eficiencia_trend": [round(x, 4) for x in datos["eficiencia_trend"]],
-        "sectores_en_riesgo": datos["sectores_en_riesgo"],
-        "alertas_atendidas_24h": datos["alertas_atendidas_24h"],
-        "tiempo_decision_min": datos["tiempo_decision_min"],
-    }
+    return await _respuesta_versionada(request, "kpis")
 
 
 @router.get("/sectors", response_model=SectorsResponse)
-async def obtener_sectores():
+async def obtener_sectores(request: Request):
     """
     Devuelve la cuadrícula de sectores para el dashboard.
     """
-    elementos = await servicios_sim.construir_cuadricula_sectores()
-    return {"items": elementos}
+    return await _respuesta_versionada(request, "sectores")
 
 
 @router.get("/alerts", response_model=AlertsResponse)
-async def obtener_alertas(estado: str = "abierta"):
+async def obtener_alertas(
+    request: Request,
+    estado: str = "abierta",
+    sector_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    nivel: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: int = Query(default=50, ge=1, le=500),
+):
+    """
+    Devuelve el listado de alertas (más recientes primero), paginado por cursor.
+
+    Filtros: estado ('abierta' | 'atendida' | 'escalada' | 'todas'), sector_id,
+    tipo, nivel y rango [desde, hasta]. Para la página siguiente, repetir la
+    petición con `cursor` = `siguiente_cursor` de la respuesta.
+    """
+    if cursor:
+        try:
+            servicios_sim.decodificar_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    return await _respuesta_versionada(
+        request, "alertas",
+        estado=estado, sector_id=sector_id, tipo=tipo, nivel=nivel,
+        desde=desde, hasta=hasta, cursor=cursor, limite=limite,
+    )
+
+
+@router.get("/history", response_model=HistoryResponse)
+async def obtener_historial(
+    sector_id: int,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    puntos_max: int = Query(default=500, ge=10, le=5000),
+):
+    """
+    Serie histórica agregada de un sector (por defecto, últimas 24h).
+    Se lee de los rollups minuto/hora/día eligiendo la resolución más fina
+    que no exceda `puntos_max` puntos.
+    """
+    return await servicios_sim.historial_sector(sector_id, desde, hasta, puntos_max)
+
+
+@router.get("/history/aggregate", response_model=HistoryAggregateResponse)
+async def obtener_historial_agregado(
+    sector_ids: Optional[List[int]] = Query(default=None),
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cubeta: Literal["15m", "1h", "6h", "1d", "1w", "1mo"] = "1d",
+    por_sector: bool = False,
+):
     """
-    Devuelve el listado de alertas filtrado por estado.
+    Analítica sobre el archivo Parquet (lecturas ya fuera de SQLite por la
+    retención): eficiencia, presión y pérdida por cubeta, de todos los
+    sectores o de `sector_ids`. Por defecto, últimos 90 días por día.
     """
-    elementos = await servicios_sim.listar_alertas(estado=estado)
-    return {"items": elementos}
+    try:
+        return await servicios_analitica.historial_agregado(desde, hasta, cubeta, sector_ids, por_sector)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @router.post("/alerts/{id_alerta}/ack", response_model=AckResponse)
@@ -75,52 +151,110 @@ async def marcar_alerta_como_atendida(id_alerta: int, cuerpo: AckRequest):
     return resultado
 
 
-# app/routers/sim.py
 @router.post("/alerts/ack_bulk", response_model=AckBulkResponse)
 async def ack_bulk(req: AckBulkRequest):
+    """
+    Marca como 'atendidas' varias alertas abiertas a la vez.
+    """
     if req.pin != "2131":
         raise HTTPException(status_code=403, detail="PIN inválido")
-    ahora = datetime.now(timezone.utc)
-    async with contexto_sesion() as sesion, sesion.begin():
-        res = await sesion.execute(
-            select(Alert).where(Alert.id.in_(req.ids), Alert.estado == "abierta")
-        )
-        filas = 0
-        for a in res.scalars().all():
-            a.estado = "atendida"
-            a.atendida_por = "operador@sapal.mx"
-            a.atendida_en = ahora
-            filas += 1
-        return {"updated": filas}
-
-
-# @router.get("/events/stream")
-# async def flujo_eventos(request: Request):
-#     """
-#     Server-Sent Events (SSE) para “tiempo real”.
-
-#     Envía:
-#       - {'type':'hello', 'payload':{'ts':...}} al conectar.
-#       - {'type':'tick',  'payload':{'ts':...}} cada intervalo.
-#       - {'type':'alert', 'payload':{id, sector_id, nivel, tipo, ts}} por alerta.
-#     """
-#     async def generador_eventos():
-#         saludo_inicial = {
-#             "type": "hello",
-#             "payload": {"ts": datetime.now(timezone.utc).isoformat()}
-#         }
-#         yield f"data: {json.dumps(saludo_inicial)}\n\n"
-
-#         async for paquete in servicios_sim.suscribirse_eventos():
-#             if await request.is_disconnected():
-#                 break
-#             yield f"data: {json.dumps(paquete)}\n\n"
-
-#     return StreamingResponse(
-#         generador_eventos(),
-#         headers={
-#             "Cache-Control": "no-cache",
-#             "Connection": "keep-alive",
-#         },
-#         media_type="text/event-stream",
-#     )
\ No newline at end of file
+    ids = await servicios_sim.atender_alertas(req.ids, correo_usuario="operador@sapal.mx", nota=req.nota)
+    return {"updated": len(ids), "ids": ids}
+
+
+@router.post("/backfill", response_model=BackfillStatus, status_code=202)
+async def lanzar_backfill(cuerpo: BackfillRequest):
+    """
+    Genera historia simulada de los últimos `dias` en tiempo acelerado
+    (reloj virtual + INSERTs masivos). Corre en segundo plano; consultar
+    el avance con GET /sim/backfill.
+    """
+    if cuerpo.pin != "2131":
+        raise HTTPException(status_code=403, detail="PIN inválido")
+    iniciado = servicios_backfill.iniciar_backfill(
+        dias=cuerpo.dias,
+        intervalo_segundos=cuerpo.intervalo_segundos,
+        atender_tras_min=cuerpo.atender_tras_min,
+        semilla=cuerpo.semilla,
+    )
+    if not iniciado:
+        raise HTTPException(status_code=409, detail="Ya hay un backfill en curso")
+    return servicios_backfill.estado_backfill()
+
+
+@router.get("/backfill", response_model=BackfillStatus)
+async def consultar_backfill():
+    """Avance del backfill en curso o resumen del último."""
+    return servicios_backfill.estado_backfill()
+
+
+@router.get("/events/stream")
+async def flujo_eventos(request: Request):
+    """
+    Server-Sent Events (SSE) para “tiempo real”.
+
+    Envía:
+      - {'type':'hello', 'payload':{'ts':...}} al conectar.
+      - {'type':'tick',  'payload':{'ts':...}} cada intervalo (sólo el más reciente si el cliente va atrasado).
+      - {'type':'alert', 'payload':{id, sector_id, nivel, tipo, ts}} por alerta.
+      - ': ping' como latido cuando no hay eventos.
+    """
+    if servicios_sim.eventos_saturados():
+        raise HTTPException(status_code=503, detail="Demasiadas conexiones de eventos")
+
+    async def generador_eventos():
+        saludo_inicial = {
+            "type": "hello",
+            "payload": {"ts": datetime.now(timezone.utc).isoformat()}
+        }
+        yield trama_sse(saludo_inicial)
+
+        async for trama in servicios_sim.suscribirse_eventos():
+            if await request.is_disconnected():
+                break
+            yield trama if trama is not None else ": ping\n\n"
+
+    return StreamingResponse(
+        generador_eventos(),
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+        media_type="text/event-stream",
+    )
+
+
+@router.websocket("/ws")
+async def tablero_ws(websocket: WebSocket, desde: Optional[int] = None, epoca: Optional[str] = None):
+    """
+    WebSocket del tablero: reemplaza el sondeo de /kpis/current, /sectors y /alerts.
+
+    Envía:
+      - {'type':'snapshot', 'epoca', 'version', 'payload':{kpis, sectores, alertas}} al conectar
+        (o si el cliente quedó demasiado atrás).
+      - {'type':'delta', 'epoca', 'version', 'base', 'payload':{ts, sectores, sectores_retirados,
+        alertas_nuevas, alertas_atendidas, kpis}} por tick y por ACK; sólo lo que cambió.
+      - {'type':'ping'} como latido cuando no hay cambios.
+    Para reanudar tras reconectar: ?desde=<última version>&epoca=<epoca>.
+    """
+    if servicios_sim.tablero_saturado():
+        await websocket.close(code=1013, reason="Demasiadas conexiones del tablero")
+        return
+    await websocket.accept()
+    try:
+        async with aclosing(servicios_sim.suscribirse_tablero(desde, epoca)) as mensajes:
+            async for mensaje in mensajes:
+                await websocket.send_text(mensaje if mensaje is not None else '{"type":"ping"}')
+    except WebSocketDisconnect:
+        pass
+
+
+@router.get("/diagnostics")
+async def diagnostico():
+    """
+    Estado detallado de este worker: coordinación, programador del tick,
+    escritor diferido y pools, enfriamientos, SSE, WebSocket, caché de
+    respuestas y retención. Los contadores también están en /metrics.
+    """
+    return servicios_sim.diagnostico()
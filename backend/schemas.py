@@ -1,6 +1,6 @@
 # app/schemas.py
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Literal, Dict, Optional
 
 class KPIResponse(BaseModel):
@@ -25,9 +25,11 @@ class SectorCard(BaseModel):
     Tarjeta de sector para el grid.
     - estado: 'normal' | 'alerta' | 'critico' según umbrales de eficiencia.
     - tendencia: serie corta (sparkline) de eficiencias recientes (orden cronológico).
+    - zona: zona del catálogo de sectores (None si el catálogo no la trae).
     """
     id: int
     nombre: str
+    zona: Optional[str] = None
     estado: Literal["normal", "alerta", "critico"]
     eficiencia: float
     presion_psi: float
@@ -63,8 +65,12 @@ class AlertRead(BaseModel):
 
 
 class AlertsResponse(BaseModel):
-    """Contenedor de lista de alertas para la ruta /sim/alerts."""
+    """
+    Página de alertas para la ruta /sim/alerts (más recientes primero).
+    - siguiente_cursor: pasar como `cursor` para la página siguiente; None si no hay más.
+    """
     items: List[AlertRead]
+    siguiente_cursor: Optional[str] = None
 
 
 class AckRequest(BaseModel):
@@ -93,5 +99,98 @@ class AckResponse(BaseModel):
 class AckBulkRequest(BaseModel):
     pin: str
     ids: list[int]
+    nota: Optional[str] = None
 class AckBulkResponse(BaseModel):
-    updated: int
\ No newline at end of file
+    """
+    - updated: cuántas pasaron de 'abierta' a 'atendida'.
+    - ids: exactamente cuáles (las ya atendidas o inexistentes no aparecen).
+    """
+    updated: int
+    ids: list[int] = []
+
+class BackfillRequest(BaseModel):
+    """
+    Petición para generar historia simulada en tiempo acelerado.
+    - dias: rango hacia atrás desde ahora.
+    - intervalo_segundos: segundos virtuales por tick.
+    - atender_tras_min: minutos virtuales hasta marcar cada alerta como atendida (None = nunca).
+    - semilla: semilla del generador aleatorio (reproducible).
+    """
+    pin: str
+    dias: float = Field(default=90, gt=0, le=366)
+    intervalo_segundos: int = Field(default=10, ge=1)
+    atender_tras_min: Optional[int] = Field(default=30, ge=0)
+    semilla: Optional[int] = None
+
+
+class BackfillStatus(BaseModel):
+    """Progreso del backfill en curso (o del último ejecutado)."""
+    estado: Literal["inactivo", "en_curso", "terminado", "error"]
+    desde: Optional[str] = None
+    hasta: Optional[str] = None
+    sectores: Optional[int] = None
+    ticks: int = 0
+    ticks_total: int = 0
+    lecturas: int = 0
+    alertas: int = 0
+    segundos: float = 0.0
+    error: Optional[str] = None
+
+
+class HistoryPoint(BaseModel):
+    """
+    Punto de la serie histórica (una cubeta del rollup).
+    - inyeccion_m3 / consumo_m3: totales de la cubeta.
+    - presion_psi_* / eficiencia_*: promedio, mínimo y máximo en la cubeta.
+    """
+    ts: datetime
+    conteo: int
+    inyeccion_m3: float
+    consumo_m3: float
+    presion_psi_prom: float
+    presion_psi_min: float
+    presion_psi_max: float
+    eficiencia_prom: float
+    eficiencia_min: float
+    eficiencia_max: float
+
+
+class HistoryResponse(BaseModel):
+    """Serie histórica de un sector para /sim/history."""
+    sector_id: int
+    resolucion: Literal["minuto", "hora", "dia"]
+    desde: datetime
+    hasta: datetime
+    items: List[HistoryPoint]
+
+
+class HistoryAggregatePoint(BaseModel):
+    """
+    Cubeta de la analítica sobre el archivo Parquet.
+    - sector_id: sólo con `por_sector`; si no, la cubeta suma todos los sectores pedidos.
+    - perdida_m3: inyección - consumo (agua no facturada) en la cubeta.
+    """
+    ts: datetime
+    sector_id: Optional[int] = None
+    conteo: int
+    inyeccion_m3: float
+    consumo_m3: float
+    perdida_m3: float
+    presion_psi_prom: float
+    presion_psi_min: float
+    presion_psi_max: float
+    eficiencia_prom: float
+    eficiencia_min: float
+    eficiencia_max: float
+
+
+class HistoryAggregateResponse(BaseModel):
+    """Serie agregada de /sim/history/aggregate (sólo lecturas ya archivadas)."""
+    desde: datetime
+    hasta: datetime
+    cubeta: Literal["15m", "1h", "6h", "1d", "1w", "1mo"]
+    sector_ids: Optional[List[int]] = None
+    por_sector: bool
+    lecturas: int
+    segundos: float
+    items: List[HistoryAggregatePoint]
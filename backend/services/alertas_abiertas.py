@@ -0,0 +1,71 @@
+# app/services/alertas_abiertas.py
+from collections import Counter
+from typing import Tuple
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from ..models import Alert
+
+
+def _consulta_abiertas_por_sector_tipo():
+    return (
+        select(Alert.sector_id, Alert.tipo, func.count(Alert.id))
+        .where(Alert.estado == "abierta")
+        .group_by(Alert.sector_id, Alert.tipo)
+    )
+
+
+class IndiceAlertasAbiertas:
+    """
+    Índice en memoria de alertas abiertas por (sector_id, tipo).
+
+    Se carga una vez al arrancar y lo mantienen coherente la creación de
+    alertas (bucle de simulación) y los ACK (`atender_alerta`, ACK masivo).
+    Reemplaza el COUNT por alerta candidata de la deduplicación: `existe`
+    es una búsqueda en diccionario.
+
+    Guarda conteos (no un set) porque bases antiguas pueden tener varias
+    abiertas del mismo (sector, tipo); también lleva el conteo por sector
+    que usan los KPIs (`sectores_en_riesgo`).
+    """
+
+    def __init__(self):
+        self.por_clave: Counter = Counter()
+        self.por_sector: Counter = Counter()
+
+    def __len__(self) -> int:
+        return sum(self.por_clave.values())
+
+    @property
+    def sectores_en_riesgo(self) -> int:
+        return len(self.por_sector)
+
+    def existe(self, sector_id: int, tipo: str) -> bool:
+        return (sector_id, tipo) in self.por_clave
+
+    def agregar(self, sector_id: int, tipo: str) -> None:
+        self.por_clave[(sector_id, tipo)] += 1
+        self.por_sector[sector_id] += 1
+
+    def quitar(self, sector_id: int, tipo: str) -> None:
+        clave: Tuple[int, str] = (sector_id, tipo)
+        if self.por_clave[clave] <= 1:
+            self.por_clave.pop(clave, None)
+        else:
+            self.por_clave[clave] -= 1
+        if self.por_sector[sector_id] <= 1:
+            self.por_sector.pop(sector_id, None)
+        else:
+            self.por_sector[sector_id] -= 1
+
+    async def cargar(self, sesion: AsyncSession) -> None:
+        res = await sesion.execute(_consulta_abiertas_por_sector_tipo())
+        por_clave: Counter = Counter()
+        por_sector: Counter = Counter()
+        for sector_id, tipo, n in res.all():
+            por_clave[(sector_id, tipo)] = int(n)
+            por_sector[sector_id] += int(n)
+        self.por_clave = por_clave
+        self.por_sector = por_sector
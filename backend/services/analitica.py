@@ -0,0 +1,121 @@
+# app/services/analitica.py
+"""
+Analítica histórica sobre lo archivado en Parquet (ver `retencion.py`).
+
+Las consultas son planes perezosos de polars (`scan_parquet`): el filtro por
+`fecha` poda particiones completas, el de `ts`/`sector_id` baja al lector de
+Parquet (predicate pushdown) y sólo se leen las columnas que se agregan
+(projection pushdown). Se ejecutan con el motor streaming en un hilo aparte:
+memoria acotada y sin carga sobre la base viva.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import polars as pl
+
+from .retencion import DIR_ARCHIVO
+
+# tamaño de cubeta (sintaxis de polars) → duración aproximada, para acotar la respuesta
+CUBETAS: Dict[str, timedelta] = {
+    "15m": timedelta(minutes=15),
+    "1h": timedelta(hours=1),
+    "6h": timedelta(hours=6),
+    "1d": timedelta(days=1),
+    "1w": timedelta(weeks=1),
+    "1mo": timedelta(days=30),
+}
+MAX_CUBETAS = 10_000     # cubetas de tiempo por respuesta
+DIAS_POR_DEFECTO = 90
+
+
+def _utc(ts: datetime) -> datetime:
+    """Marca del cliente en UTC con zona; sin zona se asume UTC (como se archiva)."""
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+
+def _utc_naive(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def _plan_agregado(
+    directorio: Path,
+    desde: datetime,
+    hasta: datetime,
+    cubeta: str,
+    sector_ids: Optional[List[int]] = None,
+    por_sector: bool = False,
+) -> Optional[pl.LazyFrame]:
+    """Plan perezoso sobre las lecturas archivadas; None si todavía no hay archivo."""
+    carpeta = directorio / "reading"
+    if not any(carpeta.glob("fecha=*/*.parquet")):
+        return None
+    lecturas = pl.scan_parquet(carpeta / "**" / "*.parquet", hive_partitioning=True)
+    lecturas = lecturas.filter(
+        pl.col("fecha").is_between(desde.date(), hasta.date()),  # poda de particiones
+        pl.col("ts") >= desde,
+        pl.col("ts") < hasta,
+    )
+    if sector_ids:
+        lecturas = lecturas.filter(pl.col("sector_id").is_in(sector_ids))
+    claves = ["ts", "sector_id"] if por_sector else ["ts"]
+    return (
+        lecturas
+        .with_columns(pl.col("ts").dt.truncate(cubeta))
+        .group_by(claves)
+        .agg(
+            conteo=pl.len(),
+            inyeccion_m3=pl.col("inyeccion_m3").sum(),
+            consumo_m3=pl.col("consumo_m3").sum(),
+            presion_psi_prom=pl.col("presion_psi").mean(),
+            presion_psi_min=pl.col("presion_psi").min(),
+            presion_psi_max=pl.col("presion_psi").max(),
+            eficiencia_prom=pl.col("eficiencia").mean(),
+            eficiencia_min=pl.col("eficiencia").min(),
+            eficiencia_max=pl.col("eficiencia").max(),
+        )
+        .with_columns(perdida_m3=pl.col("inyeccion_m3") - pl.col("consumo_m3"))
+        .sort(claves)
+    )
+
+
+async def historial_agregado(
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cubeta: str = "1d",
+    sector_ids: Optional[List[int]] = None,
+    por_sector: bool = False,
+    directorio: Path = DIR_ARCHIVO,
+) -> dict:
+    """
+    Eficiencia, presión y pérdida (inyección - consumo) por cubeta sobre el
+    archivo Parquet; por defecto, los últimos 90 días. ValueError si el rango
+    pide más de MAX_CUBETAS cubetas.
+    """
+    if cubeta not in CUBETAS:
+        raise ValueError(f"Cubeta inválida: {cubeta!r} (válidas: {', '.join(CUBETAS)})")
+    hasta = _utc(hasta) if hasta else datetime.now(timezone.utc)
+    desde = _utc(desde) if desde else hasta - timedelta(days=DIAS_POR_DEFECTO)
+    if desde >= hasta:
+        raise ValueError("'desde' debe ser anterior a 'hasta'")
+    if (hasta - desde) / CUBETAS[cubeta] > MAX_CUBETAS:
+        raise ValueError(f"El rango pide más de {MAX_CUBETAS} cubetas de {cubeta}: usa una cubeta mayor")
+
+    inicio = time.monotonic()
+    plan = _plan_agregado(directorio, _utc_naive(desde), _utc_naive(hasta), cubeta, sector_ids, por_sector)
+    items = []
+    if plan is not None:
+        resultado = await asyncio.to_thread(plan.collect, engine="streaming")
+        items = resultado.to_dicts()
+    return dict(
+        desde=desde,
+        hasta=hasta,
+        cubeta=cubeta,
+        sector_ids=sector_ids,
+        por_sector=por_sector,
+        lecturas=sum(item["conteo"] for item in items),
+        segundos=round(time.monotonic() - inicio, 3),
+        items=items,
+    )
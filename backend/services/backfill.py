@@ -0,0 +1,241 @@
+# app/services/backfill.py
+"""
+Backfill en tiempo acelerado: corre el simulador con un `RelojVirtual` sobre un
+rango de fechas tan rápido como da el CPU y guarda lecturas/alertas con
+INSERTs masivos. Sirve para poblar `app.db` con historia realista
+(tendencias de KPIs, pruebas de carga del tablero).
+
+Uso por línea de comandos (desde la raíz del repo):
+    python -m backend.services.backfill --dias 90
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlmodel import select
+
+from ..db import cerrar_db, init_db
+from ..models import ActionLog, Alert, Reading
+from . import rollups, sim
+from .enfriamientos import RegistroEnfriamientos
+from .escritor import MAX_FILAS_LOTE
+from .reloj import RelojVirtual
+
+ACTOR_BACKFILL = "backfill@sapal.mx"
+
+_TAREA_BACKFILL: Optional[asyncio.Task] = None
+_PROGRESO_BACKFILL: dict = {"estado": "inactivo"}
+
+
+def _simular_lote(
+    motor,
+    reloj: RelojVirtual,
+    hasta: datetime,
+    intervalo_segundos: int,
+    max_ticks: int,
+    registro: RegistroEnfriamientos,
+    cierres: Dict[Tuple[int, str], datetime],
+    atender_tras: Optional[timedelta],
+) -> Tuple[List[dict], List[dict], int]:
+    """
+    Avanza hasta `max_ticks` ticks virtuales (CPU puro, sin I/O).
+    `cierres` replica la deduplicación de alertas abiertas del bucle en vivo:
+    (sector, tipo) → instante en que la alerta deja de estar 'abierta'.
+    """
+    lecturas_lote: List[dict] = []
+    alertas_lote: List[dict] = []
+    ticks = 0
+    while ticks < max_ticks and reloj.ahora() < hasta:
+        instante = reloj.ahora()
+        lecturas, nuevas = sim.calcular_tick(motor, instante, intervalo_segundos, registro)
+        lecturas_lote.extend(motor.filas(lecturas, instante))
+
+        for alerta in nuevas:
+            clave = (alerta.sector_id, alerta.tipo)
+            cierre = cierres.get(clave)
+            if cierre is not None and cierre > instante:
+                continue  # ya hay una abierta de este tipo en el sector
+            fila = alerta.model_dump(exclude={"id"})
+            if atender_tras is not None and instante + atender_tras <= hasta:
+                fila["estado"] = "atendida"
+                fila["atendida_por"] = ACTOR_BACKFILL
+                fila["atendida_en"] = instante + atender_tras
+                cierres[clave] = fila["atendida_en"]
+            else:
+                cierres[clave] = datetime.max.replace(tzinfo=timezone.utc)
+            alertas_lote.append(fila)
+
+        reloj.avanzar(intervalo_segundos)
+        ticks += 1
+    return lecturas_lote, alertas_lote, ticks
+
+
+async def _insertar_lote(lecturas: List[dict], alertas: List[dict]) -> None:
+    async with sim.contexto_sesion() as sesion:
+        async with sesion.begin():
+            if lecturas:
+                await sesion.execute(insert(Reading), lecturas)
+                await rollups.actualizar_rollups(sesion, lecturas)
+            if alertas:
+                res = await sesion.execute(
+                    insert(Alert).returning(Alert.id, sort_by_parameter_order=True), alertas
+                )
+                ids = res.scalars().all()
+                bitacora = [
+                    dict(alert_id=id_alerta, actor=ACTOR_BACKFILL, accion="ack",
+                         nota="Atendida por backfill", ts=fila["atendida_en"])
+                    for id_alerta, fila in zip(ids, alertas)
+                    if fila["estado"] == "atendida"
+                ]
+                if bitacora:
+                    await sesion.execute(insert(ActionLog), bitacora)
+
+
+def _consulta_abiertas():
+    return select(Alert.sector_id, Alert.tipo).where(Alert.estado == "abierta").distinct()
+
+
+async def _cargar_abiertas() -> Dict[Tuple[int, str], datetime]:
+    """Alertas ya abiertas en DB: bloquean nuevas del mismo (sector, tipo)."""
+    async with sim.contexto_lectura() as sesion:
+        res = await sesion.execute(_consulta_abiertas())
+        abierta = datetime.max.replace(tzinfo=timezone.utc)
+        return {(sid, tipo): abierta for sid, tipo in res.all()}
+
+
+async def generar_historial(
+    desde: datetime,
+    hasta: datetime,
+    intervalo_segundos: int = 10,
+    atender_tras_min: Optional[int] = 30,
+    filas_por_lote: int = MAX_FILAS_LOTE,
+    semilla: Optional[int] = None,
+    progreso: Optional[dict] = None,
+) -> dict:
+    """
+    Simula [desde, hasta) con reloj virtual y guarda todo en lotes.
+    - atender_tras_min: las alertas se marcan 'atendida' (con su ActionLog)
+      tantos minutos virtuales después; None = se quedan abiertas.
+    - filas_por_lote: lecturas por transacción (acota memoria y duración de
+      cada lote sin importar cuántos sectores haya; al menos un tick).
+    El cálculo de cada lote corre en un hilo para no bloquear el event loop.
+    """
+    progreso = {} if progreso is None else progreso
+    ids_sectores = await sim.asegurar_sectores_semilla()
+    motor = sim.crear_motor(ids_sectores, semilla)
+    reloj = RelojVirtual(desde)
+    hasta = hasta if hasta.tzinfo else hasta.replace(tzinfo=timezone.utc)
+    registro = RegistroEnfriamientos()
+    cierres = await _cargar_abiertas()
+    atender_tras = timedelta(minutes=atender_tras_min) if atender_tras_min is not None else None
+    ticks_por_lote = max(1, filas_por_lote // max(1, len(ids_sectores)))
+
+    ticks_total = max(0, int((hasta - reloj.ahora()).total_seconds() // intervalo_segundos))
+    progreso.update(
+        estado="en_curso",
+        desde=reloj.ahora().isoformat(),
+        hasta=hasta.isoformat(),
+        sectores=len(ids_sectores),
+        ticks=0,
+        ticks_total=ticks_total,
+        lecturas=0,
+        alertas=0,
+        segundos=0.0,
+    )
+    inicio = time.perf_counter()
+    while reloj.ahora() < hasta:
+        lecturas, alertas, ticks = await asyncio.to_thread(
+            _simular_lote, motor, reloj, hasta, intervalo_segundos,
+            ticks_por_lote, registro, cierres, atender_tras,
+        )
+        await _insertar_lote(lecturas, alertas)
+        progreso["ticks"] += ticks
+        progreso["lecturas"] += len(lecturas)
+        progreso["alertas"] += len(alertas)
+        progreso["segundos"] = round(time.perf_counter() - inicio, 2)
+
+    progreso["estado"] = "terminado"
+    return progreso
+
+
+# ─────────────────────────────────────────────────────────────
+# Tarea en segundo plano (API)
+# ─────────────────────────────────────────────────────────────
+def estado_backfill() -> dict:
+    return dict(_PROGRESO_BACKFILL)
+
+
+def iniciar_backfill(
+    dias: float,
+    intervalo_segundos: int = 10,
+    atender_tras_min: Optional[int] = 30,
+    semilla: Optional[int] = None,
+) -> bool:
+    """Lanza un backfill de los últimos `dias`; False si ya hay uno corriendo."""
+    global _TAREA_BACKFILL, _PROGRESO_BACKFILL
+    if _TAREA_BACKFILL is not None and not _TAREA_BACKFILL.done():
+        return False
+
+    hasta = datetime.now(timezone.utc)
+    desde = hasta - timedelta(days=dias)
+    _PROGRESO_BACKFILL = {"estado": "en_curso"}
+
+    async def _correr():
+        try:
+            await generar_historial(
+                desde, hasta,
+                intervalo_segundos=intervalo_segundos,
+                atender_tras_min=atender_tras_min,
+                semilla=semilla,
+                progreso=_PROGRESO_BACKFILL,
+            )
+            # la historia nueva puede cambiar tendencia, alertas abiertas y ACKs 24h
+            await sim.notificar_reconstruccion()
+        except Exception as exc:
+            _PROGRESO_BACKFILL.update(estado="error", error=str(exc))
+            raise
+
+    _TAREA_BACKFILL = asyncio.create_task(_correr())
+    return True
+
+
+# ─────────────────────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────────────────────
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Genera historia simulada en tiempo acelerado.")
+    parser.add_argument("--dias", type=float, default=90, help="días hacia atrás desde ahora (o desde --hasta)")
+    parser.add_argument("--hasta", type=datetime.fromisoformat, default=None, help="fin del rango (ISO 8601, UTC)")
+    parser.add_argument("--intervalo", type=int, default=10, help="segundos virtuales por tick")
+    parser.add_argument("--atender-tras-min", type=int, default=30, help="minutos virtuales hasta el ACK (-1 = nunca)")
+    parser.add_argument("--semilla", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    hasta = args.hasta or datetime.now(timezone.utc)
+    desde = hasta - timedelta(days=args.dias)
+    atender = None if args.atender_tras_min < 0 else args.atender_tras_min
+
+    async def _correr():
+        await init_db()
+        try:
+            return await generar_historial(
+                desde, hasta,
+                intervalo_segundos=args.intervalo,
+                atender_tras_min=atender,
+                semilla=args.semilla,
+            )
+        finally:
+            await cerrar_db()
+
+    resumen = asyncio.run(_correr())
+    print(
+        f"[backfill] {resumen['ticks']} ticks · {resumen['lecturas']} lecturas · "
+        f"{resumen['alertas']} alertas en {resumen['segundos']} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
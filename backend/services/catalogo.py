@@ -0,0 +1,154 @@
+# app/services/catalogo.py
+"""
+Catálogo de sectores hidráulicos (topología): un CSV o JSON con
+`id, nombre, zona, activo` que manda sobre la tabla `sector`.
+
+Al arrancar la simulación se sincroniza con un solo upsert masivo (sólo
+reescribe las filas que cambiaron) y se desactivan los sectores que ya no
+figuran en el catálogo; el historial de esos sectores se conserva.
+
+    SAPAL_CATALOGO_SECTORES=/ruta/sectores.csv   (por defecto backend/catalogo_sectores.csv)
+
+CSV: encabezado `id,nombre,zona,activo` (nombre, zona y activo opcionales).
+JSON: lista de objetos con esas claves, o `{"sectores": [...]}`.
+
+Para pruebas de carga se puede generar uno grande:
+    python -m backend.services.catalogo --generar 10000 --zonas 40 --salida sectores.csv
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from ..db import BASE_DIR
+from ..models import Sector
+
+RUTA_CATALOGO = Path(os.environ.get("SAPAL_CATALOGO_SECTORES", BASE_DIR / "catalogo_sectores.csv"))
+TAMANO_LOTE_IDS = 500  # ids por UPDATE al desactivar
+
+_VERDADEROS = {"1", "true", "t", "si", "sí", "s", "yes", "y"}
+_FALSOS = {"0", "false", "f", "no", "n"}
+
+
+def _booleano(valor) -> bool:
+    if valor is None or valor == "":
+        return True  # sin columna `activo`: el sector está operativo
+    if isinstance(valor, bool):
+        return valor
+    texto = str(valor).strip().lower()
+    if texto in _VERDADEROS:
+        return True
+    if texto in _FALSOS:
+        return False
+    raise ValueError(f"Valor de 'activo' inválido: {valor!r}")
+
+
+def _normalizar(fila: dict, posicion: int) -> dict:
+    try:
+        sector_id = int(fila["id"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"Sector #{posicion} del catálogo sin 'id' entero: {fila!r}") from exc
+    nombre = (fila.get("nombre") or "").strip() or f"Sector {sector_id:03d}"
+    zona = (fila.get("zona") or "").strip() or None
+    return dict(id=sector_id, nombre=nombre, zona=zona, activo=_booleano(fila.get("activo")))
+
+
+def cargar_catalogo(ruta: Path = RUTA_CATALOGO) -> List[dict]:
+    """Lee y valida el catálogo; ValueError si está vacío o repite ids."""
+    if ruta.suffix.lower() == ".json":
+        datos = json.loads(ruta.read_text(encoding="utf-8"))
+        filas = datos["sectores"] if isinstance(datos, dict) else datos
+    else:
+        with ruta.open(newline="", encoding="utf-8") as archivo:
+            filas = list(csv.DictReader(archivo))
+    sectores = [_normalizar(fila, i) for i, fila in enumerate(filas, start=1)]
+    if not sectores:
+        raise ValueError(f"El catálogo {ruta} no tiene sectores")
+    if len({s["id"] for s in sectores}) != len(sectores):
+        raise ValueError(f"El catálogo {ruta} repite ids de sector")
+    return sectores
+
+
+async def sembrar(sesion: AsyncSession, sectores: List[dict]) -> int:
+    """
+    Upsert masivo del catálogo y desactivación de los sectores que ya no están.
+    Corre dentro de la transacción del llamador; devuelve cuántos desactivó.
+    """
+    sentencia = sqlite_insert(Sector)
+    nuevo = sentencia.excluded
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=[Sector.id],
+        set_=dict(nombre=nuevo.nombre, zona=nuevo.zona, activo=nuevo.activo),
+        # sin cambios no hay escritura: re-sembrar el mismo catálogo no toca páginas
+        where=or_(
+            Sector.nombre != nuevo.nombre,
+            Sector.zona.is_distinct_from(nuevo.zona),
+            Sector.activo != nuevo.activo,
+        ),
+    )
+    await sesion.execute(sentencia, sectores)
+
+    en_catalogo = {s["id"] for s in sectores}
+    res = await sesion.execute(select(Sector.id).where(Sector.activo.is_(True)))
+    sobrantes = [sid for sid in res.scalars() if sid not in en_catalogo]
+    for i in range(0, len(sobrantes), TAMANO_LOTE_IDS):
+        lote = sobrantes[i:i + TAMANO_LOTE_IDS]
+        await sesion.execute(update(Sector).where(Sector.id.in_(lote)).values(activo=False))
+    return len(sobrantes)
+
+
+def generar_catalogo(n: int, zonas: int = 20, semilla: Optional[int] = None) -> List[dict]:
+    """Catálogo sintético de `n` sectores repartidos en `zonas` zonas (pruebas de escala)."""
+    rng = random.Random(semilla)
+    return [
+        dict(id=sector_id, nombre=f"Sector {sector_id:05d}", zona=f"Zona {rng.randint(1, zonas):02d}", activo=True)
+        for sector_id in range(1, n + 1)
+    ]
+
+
+# ─────────────────────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────────────────────
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Genera o valida un catálogo de sectores.")
+    parser.add_argument("--generar", type=int, default=None, help="genera un catálogo sintético de N sectores")
+    parser.add_argument("--zonas", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--salida", type=Path, default=None, help="archivo .csv o .json (por defecto, stdout en CSV)")
+    parser.add_argument("--validar", type=Path, default=None, help="lee un catálogo y reporta sectores y zonas")
+    args = parser.parse_args(argv)
+
+    if args.validar:
+        sectores = cargar_catalogo(args.validar)
+        zonas = {s["zona"] for s in sectores}
+        activos = sum(s["activo"] for s in sectores)
+        print(f"[catalogo] {len(sectores)} sectores ({activos} activos) en {len(zonas)} zonas")
+        return
+    if args.generar is None:
+        parser.error("usa --generar N o --validar RUTA")
+
+    sectores = generar_catalogo(args.generar, args.zonas, args.semilla)
+    if args.salida and args.salida.suffix.lower() == ".json":
+        args.salida.write_text(json.dumps(sectores, ensure_ascii=False), encoding="utf-8")
+        return
+    archivo = args.salida.open("w", newline="", encoding="utf-8") if args.salida else None
+    try:
+        escritor = csv.DictWriter(archivo or sys.stdout, fieldnames=["id", "nombre", "zona", "activo"])
+        escritor.writeheader()
+        escritor.writerows(dict(s, activo=int(s["activo"])) for s in sectores)
+    finally:
+        if archivo:
+            archivo.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# app/services/deltas.py
+import asyncio
+import json
+import secrets
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+CAPACIDAD_DIARIO = 360       # deltas retenidos para reanudar (~1h a 10 s por tick)
+
+
+class DiarioDeltas:
+    """
+    Cambios del tablero (tarjetas de sector, alertas, KPIs) versionados.
+
+    Cada delta se calcula y serializa una sola vez y lo comparten todos los
+    clientes WebSocket:
+      - version: entero monótono; cada delta lleva `version` y `base` (= version - 1).
+      - epoca: identifica este proceso; versiones de otra época no se reanudan.
+      - anillo: últimos `capacidad` deltas ya serializados.
+    Un cliente que reconecta con una versión todavía en el anillo recibe sólo
+    lo que le falta; si no, una instantánea completa. Aplicar un delta dos
+    veces no cambia el resultado (tarjetas y alertas se reemplazan por id).
+    """
+
+    def __init__(self, capacidad: int = CAPACIDAD_DIARIO):
+        self.epoca = secrets.token_hex(4)
+        self.version = 0
+        self._anillo: Deque[Tuple[int, str]] = deque(maxlen=capacidad)
+        self._tarjetas: Dict[int, dict] = {}
+        self._senal = asyncio.Event()
+        self.clientes = 0
+
+    # ─────────────────────────────────────────────────────────
+    # Cálculo de cambios
+    # ─────────────────────────────────────────────────────────
+    def cambios_tarjetas(self, tarjetas: List[dict]) -> Tuple[List[dict], List[int]]:
+        """(tarjetas nuevas o con valores distintos, ids de sectores que ya no están)."""
+        cambiadas = [t for t in tarjetas if self._tarjetas.get(t["id"]) != t]
+        nuevas = {t["id"]: t for t in tarjetas}
+        retiradas = [sid for sid in self._tarjetas if sid not in nuevas]
+        self._tarjetas = nuevas
+        return cambiadas, retiradas
+
+    def ajustar_tarjeta(self, sector_id: int, **campos) -> Optional[dict]:
+        """Actualiza campos de una tarjeta conocida fuera del tick (p. ej. tras un ACK)."""
+        tarjeta = self._tarjetas.get(sector_id)
+        if tarjeta is None:
+            return None
+        tarjeta = {**tarjeta, **campos}
+        self._tarjetas[sector_id] = tarjeta
+        return tarjeta
+
+    # ─────────────────────────────────────────────────────────
+    # Publicación
+    # ─────────────────────────────────────────────────────────
+    def _despertar(self) -> None:
+        senal, self._senal = self._senal, asyncio.Event()
+        senal.set()
+
+    def publicar(self, payload: dict) -> int:
+        self.version += 1
+        trama = json.dumps({
+            "type": "delta",
+            "epoca": self.epoca,
+            "version": self.version,
+            "base": self.version - 1,
+            "payload": payload,
+        }, default=str)
+        self._anillo.append((self.version, trama))
+        self._despertar()
+        return self.version
+
+    def invalidar(self) -> None:
+        """Corta la continuidad (p. ej. tras un backfill): todos piden instantánea."""
+        self._anillo.clear()
+        self._tarjetas = {}
+        self.version += 1
+        self._despertar()
+
+    # ─────────────────────────────────────────────────────────
+    # Lectura por cliente
+    # ─────────────────────────────────────────────────────────
+    def reanudable(self, desde: Optional[int], epoca: Optional[str]) -> bool:
+        return desde is not None and epoca == self.epoca and self.pendientes(desde) is not None
+
+    def pendientes(self, desde: int) -> Optional[List[str]]:
+        """Deltas posteriores a `desde`, o None si ya no están en el anillo."""
+        if desde == self.version:
+            return []
+        if desde > self.version or not self._anillo or self._anillo[0][0] > desde + 1:
+            return None
+        return [trama for version, trama in self._anillo if version > desde]
+
+    async def esperar(self, version: int, espera: float) -> bool:
+        """Espera una versión posterior a `version`; False si pasan `espera` segundos."""
+        senal = self._senal
+        if self.version != version:
+            return True
+        try:
+            await asyncio.wait_for(senal.wait(), timeout=espera)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def metricas(self) -> dict:
+        return dict(
+            epoca=self.epoca,
+            version=self.version,
+            clientes=self.clientes,
+            deltas_retenidos=len(self._anillo),
+            reanudable_desde=self._anillo[0][0] - 1 if self._anillo else self.version,
+        )
@@ -0,0 +1,146 @@
+# app/services/enfriamientos.py
+"""
+Enfriamiento de alertas por (sector_id, tipo): cada clave guarda cuándo
+vence y un montículo ordenado por vencimiento las expira a medida que pasa
+el tiempo del tick. La memoria es proporcional a los enfriamientos vigentes
+(no a sectores × reglas) y tiene un tope: si se llena, se descarta la clave
+que vencería primero.
+
+El líder guarda una instantánea en disco en cada punto de control de la
+simulación y al detenerse, y la lee al arrancar: un reinicio o un relevo
+de líder no abre de nuevo las alertas que seguían en enfriamiento.
+
+    SAPAL_ENFRIAMIENTOS_PATH=/ruta/enfriamientos.json   (por defecto, junto a app.db)
+    SAPAL_ENFRIAMIENTOS_MAX=100000
+"""
+import asyncio
+import heapq
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from ..db import DB_PATH
+
+RUTA_INSTANTANEA = Path(
+    os.environ.get("SAPAL_ENFRIAMIENTOS_PATH", DB_PATH.with_name(DB_PATH.name + ".enfriamientos.json"))
+)
+MAX_ENTRADAS = int(os.environ.get("SAPAL_ENFRIAMIENTOS_MAX", "100000"))
+VERSION_INSTANTANEA = 1
+
+Clave = Tuple[int, str]
+
+
+def _epoca(ts: datetime) -> float:
+    return (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class RegistroEnfriamientos:
+    """
+    Vencimientos por clave + montículo de (vence, sector_id, tipo).
+
+    Invariante: cada clave vigente tiene exactamente una entrada en el
+    montículo. `puede_emitir` primero expira lo vencido, así una clave sólo
+    se vuelve a insertar cuando su entrada anterior ya salió.
+    """
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self._vence: Dict[Clave, float] = {}
+        self._monticulo: List[Tuple[float, int, str]] = []
+        self.expiradas = 0
+        self.desalojadas = 0
+        self.instantaneas = 0
+        self.ultima_instantanea_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self._vence)
+
+    def limpiar(self) -> None:
+        self._vence.clear()
+        self._monticulo.clear()
+
+    def _expirar(self, ahora: float) -> None:
+        monticulo = self._monticulo
+        while monticulo and monticulo[0][0] <= ahora:
+            _, sector_id, tipo = heapq.heappop(monticulo)
+            del self._vence[(sector_id, tipo)]
+            self.expiradas += 1
+
+    def _insertar(self, sector_id: int, tipo: str, vence: float) -> None:
+        if len(self._vence) >= self.max_entradas:
+            # lleno: se pierde el enfriamiento más próximo a vencer (el de menos valor)
+            _, sid, t = heapq.heappop(self._monticulo)
+            del self._vence[(sid, t)]
+            self.desalojadas += 1
+        self._vence[(sector_id, tipo)] = vence
+        heapq.heappush(self._monticulo, (vence, sector_id, tipo))
+
+    def puede_emitir(self, sector_id: int, tipo: str, ahora: datetime, enfriamiento_min: float) -> bool:
+        """True (y abre el enfriamiento) si (sector, tipo) no está enfriándose en `ahora`."""
+        momento = _epoca(ahora)
+        self._expirar(momento)
+        if (sector_id, tipo) in self._vence:
+            return False
+        self._insertar(sector_id, tipo, momento + enfriamiento_min * 60)
+        return True
+
+    # ─────────────────────────────────────────────────────────
+    # Instantáneas en disco
+    # ─────────────────────────────────────────────────────────
+    async def guardar(self, ruta: Path = RUTA_INSTANTANEA) -> None:
+        """Copia las entradas y las escribe en un hilo (archivo temporal + rename)."""
+        datos = dict(
+            version=VERSION_INSTANTANEA,
+            entradas=[[sector_id, tipo, vence] for (sector_id, tipo), vence in self._vence.items()],
+        )
+        inicio = time.perf_counter()
+        await asyncio.to_thread(_escribir, ruta, datos)
+        self.instantaneas += 1
+        self.ultima_instantanea_ms = (time.perf_counter() - inicio) * 1000
+
+    def cargar(self, ahora: datetime, ruta: Path = RUTA_INSTANTANEA) -> int:
+        """
+        Reemplaza el contenido por la instantánea (sin lo ya vencido en `ahora`);
+        devuelve cuántas claves quedaron. Sin archivo, o ilegible, empieza vacío.
+        """
+        self.limpiar()
+        try:
+            datos = json.loads(ruta.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as exc:
+            print(f"[ERROR] Instantánea de enfriamientos ilegible ({ruta}), se ignora: {exc!r}")
+            return 0
+        if not isinstance(datos, dict) or datos.get("version") != VERSION_INSTANTANEA:
+            return 0
+        momento = _epoca(ahora)
+        try:
+            entradas = [(float(vence), int(sector_id), str(tipo)) for sector_id, tipo, vence in datos["entradas"]]
+        except (KeyError, TypeError, ValueError) as exc:
+            print(f"[ERROR] Instantánea de enfriamientos con entradas inválidas ({ruta}), se ignora: {exc!r}")
+            return 0
+        # con un tope menor, se quedan las que vencen más tarde
+        vigentes = sorted(e for e in entradas if e[0] > momento)[-self.max_entradas:]
+        for vence, sector_id, tipo in vigentes:
+            self._vence[(sector_id, tipo)] = vence
+        self._monticulo = vigentes  # una lista ordenada ya es un montículo
+        return len(self._vence)
+
+    def metricas(self) -> dict:
+        return dict(
+            entradas=len(self._vence),
+            max_entradas=self.max_entradas,
+            expiradas=self.expiradas,
+            desalojadas=self.desalojadas,
+            instantaneas=self.instantaneas,
+            ultima_instantanea_ms=round(self.ultima_instantanea_ms, 2),
+        )
+
+
+def _escribir(ruta: Path, datos: dict) -> None:
+    temporal = ruta.with_suffix(ruta.suffix + ".tmp")
+    temporal.write_text(json.dumps(datos, separators=(",", ":")), encoding="utf-8")
+    os.replace(temporal, ruta)
@@ -0,0 +1,226 @@
+# app/services/escritor.py
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, NamedTuple, Optional
+
+from sqlalchemy import insert
+
+from ..db import SessionLocal
+from ..models import Alert, Reading
+from . import rollups
+from .metricas import TICK_FASES
+
+CAPACIDAD_COLA = 1000        # ticks pendientes antes de frenar al simulador
+MAX_FILAS_LOTE = 50_000      # lecturas por transacción
+MAX_ESPERA_SEGUNDOS = 0.5    # edad máxima del primer tick de un lote antes de escribirlo
+REINTENTOS = 3               # reintentos de un lote fallido (p. ej. "database is locked")
+ESPERA_REINTENTO_SEGUNDOS = 0.5  # se duplica en cada reintento
+
+
+class TickPendiente(NamedTuple):
+    instante: object          # datetime del tick
+    filas: List[dict]         # lecturas (dicts de Reading)
+    alertas: List[Alert]      # ya deduplicadas; reciben `id` al confirmar
+    eficiencia: float         # promedio global del tick (KPIs)
+    encolado_en: float        # time.monotonic() al encolar
+
+
+class EscritorDiferido:
+    """
+    Etapa write-behind entre el bucle de simulación y SQLite.
+
+    El bucle encola cada tick y sigue; una tarea aparte junta ticks y los
+    escribe en una sola transacción (INSERT masivos de Reading y Alert +
+    rollups) cuando el lote llega a `max_filas` o su primer tick cumple
+    `max_espera` segundos. Tras cada commit llama a `al_confirmar(ticks)`
+    (eventos, KPIs, deltas). La cola es acotada: si SQLite no da abasto,
+    `encolar` espera en vez de crecer sin límite.
+
+    Un lote que falla se reintenta con espera creciente; si sigue fallando se
+    descarta, se avisa con `al_descartar(ticks)` (p. ej. para desmarcar sus
+    alertas abiertas) y el escritor sigue con el siguiente.
+    """
+
+    def __init__(
+        self,
+        capacidad: int = CAPACIDAD_COLA,
+        max_filas: int = MAX_FILAS_LOTE,
+        max_espera: float = MAX_ESPERA_SEGUNDOS,
+        reintentos: int = REINTENTOS,
+        espera_reintento: float = ESPERA_REINTENTO_SEGUNDOS,
+    ):
+        self.max_filas = max_filas
+        self.max_espera = max_espera
+        self.reintentos = reintentos
+        self.espera_reintento = espera_reintento
+        self._cola: "asyncio.Queue[Optional[TickPendiente]]" = asyncio.Queue(maxsize=capacidad)
+        self._tarea: Optional[asyncio.Task] = None
+        self._al_confirmar: Optional[Callable[[List[TickPendiente]], Awaitable[None]]] = None
+        self._al_descartar: Optional[Callable[[List[TickPendiente]], None]] = None
+        self._encolados: Deque[float] = deque()  # instantes de encolado aún sin escribir
+        self.lotes = 0
+        self.ticks_escritos = 0
+        self.filas_escritas = 0
+        self.alertas_escritas = 0
+        self.reintentos_hechos = 0
+        self.lotes_descartados = 0
+        self.ticks_descartados = 0
+        self.ultimo_lote_ticks = 0
+        self.ultimo_commit_ms = 0.0
+        self.ultimo_retraso_s = 0.0
+        self.max_retraso_s = 0.0
+
+    # ─────────────────────────────────────────────────────────
+    # Ciclo de vida
+    # ─────────────────────────────────────────────────────────
+    def iniciar(
+        self,
+        al_confirmar: Callable[[List[TickPendiente]], Awaitable[None]],
+        al_descartar: Optional[Callable[[List[TickPendiente]], None]] = None,
+    ) -> None:
+        if self._tarea is not None and not self._tarea.done():
+            return
+        self._al_confirmar = al_confirmar
+        self._al_descartar = al_descartar
+        self._tarea = asyncio.create_task(self._drenar())
+
+    async def detener(self) -> None:
+        """Escribe lo pendiente y termina la tarea escritora."""
+        if self._tarea is None or self._tarea.done():
+            return
+        await self._cola.put(None)
+        await self._tarea
+        self._tarea = None
+
+    # ─────────────────────────────────────────────────────────
+    # Productor
+    # ─────────────────────────────────────────────────────────
+    async def encolar(self, instante, filas: List[dict], alertas: List[Alert], eficiencia: float) -> None:
+        if self._tarea is None or self._tarea.done():
+            if self._tarea is not None and not self._tarea.cancelled() and self._tarea.exception():
+                raise self._tarea.exception()
+            raise RuntimeError("El escritor diferido no está corriendo")
+        encolado_en = time.monotonic()
+        await self._cola.put(TickPendiente(instante, filas, alertas, eficiencia, encolado_en))
+        self._encolados.append(encolado_en)
+
+    # ─────────────────────────────────────────────────────────
+    # Consumidor
+    # ─────────────────────────────────────────────────────────
+    async def _drenar(self) -> None:
+        loop = asyncio.get_running_loop()
+        terminar = False
+        while not terminar:
+            primero = await self._cola.get()
+            if primero is None:
+                break
+            lote = [primero]
+            filas = len(primero.filas)
+            limite = loop.time() + self.max_espera
+            while filas < self.max_filas:
+                restante = limite - loop.time()
+                try:
+                    if restante <= 0:
+                        siguiente = self._cola.get_nowait()  # vencido: sólo lo que ya esté en cola
+                    else:
+                        siguiente = await asyncio.wait_for(self._cola.get(), restante)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if siguiente is None:
+                    terminar = True
+                    break
+                lote.append(siguiente)
+                filas += len(siguiente.filas)
+            await self._escribir(lote)
+
+    @staticmethod
+    async def _transaccion(filas: List[dict], alertas: List[Alert]) -> None:
+        async with SessionLocal() as sesion:
+            async with sesion.begin():
+                if filas:
+                    await sesion.execute(insert(Reading), filas)
+                    await rollups.actualizar_rollups(sesion, filas)
+                if alertas:
+                    # sort_by_parameter_order: los ids vuelven en el orden de `alertas`
+                    res = await sesion.execute(
+                        insert(Alert).returning(Alert.id, sort_by_parameter_order=True),
+                        [alerta.model_dump(exclude={"id"}) for alerta in alertas],
+                    )
+                    for alerta, id_alerta in zip(alertas, res.scalars().all()):
+                        alerta.id = id_alerta
+
+    def _descartar(self, lote: List[TickPendiente], exc: Exception) -> None:
+        for _ in lote:
+            self._encolados.popleft()
+        self.lotes_descartados += 1
+        self.ticks_descartados += len(lote)
+        print(f"[ERROR] Escritor diferido: se descarta un lote de {len(lote)} ticks tras {self.reintentos} reintentos: {exc!r}")
+        if self._al_descartar is not None:
+            try:
+                self._al_descartar(lote)
+            except Exception as error:
+                print(f"[ERROR] Descarte del escritor diferido: {error!r}")
+
+    async def _escribir(self, lote: List[TickPendiente]) -> None:
+        filas = [fila for tick in lote for fila in tick.filas]
+        alertas = [alerta for tick in lote for alerta in tick.alertas]
+        inicio = time.monotonic()
+        intento = 0
+        while True:
+            try:
+                await self._transaccion(filas, alertas)
+                break
+            except Exception as exc:  # p. ej. "database is locked" más allá de busy_timeout
+                for alerta in alertas:
+                    alerta.id = None  # la transacción se deshizo: ningún id es válido
+                if intento >= self.reintentos:
+                    self._descartar(lote, exc)
+                    return
+                espera = self.espera_reintento * 2 ** intento
+                intento += 1
+                self.reintentos_hechos += 1
+                print(f"[ERROR] Escritor diferido: falló un lote de {len(lote)} ticks ({exc!r}); reintento {intento} en {espera:g} s")
+                await asyncio.sleep(espera)
+        fin = time.monotonic()
+        TICK_FASES.observar(fin - inicio, "escritura")
+        for _ in lote:
+            self._encolados.popleft()
+
+        self.lotes += 1
+        self.ticks_escritos += len(lote)
+        self.filas_escritas += len(filas)
+        self.alertas_escritas += len(alertas)
+        self.ultimo_lote_ticks = len(lote)
+        self.ultimo_commit_ms = (fin - inicio) * 1000
+        self.ultimo_retraso_s = fin - lote[0].encolado_en
+        self.max_retraso_s = max(self.max_retraso_s, self.ultimo_retraso_s)
+
+        if self._al_confirmar is not None:
+            try:
+                await self._al_confirmar(lote)
+            except Exception as exc:  # lo escrito ya está confirmado: no detener al escritor
+                print(f"[ERROR] Post-commit del escritor diferido: {exc!r}")
+
+    # ─────────────────────────────────────────────────────────
+    # Métricas
+    # ─────────────────────────────────────────────────────────
+    def metricas(self) -> dict:
+        ahora = time.monotonic()
+        return dict(
+            corriendo=self._tarea is not None and not self._tarea.done(),
+            profundidad_cola=self._cola.qsize(),
+            capacidad_cola=self._cola.maxsize,
+            retraso_pendiente_s=round(ahora - self._encolados[0], 3) if self._encolados else 0.0,
+            lotes=self.lotes,
+            ticks_escritos=self.ticks_escritos,
+            filas_escritas=self.filas_escritas,
+            alertas_escritas=self.alertas_escritas,
+            reintentos=self.reintentos_hechos,
+            lotes_descartados=self.lotes_descartados,
+            ticks_descartados=self.ticks_descartados,
+            ultimo_lote_ticks=self.ultimo_lote_ticks,
+            ultimo_commit_ms=round(self.ultimo_commit_ms, 2),
+            ultimo_retraso_s=round(self.ultimo_retraso_s, 3),
+            max_retraso_s=round(self.max_retraso_s, 3),
+        )
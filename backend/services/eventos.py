@@ -0,0 +1,112 @@
+# app/services/eventos.py
+import asyncio
+import json
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Iterator, Optional
+
+CAPACIDAD_COLA = 64          # eventos no-tick pendientes por cliente
+MAX_SUSCRIPTORES = 5000      # conexiones SSE simultáneas por proceso
+LATIDO_SEGUNDOS = 15.0       # comentario SSE para detectar desconexiones en silencio
+
+
+def trama_sse(evento: dict) -> str:
+    """Serializa un evento como trama SSE (una sola vez, se comparte entre clientes)."""
+    return f"data: {json.dumps(evento)}\n\n"
+
+
+class Suscriptor:
+    """
+    Buzón acotado de un cliente SSE.
+    - Ticks: se coalescen; sólo se guarda el más reciente.
+    - Otros eventos (alertas): cola de `capacidad` tramas; si se llena se
+      descarta la más antigua (drop-oldest).
+    La memoria por cliente queda acotada aunque el cliente sea lento.
+    """
+
+    def __init__(self, capacidad: int = CAPACIDAD_COLA):
+        self._tramas: Deque[str] = deque(maxlen=capacidad)
+        self._tick: Optional[str] = None
+        self._senal = asyncio.Event()
+        self.descartados = 0
+        self.coalescidos = 0
+
+    def publicar(self, tipo: str, trama: str) -> None:
+        if tipo == "tick":
+            if self._tick is not None:
+                self.coalescidos += 1
+            self._tick = trama
+        else:
+            if len(self._tramas) == self._tramas.maxlen:
+                self.descartados += 1
+            self._tramas.append(trama)
+        self._senal.set()
+
+    async def siguiente(self, espera: float) -> Optional[str]:
+        """Siguiente trama pendiente, o None si pasan `espera` segundos sin eventos."""
+        if not self._tramas and self._tick is None:
+            self._senal.clear()
+            try:
+                await asyncio.wait_for(self._senal.wait(), timeout=espera)
+            except asyncio.TimeoutError:
+                return None
+        if self._tramas:
+            return self._tramas.popleft()
+        trama, self._tick = self._tick, None
+        return trama
+
+
+class DifusorEventos:
+    """Reparte eventos a todos los suscriptores y lleva métricas del stream."""
+
+    def __init__(self, max_suscriptores: int = MAX_SUSCRIPTORES):
+        self.max_suscriptores = max_suscriptores
+        self._suscriptores: "set[Suscriptor]" = set()
+        self.publicados = 0
+        self.conexiones_totales = 0
+        self.rechazados = 0
+        self._descartados_cerrados = 0
+        self._coalescidos_cerrados = 0
+
+    def __len__(self) -> int:
+        return len(self._suscriptores)
+
+    def admite(self) -> bool:
+        """¿Hay cupo para otro cliente? Cuenta el rechazo si no lo hay."""
+        if len(self._suscriptores) >= self.max_suscriptores:
+            self.rechazados += 1
+            return False
+        return True
+
+    def publicar(self, evento: dict) -> None:
+        if not self._suscriptores:
+            return
+        tipo = evento.get("type", "")
+        trama = trama_sse(evento)
+        for suscriptor in self._suscriptores:
+            suscriptor.publicar(tipo, trama)
+        self.publicados += 1
+
+    @contextmanager
+    def suscripcion(self, capacidad: int = CAPACIDAD_COLA) -> Iterator[Suscriptor]:
+        suscriptor = Suscriptor(capacidad)
+        self._suscriptores.add(suscriptor)
+        self.conexiones_totales += 1
+        try:
+            yield suscriptor
+        finally:
+            self._suscriptores.discard(suscriptor)
+            self._descartados_cerrados += suscriptor.descartados
+            self._coalescidos_cerrados += suscriptor.coalescidos
+
+    def metricas(self) -> dict:
+        activos = list(self._suscriptores)
+        return dict(
+            suscriptores=len(activos),
+            max_suscriptores=self.max_suscriptores,
+            conexiones_totales=self.conexiones_totales,
+            rechazados=self.rechazados,
+            eventos_publicados=self.publicados,
+            eventos_descartados=self._descartados_cerrados + sum(s.descartados for s in activos),
+            ticks_coalescidos=self._coalescidos_cerrados + sum(s.coalescidos for s in activos),
+        )
@@ -0,0 +1,127 @@
+# app/services/kpis.py
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Optional, Tuple
+
+from sqlalchemy import func, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from ..models import Alert, Reading
+from .alertas_abiertas import IndiceAlertasAbiertas
+
+PUNTOS_TENDENCIA = 16      # ticks en la tendencia global de eficiencia
+VENTANA_ATENCIONES = timedelta(hours=24)
+TIEMPO_DECISION_MIN = 12
+
+
+def _utc(ts: datetime) -> datetime:
+    """SQLite devuelve datetimes sin zona; todo lo guardado es UTC."""
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _consulta_tendencia(puntos: int = PUNTOS_TENDENCIA):
+    """
+    Eficiencia promedio global de los últimos `puntos` ticks (ts distintos).
+    Los ts salen por salto de índice (CTE recursiva: max(ts), luego el max
+    anterior a ese, ...): `puntos` búsquedas en ix_reading_ts en vez de
+    recorrer el índice con DISTINCT.
+    """
+    ultimo = select(func.max(Reading.ts).label("ts"), literal(1).label("n")).cte("ultimos_ts", recursive=True)
+    anterior = select(func.max(Reading.ts)).where(Reading.ts < ultimo.c.ts).scalar_subquery()
+    ultimo = ultimo.union_all(
+        select(anterior, ultimo.c.n + 1).where(ultimo.c.ts.is_not(None), ultimo.c.n < puntos)
+    )
+    ultimos_ts = select(ultimo.c.ts).where(ultimo.c.ts.is_not(None))
+    return (
+        select(Reading.ts, func.avg(Reading.eficiencia))
+        .where(Reading.ts.in_(ultimos_ts))
+        .group_by(Reading.ts)
+        .order_by(Reading.ts)
+    )
+
+
+def _consulta_atenciones_desde(desde: datetime):
+    return (
+        select(Alert.atendida_en)
+        .where(Alert.estado == "atendida", Alert.atendida_en >= desde)
+        .order_by(Alert.atendida_en)
+    )
+
+
+class EstadoKPIs:
+    """
+    KPIs del encabezado mantenidos en memoria por el bucle de simulación:
+      - tendencia: buffer circular (ts, eficiencia promedio global) por tick.
+      - sectores_en_riesgo: se lee del índice de alertas abiertas compartido.
+      - atenciones: instantes de ACK (ascendentes), recortados a 24h al leer.
+    Leer (`instantanea`) es O(1) amortizado y nunca toca SQLite.
+    """
+
+    def __init__(self, abiertas: IndiceAlertasAbiertas, puntos_tendencia: int = PUNTOS_TENDENCIA):
+        self.tendencia: Deque[Tuple[datetime, float]] = deque(maxlen=puntos_tendencia)
+        self.abiertas = abiertas
+        self.atenciones: Deque[datetime] = deque()
+        self.listo = False
+
+    # ─────────────────────────────────────────────────────────
+    # Actualizaciones incrementales
+    # ─────────────────────────────────────────────────────────
+    def registrar_tick(self, ts: datetime, eficiencia_promedio: float) -> None:
+        self.tendencia.append((_utc(ts), eficiencia_promedio))
+
+    def registrar_atencion(self, ts: datetime) -> None:
+        """Una alerta abierta pasó a 'atendida' en `ts`."""
+        self.atenciones.append(_utc(ts))
+
+    def _recortar_atenciones(self, ahora: datetime) -> None:
+        limite = ahora - VENTANA_ATENCIONES
+        while self.atenciones and self.atenciones[0] < limite:
+            self.atenciones.popleft()
+
+    # ─────────────────────────────────────────────────────────
+    # Lectura
+    # ─────────────────────────────────────────────────────────
+    def atendidas_24h(self, ahora: Optional[datetime] = None) -> int:
+        """ACKs dentro de la ventana; baja sola cuando un ACK cumple 24h (sin tick ni ACK nuevo)."""
+        self._recortar_atenciones(ahora or datetime.now(timezone.utc))
+        return len(self.atenciones)
+
+    def instantanea(self, ahora: Optional[datetime] = None) -> dict:
+        ahora = ahora or datetime.now(timezone.utc)
+        self._recortar_atenciones(ahora)
+        if not self.tendencia:
+            return dict(
+                ts=ahora.isoformat(),
+                eficiencia=1.0,
+                eficiencia_trend=[1.0],
+                sectores_en_riesgo=self.abiertas.sectores_en_riesgo,
+                alertas_atendidas_24h=len(self.atenciones),
+                tiempo_decision_min=TIEMPO_DECISION_MIN,
+            )
+        ts_reciente, eficiencia = self.tendencia[-1]
+        return dict(
+            ts=ts_reciente.isoformat(),
+            eficiencia=eficiencia,
+            eficiencia_trend=[valor for _, valor in self.tendencia],
+            sectores_en_riesgo=self.abiertas.sectores_en_riesgo,
+            alertas_atendidas_24h=len(self.atenciones),
+            tiempo_decision_min=TIEMPO_DECISION_MIN,
+        )
+
+    # ─────────────────────────────────────────────────────────
+    # Reconstrucción desde DB (arranque)
+    # ─────────────────────────────────────────────────────────
+    async def reconstruir(self, sesion: AsyncSession, ahora: Optional[datetime] = None) -> None:
+        ahora = ahora or datetime.now(timezone.utc)
+
+        res = await sesion.execute(_consulta_tendencia(self.tendencia.maxlen))
+        tendencia = [(_utc(ts), float(prom)) for ts, prom in res.all()]
+
+        res = await sesion.execute(_consulta_atenciones_desde(ahora - VENTANA_ATENCIONES))
+        atenciones = [_utc(ts) for ts in res.scalars().all()]
+
+        self.tendencia.clear()
+        self.tendencia.extend(tendencia)
+        self.atenciones = deque(atenciones)
+        self.listo = True
@@ -0,0 +1,209 @@
+# app/services/liderazgo.py
+"""
+Un solo simulador entre varios workers de uvicorn.
+
+El worker que toma el candado exclusivo (`flock`) del archivo junto a app.db
+es el líder: corre la simulación y abre un socket Unix. Los demás son
+seguidores: se conectan al socket, reciben cada cambio de estado (ticks,
+alertas, ACKs) como una línea JSON y le mandan los suyos (ACKs hechos en su
+proceso) para que el líder los ordene y los reparta a todos. Si el líder
+muere, el candado se libera con el proceso y un seguidor toma su lugar.
+
+Sin `fcntl` (Windows) cada proceso se considera líder, como antes.
+"""
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - plataformas sin flock
+    fcntl = None
+
+REINTENTO_SEGUNDOS = 1.0
+MAX_BUFFER_SEGUIDOR = 8 * 1024 * 1024  # bytes sin leer antes de desconectar a un seguidor lento
+LIMITE_LINEA = 16 * 1024 * 1024
+
+Callback = Callable[[dict], Awaitable[None]]
+
+
+class Coordinador:
+    """Elección de líder por candado de archivo + canal de eventos por socket Unix."""
+
+    def __init__(
+        self,
+        ruta_candado: Path,
+        ruta_socket: Path,
+        al_ser_lider: Callable[[], Awaitable[None]],
+        al_recibir: Callback,
+        al_conectar: Callable[[], Awaitable[None]],
+    ):
+        self.ruta_candado = ruta_candado
+        self.ruta_socket = ruta_socket
+        self._al_ser_lider = al_ser_lider
+        self._al_recibir = al_recibir
+        self._al_conectar = al_conectar
+        self._fd: Optional[int] = None
+        self._servidor: Optional[asyncio.AbstractServer] = None
+        self._seguidores: Set[asyncio.StreamWriter] = set()
+        self._lider: Optional[asyncio.StreamWriter] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self.es_lider = False
+        self.fue_seguidor = False  # ya recibió cambios de otro líder (al tomar el relevo hay que recargar)
+        self.enviados = 0
+        self.recibidos = 0
+        self.desconectados_por_lentitud = 0
+        self.errores = 0
+
+    # ─────────────────────────────────────────────────────────
+    # Ciclo de vida
+    # ─────────────────────────────────────────────────────────
+    async def iniciar(self) -> None:
+        if fcntl is None:
+            self.es_lider = True
+            await self._al_ser_lider()
+            return
+        if self._tarea is None or self._tarea.done():
+            if await self._intentar_liderar():  # el primer intento, antes de atender peticiones
+                return
+            self._tarea = asyncio.create_task(self._ciclo())
+
+    async def detener(self) -> None:
+        if self._tarea is not None and not self._tarea.done():
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+        for escritor in list(self._seguidores) + ([self._lider] if self._lider else []):
+            escritor.close()
+        self._seguidores.clear()
+        self._lider = None
+        if self._servidor is not None:
+            self._servidor.close()
+            self._servidor = None
+            self.ruta_socket.unlink(missing_ok=True)
+        if self._fd is not None:
+            os.close(self._fd)  # libera el candado
+            self._fd = None
+        self.es_lider = False
+
+    def _tomar_candado(self) -> bool:
+        fd = os.open(self.ruta_candado, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    async def _intentar_liderar(self) -> bool:
+        if not self.es_lider:  # con el candado ya tomado sólo se reintenta `al_ser_lider`
+            if not self._tomar_candado():
+                return False
+            self.ruta_socket.unlink(missing_ok=True)  # socket huérfano de un líder anterior
+            self._servidor = await asyncio.start_unix_server(
+                self._atender_seguidor, path=str(self.ruta_socket), limit=LIMITE_LINEA
+            )
+            self.es_lider = True
+            print(f"[DEBUG] Worker {os.getpid()} es líder de la simulación")
+        await self._al_ser_lider()
+        return True
+
+    async def _seguir_al_lider(self) -> None:
+        try:
+            lector, escritor = await asyncio.open_unix_connection(str(self.ruta_socket), limit=LIMITE_LINEA)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return
+        self._lider = escritor
+        self.fue_seguidor = True
+        try:
+            await self._al_conectar()  # ponerse al día desde la DB antes de aplicar cambios
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break  # el líder cerró: intentar tomar el candado
+                self.recibidos += 1
+                await self._al_recibir(json.loads(linea))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._lider = None
+            escritor.close()
+
+    async def _ciclo(self) -> None:
+        """
+        Seguidor mientras haya líder; al caer la conexión intenta serlo.
+        Cualquier error (línea inválida, callback que falla) se registra y
+        el ciclo sigue: reconectar resincroniza desde la DB (`al_conectar`).
+        Sólo la cancelación lo termina.
+        """
+        while True:
+            try:
+                if await self._intentar_liderar():
+                    return
+                await self._seguir_al_lider()
+            except Exception as exc:
+                self.errores += 1
+                print(f"[ERROR] Coordinación (pid {os.getpid()}): {exc!r}")
+            await asyncio.sleep(REINTENTO_SEGUNDOS)
+
+    # ─────────────────────────────────────────────────────────
+    # Canal
+    # ─────────────────────────────────────────────────────────
+    async def _atender_seguidor(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter) -> None:
+        self._seguidores.add(escritor)
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                self.recibidos += 1
+                await self._al_recibir(json.loads(linea))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as exc:  # el seguidor se reconecta y se resincroniza
+            self.errores += 1
+            print(f"[ERROR] Coordinación, mensaje de un seguidor: {exc!r}")
+        finally:
+            self._seguidores.discard(escritor)
+            escritor.close()
+
+    def difundir(self, mensaje: dict) -> None:
+        """Líder → todos los seguidores (sin esperar). Un seguidor atascado se desconecta y se resincroniza."""
+        if not self._seguidores:
+            return
+        linea = (json.dumps(mensaje, default=str) + "\n").encode()
+        for escritor in list(self._seguidores):
+            if escritor.transport.get_write_buffer_size() > MAX_BUFFER_SEGUIDOR:
+                self.desconectados_por_lentitud += 1
+                self._seguidores.discard(escritor)
+                escritor.close()
+                continue
+            escritor.write(linea)
+            self.enviados += 1
+
+    def enviar_al_lider(self, mensaje: dict) -> bool:
+        """Seguidor → líder. False si no hay conexión (el cambio ya está en la DB)."""
+        if self._lider is None:
+            return False
+        self._lider.write((json.dumps(mensaje, default=str) + "\n").encode())
+        self.enviados += 1
+        return True
+
+    def metricas(self) -> dict:
+        return dict(
+            rol="lider" if self.es_lider else "seguidor",
+            pid=os.getpid(),
+            seguidores=len(self._seguidores),
+            conectado_al_lider=self._lider is not None,
+            mensajes_enviados=self.enviados,
+            mensajes_recibidos=self.recibidos,
+            desconectados_por_lentitud=self.desconectados_por_lentitud,
+            errores=self.errores,
+        )
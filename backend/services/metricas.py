@@ -0,0 +1,201 @@
+# app/services/metricas.py
+"""
+Instrumentación propia en formato de texto de Prometheus (sin agente ni
+dependencias): contadores e histogramas de cubetas fijas que cuestan un
+`bisect` y dos sumas por observación, más recolectores que leen al vuelo
+las métricas que ya llevan los servicios (escritor, SSE, caché, pools).
+
+Cada worker de uvicorn expone las suyas en `/metrics`; las del tick sólo
+avanzan en el líder de la simulación (etiqueta `rol` de `sapal_proceso`).
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+CUBETAS_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+# (nombre, tipo, ayuda, etiquetas, valor) — lo que devuelve un recolector
+Muestra = Tuple[str, str, str, Dict[str, str], float]
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(str(v))}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class Contador:
+    """Contador monótono con etiquetas posicionales."""
+
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *valores: str, n: float = 1) -> None:
+        self._valores[valores] = self._valores.get(valores, 0) + n
+
+    def lineas(self) -> Iterable[str]:
+        for valores, total in sorted(self._valores.items()):
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {_numero(total)}"
+
+
+class Histograma:
+    """Histograma de cubetas fijas (conteos por cubeta; se acumulan al exponer)."""
+
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Sequence[str] = (),
+        cubetas: Sequence[float] = CUBETAS_SEGUNDOS,
+    ):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.cubetas = tuple(cubetas)
+        self._series: Dict[Tuple[str, ...], list] = {}  # valores → [conteos..., suma, total]
+
+    def observar(self, valor: float, *valores: str) -> None:
+        serie = self._series.get(valores)
+        if serie is None:
+            serie = self._series[valores] = [0] * (len(self.cubetas) + 1) + [0.0, 0]
+        serie[bisect_left(self.cubetas, valor)] += 1  # primera cubeta con le >= valor (o +Inf)
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def lineas(self) -> Iterable[str]:
+        for valores, serie in sorted(self._series.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.cubetas + (float("inf"),), serie):
+                acumulado += conteo
+                le = f'le="{_numero(limite)}"'
+                yield f"{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, le)} {acumulado}"
+            yield f"{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {_numero(serie[-2])}"
+            yield f"{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {serie[-1]}"
+
+
+class Registro:
+    """Métricas propias + recolectores; `exposicion()` arma el texto de /metrics."""
+
+    def __init__(self):
+        self._metricas: List[Contador | Histograma] = []
+        self._recolectores: List[Callable[[], Iterable[Muestra]]] = []
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        metrica = Contador(nombre, ayuda, etiquetas)
+        self._metricas.append(metrica)
+        return metrica
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (), **kwargs) -> Histograma:
+        metrica = Histograma(nombre, ayuda, etiquetas, **kwargs)
+        self._metricas.append(metrica)
+        return metrica
+
+    def recolector(self, funcion: Callable[[], Iterable[Muestra]]) -> None:
+        self._recolectores.append(funcion)
+
+    def exposicion(self) -> str:
+        lineas: List[str] = []
+        for metrica in self._metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.lineas())
+        familias: Dict[str, Tuple[str, str, List[str]]] = {}
+        for recolectar in self._recolectores:
+            for nombre, tipo, ayuda, etiquetas, valor in recolectar():
+                familia = familias.setdefault(nombre, (tipo, ayuda, []))
+                familia[2].append(f"{nombre}{_etiquetas(list(etiquetas), list(etiquetas.values()))} {_numero(valor)}")
+        for nombre, (tipo, ayuda, muestras) in familias.items():
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            lineas.extend(muestras)
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRO = Registro()
+
+# ─────────────────────────────────────────────────────────────
+# Métricas de la simulación y de la API
+# ─────────────────────────────────────────────────────────────
+TICK_SEGUNDOS = REGISTRO.histograma(
+    "sapal_tick_segundos", "Duración del tick en el bucle (cómputo, deduplicación y encolado)",
+)
+TICK_RETRASO = REGISTRO.histograma(
+    "sapal_tick_retraso_segundos", "Retraso del arranque de cada tick respecto de su ranura del programador",
+)
+TICK_FASES = REGISTRO.histograma(
+    "sapal_tick_fase_segundos",
+    "Duración por fase: simulacion, reglas, deduplicacion, encolado (por tick); escritura y post_commit (por lote)",
+    ("fase",),
+)
+ALERTAS_EMITIDAS = REGISTRO.contador(
+    "sapal_alertas_emitidas_total", "Alertas nuevas encoladas para escribir", ("tipo",),
+)
+ALERTAS_SUPRIMIDAS = REGISTRO.contador(
+    "sapal_alertas_suprimidas_total",
+    "Candidatas descartadas: enfriamiento (_puedo_emitir) o ya abierta en el sector",
+    ("tipo", "motivo"),
+)
+LATENCIA_HTTP = REGISTRO.histograma(
+    "sapal_http_latencia_segundos",
+    "Tiempo hasta el inicio de la respuesta por ruta (plantilla), método y estado",
+    ("metodo", "ruta", "estado"),
+)
+
+
+class MiddlewareLatencia:
+    """
+    Middleware ASGI puro (sin BaseHTTPMiddleware): mide hasta
+    `http.response.start`, así un stream SSE cuenta su arranque y no su vida.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        inicio = time.perf_counter()
+        medido = False
+
+        def _observar(estado: int) -> None:
+            nonlocal medido
+            medido = True
+            ruta = scope.get("route")
+            LATENCIA_HTTP.observar(
+                time.perf_counter() - inicio,
+                scope["method"],
+                getattr(ruta, "path", "sin_ruta"),  # plantilla: cardinalidad acotada
+                str(estado),
+            )
+
+        async def _enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and not medido:
+                _observar(mensaje["status"])
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, _enviar)
+        except Exception:
+            if not medido:
+                _observar(500)
+            raise
@@ -0,0 +1,275 @@
+# app/services/motor.py
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .reglas import ReglaCompilada
+
+
+# Códigos de incidente (posición en TIPOS_INCIDENTE); -1 = sin incidente
+TIPOS_INCIDENTE = ("fuga", "sobrepresion", "baja_disponibilidad")
+_FUGA, _SOBREPRESION, _BAJA_DISPONIBILIDAD = 0, 1, 2
+_SIN_INCIDENTE = -1
+
+# Instantánea del estado (arranque en caliente): arreglos por sector
+VERSION_ESTADO = 1
+_CAMPOS_POR_SECTOR = (
+    "loss_base", "pressure_nom", "season_bias",
+    "ultimo_inyeccion", "ultimo_consumo", "ultimo_presion",
+    "inc_tipo", "inc_intensidad", "inc_hasta",
+    "media_eficiencia", "media_presion", "ventana_tendencia",
+)
+
+
+class MotorVectorial:
+    """
+    Motor de simulación "struct-of-arrays": guarda el estado de todos los
+    sectores en arreglos NumPy y produce un tick completo en una sola llamada.
+
+    Replica estadísticamente a `simular_lectura` + `evaluar_reglas_alertas`
+    (ruta escalar de referencia en services/sim.py):
+      - perfiles: loss_base, pressure_nom, season_bias por sector.
+      - procesos AR(1) de inyección, consumo y presión.
+      - incidentes: tipo, intensidad y vencimiento (epoch, segundos).
+      - EWMA de eficiencia y presión, y un conteo de histéresis por regla.
+
+    Las reglas llegan compiladas (services/reglas.py): cada una es una sola
+    operación vectorizada sobre el tick. El motor sólo calcula números;
+    construir `Alert` y aplicar el enfriamiento (`_puedo_emitir`) sigue siendo
+    responsabilidad de services/sim.py.
+
+    `guardar`/`cargar` vuelcan y recuperan todo ese estado (más el generador
+    aleatorio) en un .npz: un reinicio sigue con los mismos perfiles, EWMAs
+    ya convergidas e incidentes en curso.
+    """
+
+    def __init__(
+        self,
+        ids_sectores: Sequence[int],
+        *,
+        prob_incidente: float,
+        ticks_incidente: Tuple[int, int],
+        reglas: Sequence[ReglaCompilada],
+        alpha: float = 0.3,
+        semilla: Optional[int] = None,
+    ):
+        self.rng = np.random.default_rng(semilla)
+        self.ids = np.asarray(list(ids_sectores), dtype=np.int64)
+        n = len(self.ids)
+
+        self.prob_incidente = prob_incidente
+        self.ticks_incidente = ticks_incidente
+        self.reglas = list(reglas)
+        self.alpha = alpha
+
+        # Perfiles (mismos rangos que _crear_perfiles)
+        self.loss_base = self.rng.uniform(0.05, 0.12, n)
+        self.pressure_nom = self.rng.uniform(38.0, 42.0, n)
+        self.season_bias = self.rng.uniform(0.9, 1.1, n)
+
+        # Procesos AR(1): (coeficiente, desviación) y último valor sin recortar
+        self.ar_inyeccion = (0.7, 5.0)
+        self.ar_consumo = (0.7, 5.0)
+        self.ar_presion = (0.6, 1.5)
+        self.ultimo_inyeccion = np.full(n, 120.0)
+        self.ultimo_consumo = np.full(n, 110.0)
+        self.ultimo_presion = self.pressure_nom.copy()
+
+        # Incidentes
+        self.inc_tipo = np.full(n, _SIN_INCIDENTE, dtype=np.int8)
+        self.inc_intensidad = np.zeros(n)
+        self.inc_hasta = np.zeros(n)
+
+        # Reglas: EWMA (NaN = sin historia), histéresis por regla y ventana de tendencia
+        self.media_eficiencia = np.full(n, np.nan)
+        self.media_presion = np.full(n, np.nan)
+        self.conteos: Dict[str, np.ndarray] = {
+            regla.tipo: np.zeros(n, dtype=np.int32) for regla in self.reglas if regla.ventanas > 1
+        }
+        self.ventana_tendencia = np.full((n, 4), np.nan)
+        self._pos_tendencia = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ─────────────────────────────────────────────────────────
+    # Incidentes
+    # ─────────────────────────────────────────────────────────
+    def gestionar_incidentes(self, instante: datetime, intervalo: float) -> None:
+        """Cierra incidentes vencidos y levanta nuevos con prob. `prob_incidente`."""
+        t = instante.timestamp()
+        vencidos = (self.inc_tipo != _SIN_INCIDENTE) & (self.inc_hasta <= t)
+        self.inc_tipo[vencidos] = _SIN_INCIDENTE
+
+        libres = self.inc_tipo == _SIN_INCIDENTE
+        nuevos = np.flatnonzero(libres & (self.rng.random(len(self)) < self.prob_incidente))
+        if nuevos.size == 0:
+            return
+        k = nuevos.size
+        lo, hi = self.ticks_incidente
+        self.inc_tipo[nuevos] = self.rng.integers(0, len(TIPOS_INCIDENTE), k)
+        self.inc_intensidad[nuevos] = self.rng.uniform(0.5, 1.0, k)
+        self.inc_hasta[nuevos] = t + self.rng.integers(lo, hi + 1, k) * intervalo
+
+    # ─────────────────────────────────────────────────────────
+    # Lecturas
+    # ─────────────────────────────────────────────────────────
+    def _ar1(self, ultimo: np.ndarray, params: Tuple[float, float], objetivo: np.ndarray) -> np.ndarray:
+        coeficiente, desviacion = params
+        ultimo[:] = objetivo + coeficiente * (ultimo - objetivo) + self.rng.normal(0.0, desviacion, len(self))
+        return ultimo
+
+    def simular(self, instante: datetime, factor_estacional: float) -> Dict[str, np.ndarray]:
+        """Genera las lecturas del tick para todos los sectores (equivale a N `simular_lectura`)."""
+        n = len(self)
+        rng = self.rng
+        t = instante.timestamp()
+
+        demanda = 110.0 * factor_estacional * self.season_bias
+        loss_base = demanda * self.loss_base
+
+        activo = (self.inc_tipo != _SIN_INCIDENTE) & (self.inc_hasta > t)
+        inten = np.where(activo, self.inc_intensidad, 0.0)
+        fuga = activo & (self.inc_tipo == _FUGA)
+        baja = activo & (self.inc_tipo == _BAJA_DISPONIBILIDAD)
+        sobre = activo & (self.inc_tipo == _SOBREPRESION)
+
+        loss_extra = np.where(fuga, demanda * rng.uniform(0.08, 0.20, n) * inten, 0.0)
+        demanda_mod = np.where(baja, demanda * (1.0 - rng.uniform(0.10, 0.25, n) * inten), demanda)
+        presion_nominal = self.pressure_nom.copy()
+        if baja.any() or sobre.any():
+            ruido = rng.normal(0.0, 0.03, n)
+            presion_nominal = np.where(baja, self.pressure_nom * (0.80 + ruido), presion_nominal)
+            presion_nominal = np.where(sobre, self.pressure_nom * (1.25 + ruido), presion_nominal)
+
+        consumo_obj = np.maximum(0.001, demanda_mod * (1.0 + rng.normal(0.0, 0.02, n)))
+        perdida = np.maximum(0.0, loss_base + loss_extra)
+        inyeccion_obj = np.maximum(consumo_obj + perdida, 0.001)
+
+        inyeccion = np.maximum(0.0, self._ar1(self.ultimo_inyeccion, self.ar_inyeccion, inyeccion_obj))
+        consumo = np.maximum(0.001, self._ar1(self.ultimo_consumo, self.ar_consumo, consumo_obj))
+        presion = np.maximum(5.0, self._ar1(self.ultimo_presion, self.ar_presion, presion_nominal))
+
+        return dict(
+            sector_id=self.ids,
+            inyeccion_m3=inyeccion,
+            consumo_m3=consumo,
+            presion_psi=presion,
+            eficiencia=inyeccion / consumo,
+        )
+
+    @staticmethod
+    def filas(lecturas: Dict[str, np.ndarray], instante: datetime) -> List[dict]:
+        """Convierte un tick a filas (dicts) listas para un INSERT masivo de `Reading`."""
+        return [
+            dict(sector_id=s, ts=instante, inyeccion_m3=i, consumo_m3=c, presion_psi=p, eficiencia=e)
+            for s, i, c, p, e in zip(
+                lecturas["sector_id"].tolist(),
+                lecturas["inyeccion_m3"].tolist(),
+                lecturas["consumo_m3"].tolist(),
+                lecturas["presion_psi"].tolist(),
+                lecturas["eficiencia"].tolist(),
+            )
+        ]
+
+    # ─────────────────────────────────────────────────────────
+    # Reglas
+    # ─────────────────────────────────────────────────────────
+    def _actualizar_ewma(self, media: np.ndarray, valor: np.ndarray) -> np.ndarray:
+        media[:] = np.where(np.isnan(media), valor, self.alpha * valor + (1 - self.alpha) * media)
+        return media
+
+    def evaluar(self, lecturas: Dict[str, np.ndarray]) -> dict:
+        """
+        Actualiza EWMAs y ventana de tendencia, arma las características del
+        tick y evalúa cada regla (con su histéresis) de una vez para todos los
+        sectores. Devuelve `disparos` (tipo → índices de sector), `valores`
+        (tipo → valor de la expresión) y `caracteristicas`.
+        """
+        inyeccion = lecturas["inyeccion_m3"]
+        consumo = lecturas["consumo_m3"]
+        presion = lecturas["presion_psi"]
+
+        media_eficiencia = self._actualizar_ewma(self.media_eficiencia, lecturas["eficiencia"])
+        media_presion = self._actualizar_ewma(self.media_presion, presion)
+
+        eficiencia_operativa = consumo / np.maximum(inyeccion, 0.001)
+        self.ventana_tendencia[:, self._pos_tendencia] = eficiencia_operativa
+        self._pos_tendencia = (self._pos_tendencia + 1) % self.ventana_tendencia.shape[1]
+
+        caracteristicas = dict(
+            inyeccion_m3=inyeccion,
+            consumo_m3=consumo,
+            presion_psi=presion,
+            eficiencia=lecturas["eficiencia"],
+            eficiencia_operativa=eficiencia_operativa,
+            media_eficiencia=media_eficiencia,
+            media_presion=media_presion,
+        )
+        disparos: Dict[str, np.ndarray] = {}
+        valores: Dict[str, np.ndarray] = {}
+        for regla in self.reglas:
+            valor = regla.valor(caracteristicas)
+            cumple = regla.cumple(valor)
+            if regla.ventanas > 1:
+                # histéresis: si se cumple, suma; si no, baja 1 sin resetear en seco
+                conteo = self.conteos[regla.tipo]
+                conteo[:] = np.where(cumple, conteo + 1, np.maximum(0, conteo - 1))
+                cumple = conteo >= regla.ventanas
+            disparos[regla.tipo] = np.flatnonzero(cumple)
+            valores[regla.tipo] = valor
+        return dict(disparos=disparos, valores=valores, caracteristicas=caracteristicas)
+
+    # ─────────────────────────────────────────────────────────
+    # Instantánea (arranque en caliente)
+    # ─────────────────────────────────────────────────────────
+    def exportar_estado(self) -> Dict[str, np.ndarray]:
+        """Copia de todo el estado mutable, lista para `np.savez_compressed`."""
+        estado = {campo: getattr(self, campo).copy() for campo in _CAMPOS_POR_SECTOR}
+        estado.update({f"conteo__{tipo}": conteo.copy() for tipo, conteo in self.conteos.items()})
+        estado.update(
+            version=np.array(VERSION_ESTADO),
+            ids=self.ids.copy(),
+            pos_tendencia=np.array(self._pos_tendencia),
+            rng=np.array(json.dumps(self.rng.bit_generator.state)),
+        )
+        return estado
+
+    def restaurar_estado(self, estado: Mapping[str, np.ndarray]) -> int:
+        """
+        Copia el estado guardado a los sectores que siguen en el catálogo
+        (se alinean por id); los nuevos conservan su estado inicial y las
+        reglas nuevas empiezan su histéresis en cero. Devuelve cuántos
+        sectores se restauraron (0 si la versión no coincide).
+        """
+        if int(estado["version"]) != VERSION_ESTADO:
+            return 0
+        _, destino, origen = np.intersect1d(self.ids, estado["ids"], assume_unique=True, return_indices=True)
+        if destino.size == 0:
+            return 0
+        for campo in _CAMPOS_POR_SECTOR:
+            getattr(self, campo)[destino] = estado[campo][origen]
+        for tipo, conteo in self.conteos.items():
+            if f"conteo__{tipo}" in estado:
+                conteo[destino] = estado[f"conteo__{tipo}"][origen]
+        self._pos_tendencia = int(estado["pos_tendencia"])
+        self.rng.bit_generator.state = json.loads(str(estado["rng"]))
+        return int(destino.size)
+
+    def guardar(self, ruta: Path) -> None:
+        """Instantánea comprimida (archivo temporal + rename: nunca queda a medias)."""
+        temporal = ruta.with_suffix(ruta.suffix + ".tmp")
+        with temporal.open("wb") as archivo:
+            np.savez_compressed(archivo, **self.exportar_estado())
+        os.replace(temporal, ruta)
+
+    def cargar(self, ruta: Path) -> int:
+        """Restaura desde `ruta`; sin archivo, 0 (arranque en frío)."""
+        if not ruta.exists():
+            return 0
+        with np.load(ruta, allow_pickle=False) as estado:
+            return self.restaurar_estado(estado)
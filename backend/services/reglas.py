@@ -0,0 +1,203 @@
+# app/services/reglas.py
+"""
+Reglas de alerta como datos: cada regla es una expresión sobre las
+características del tick, un comparador y un umbral, con histéresis
+opcional, nivel y enfriamiento propios. Se leen de un JSON
+
+    SAPAL_REGLAS_ALERTAS=/ruta/reglas.json   (por defecto backend/reglas_alertas.json)
+
+y se compilan una vez: la expresión se valida contra una gramática mínima
+(aritmética, `abs`, `maximo`, `minimo`, números y características) y se
+evalúa con NumPy sobre los arreglos de todos los sectores. Agregar una regla
+cuesta una evaluación vectorizada más por tick, no un recorrido por sector.
+
+Claves de cada regla:
+    tipo          identificador de la alerta (único)
+    expresion     p. ej. "abs(presion_psi - media_presion) / media_presion"
+    comparador    ">", ">=", "<" o "<="
+    umbral        número
+    ventanas      1 = dispara con la lectura actual; N > 1 = histéresis (sube 1
+                  si se cumple, baja 1 si no; dispara con el conteo ≥ N)
+    nivel         "alta", "media" o "baja"
+    enfriamiento_min   minutos entre alertas del mismo (sector, tipo)
+    mensaje       plantilla; admite {umbral}, {umbral_pct} y {ventanas}
+    caracteristica     nombre para la explicación (por defecto, `tipo`)
+    detalle       {campo: expresión} para la explicación (por defecto, valor y umbral)
+
+Validar un archivo (desde la raíz del repo):
+    python -m backend.services.reglas --validar backend/reglas_alertas.json
+"""
+import argparse
+import ast
+import json
+import operator
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from ..db import BASE_DIR
+
+RUTA_REGLAS = Path(os.environ.get("SAPAL_REGLAS_ALERTAS", BASE_DIR / "reglas_alertas.json"))
+ENFRIAMIENTO_MIN_POR_DEFECTO = 15
+
+# Lo que el motor entrega por tick (un arreglo por sector)
+CARACTERISTICAS = (
+    "inyeccion_m3",
+    "consumo_m3",
+    "presion_psi",
+    "eficiencia",            # inyección / consumo (> 1 con pérdidas)
+    "eficiencia_operativa",  # consumo / inyección
+    "media_eficiencia",      # EWMA, incluye la lectura actual
+    "media_presion",         # EWMA, incluye la lectura actual
+)
+NIVELES = ("alta", "media", "baja")
+COMPARADORES: Dict[str, Callable[[np.ndarray, float], np.ndarray]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+_FUNCIONES = {"abs": np.abs, "maximo": np.maximum, "minimo": np.minimum}
+_ARIDAD = {"abs": 1, "maximo": 2, "minimo": 2}  # posicionales; más argumentos irían a `out=`
+_OPERADORES = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.USub, ast.UAdd)
+
+
+class ReglaCompilada(NamedTuple):
+    tipo: str
+    expresion: str
+    comparador: str
+    umbral: float
+    ventanas: int
+    nivel: str
+    enfriamiento_min: float
+    mensaje: str
+    caracteristica: str
+    valor: Callable[[Dict[str, np.ndarray]], np.ndarray]           # expresión compilada
+    detalle: Dict[str, Callable[[Dict[str, np.ndarray]], np.ndarray]]
+
+    def cumple(self, valor: np.ndarray) -> np.ndarray:
+        """Comparación vectorizada; NaN o ±inf (división por cero) nunca disparan."""
+        return np.isfinite(valor) & COMPARADORES[self.comparador](valor, self.umbral)
+
+
+def compilar_expresion(texto: str) -> Callable[[Dict[str, np.ndarray]], np.ndarray]:
+    """Valida la expresión nodo por nodo y la compila; ValueError si sale de la gramática."""
+    try:
+        arbol = ast.parse(texto, mode="eval")
+    except SyntaxError as exc:
+        raise ValueError(f"Expresión inválida {texto!r}: {exc.msg}") from exc
+    nodos = list(ast.walk(arbol))
+    llamadas = {id(n.func) for n in nodos if isinstance(n, ast.Call)}
+    usadas = set()
+    for nodo in nodos:
+        if isinstance(nodo, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Load) + _OPERADORES):
+            continue
+        if isinstance(nodo, ast.Constant) and isinstance(nodo.value, (int, float)) and not isinstance(nodo.value, bool):
+            continue
+        if isinstance(nodo, ast.Call):
+            funcion = nodo.func.id if isinstance(nodo.func, ast.Name) else None
+            if funcion not in _FUNCIONES:
+                raise ValueError(f"Expresión {texto!r}: sólo se puede llamar a {', '.join(_FUNCIONES)}")
+            if nodo.keywords or len(nodo.args) != _ARIDAD[funcion]:
+                raise ValueError(f"Expresión {texto!r}: {funcion} recibe {_ARIDAD[funcion]} argumento(s) posicional(es)")
+            continue  # el nombre de la función ya quedó validado
+        if isinstance(nodo, ast.Name) and id(nodo) in llamadas:
+            continue
+        if isinstance(nodo, ast.Name) and nodo.id in CARACTERISTICAS:
+            usadas.add(nodo.id)
+            continue
+        raise ValueError(f"Expresión {texto!r}: no se permite {ast.dump(nodo)[:60]}")
+    if not usadas:
+        raise ValueError(f"Expresión {texto!r}: debe usar al menos una característica ({', '.join(CARACTERISTICAS)})")
+    codigo = compile(arbol, f"<regla {texto}>", "eval")
+    espacio = {"__builtins__": {}, **_FUNCIONES}
+
+    def _evaluar(caracteristicas: Dict[str, np.ndarray]) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.asarray(eval(codigo, espacio, caracteristicas), dtype=float)
+
+    return _evaluar
+
+
+def compilar_regla(definicion: dict) -> ReglaCompilada:
+    """Una definición (dict del JSON) → regla lista para evaluar; ValueError si algo no cuadra."""
+    try:
+        tipo = str(definicion["tipo"])
+        expresion = str(definicion["expresion"])
+        comparador = str(definicion["comparador"])
+        umbral = float(definicion["umbral"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"Regla incompleta (tipo, expresion, comparador, umbral): {definicion!r}") from exc
+    if comparador not in COMPARADORES:
+        raise ValueError(f"Regla {tipo}: comparador {comparador!r} inválido (válidos: {' '.join(COMPARADORES)})")
+    nivel = definicion.get("nivel", "media")
+    if nivel not in NIVELES:
+        raise ValueError(f"Regla {tipo}: nivel {nivel!r} inválido (válidos: {', '.join(NIVELES)})")
+    ventanas = int(definicion.get("ventanas", 1))
+    if ventanas < 1:
+        raise ValueError(f"Regla {tipo}: 'ventanas' debe ser ≥ 1")
+    enfriamiento = float(definicion.get("enfriamiento_min", ENFRIAMIENTO_MIN_POR_DEFECTO))
+    plantilla = definicion.get("mensaje") or f"{tipo}: {expresion} {comparador} {{umbral}}"
+    mensaje = plantilla.format(umbral=umbral, umbral_pct=round(umbral * 100), ventanas=ventanas)
+    detalle = definicion.get("detalle") or {}
+    return ReglaCompilada(
+        tipo=tipo,
+        expresion=expresion,
+        comparador=comparador,
+        umbral=umbral,
+        ventanas=ventanas,
+        nivel=nivel,
+        enfriamiento_min=enfriamiento,
+        mensaje=mensaje,
+        caracteristica=definicion.get("caracteristica", tipo),
+        valor=compilar_expresion(expresion),
+        detalle={campo: compilar_expresion(str(texto)) for campo, texto in detalle.items()},
+    )
+
+
+def cargar_reglas(ruta: Path = RUTA_REGLAS) -> List[ReglaCompilada]:
+    """Lee y compila el archivo de reglas; ValueError si está vacío o repite tipos."""
+    datos = json.loads(ruta.read_text(encoding="utf-8"))
+    definiciones = datos["reglas"] if isinstance(datos, dict) else datos
+    reglas = [compilar_regla(d) for d in definiciones]
+    if not reglas:
+        raise ValueError(f"El archivo de reglas {ruta} está vacío")
+    if len({r.tipo for r in reglas}) != len(reglas):
+        raise ValueError(f"El archivo de reglas {ruta} repite tipos de alerta")
+    return reglas
+
+
+def explicaciones(
+    regla: ReglaCompilada,
+    valores: np.ndarray,
+    caracteristicas: Dict[str, np.ndarray],
+    indices: np.ndarray,
+) -> List[dict]:
+    """Detalle de cada alerta disparada (posiciones `indices`), para la columna `explicacion`."""
+    if regla.detalle:
+        campos = {campo: expresion(caracteristicas)[indices].tolist() for campo, expresion in regla.detalle.items()}
+    else:
+        campos = {"valor": valores[indices].tolist(), "umbral": [regla.umbral] * len(indices)}
+    base = {"base": "historial_propio", "caracteristica": regla.caracteristica}
+    return [dict(base, **{campo: lista[k] for campo, lista in campos.items()}) for k in range(len(indices))]
+
+
+# ─────────────────────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────────────────────
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Valida y muestra las reglas de alerta compiladas.")
+    parser.add_argument("--validar", type=Path, default=RUTA_REGLAS)
+    args = parser.parse_args(argv)
+    for regla in cargar_reglas(args.validar):
+        histeresis = f" · {regla.ventanas} ventanas" if regla.ventanas > 1 else ""
+        print(
+            f"[reglas] {regla.tipo}: {regla.expresion} {regla.comparador} {regla.umbral}"
+            f"{histeresis} · {regla.nivel} · enfriamiento {regla.enfriamiento_min:g} min"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# app/services/reloj.py
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+POLITICAS_DESBORDE = ("alcanzar", "saltar")
+PERIODO_MINIMO_SEGUNDOS = 0.1
+MAX_RANURAS_ALCANCE = 10  # con "alcanzar": atraso (en periodos) que se recupera en ráfaga; más se salta
+
+
+class RelojReal:
+    """Reloj de pared (UTC). `dormir` espera de verdad."""
+
+    def ahora(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def monotono(self) -> float:
+        """Segundos de un reloj que no salta con ajustes de hora (para medir y programar)."""
+        return time.monotonic()
+
+    async def dormir(self, segundos: float) -> None:
+        await asyncio.sleep(segundos)
+
+
+class RelojVirtual:
+    """
+    Reloj simulado para correr el simulador en tiempo acelerado (backfill).
+    `dormir`/`avanzar` mueven el tiempo sin esperar.
+    """
+
+    def __init__(self, inicio: datetime):
+        if inicio.tzinfo is None:
+            inicio = inicio.replace(tzinfo=timezone.utc)
+        self.actual = inicio
+
+    def ahora(self) -> datetime:
+        return self.actual
+
+    def monotono(self) -> float:
+        return self.actual.timestamp()
+
+    def avanzar(self, segundos: float) -> datetime:
+        self.actual = self.actual + timedelta(seconds=segundos)
+        return self.actual
+
+    async def dormir(self, segundos: float) -> None:
+        self.avanzar(segundos)
+
+
+class ProgramadorFijo:
+    """
+    Ritmo fijo para el bucle de simulación: la ranura k empieza en
+    inicio + k·periodo, cueste lo que cueste cada tick (sin deriva). Si un
+    tick termina después de que empezó la ranura siguiente (desborde):
+      - "alcanzar": los ticks siguientes corren sin esperar hasta ponerse al
+        día (ráfaga de hasta MAX_RANURAS_ALCANCE; con más atraso se salta);
+      - "saltar": se descartan las ranuras vencidas y se espera la próxima.
+
+    `desbordes` cuenta ticks lentos, uno por tick: los de la ráfaga de
+    alcance arrancan tarde, y sólo cuentan si ellos mismos duran más de un
+    periodo. Las ranuras descartadas van aparte, en `ranuras_saltadas`.
+    """
+
+    def __init__(self, periodo: float, politica: str = "alcanzar"):
+        if periodo < PERIODO_MINIMO_SEGUNDOS:
+            raise ValueError(f"Periodo de tick inválido: {periodo} s (mínimo {PERIODO_MINIMO_SEGUNDOS} s)")
+        if politica not in POLITICAS_DESBORDE:
+            raise ValueError(f"Política de desborde inválida: {politica!r} (válidas: {', '.join(POLITICAS_DESBORDE)})")
+        self.periodo = periodo
+        self.politica = politica
+        self._reloj: Optional[RelojReal | RelojVirtual] = None
+        self._inicio_monotono = 0.0
+        self._inicio_pared: Optional[datetime] = None
+        self._ranura = 0
+        self._arranque = 0.0  # cuándo arrancó el tick en curso (reloj monótono)
+        self.ticks = 0
+        self.desbordes = 0
+        self.ranuras_saltadas = 0
+        self.ultimo_retraso_s = 0.0
+        self.max_retraso_s = 0.0
+
+    def iniciar(self, reloj: RelojReal | RelojVirtual) -> None:
+        """La ranura 0 es ahora."""
+        self._reloj = reloj
+        self._inicio_monotono = reloj.monotono()
+        self._inicio_pared = reloj.ahora()
+        self._ranura = 0
+        self._arranque = self._inicio_monotono
+
+    def instante(self) -> datetime:
+        """Hora de pared de la ranura en curso: las lecturas quedan equiespaciadas."""
+        return self._inicio_pared + timedelta(seconds=self._ranura * self.periodo)
+
+    async def esperar_siguiente(self) -> float:
+        """Duerme hasta la siguiente ranura; devuelve con cuánto retraso arranca (s)."""
+        self._ranura += 1
+        objetivo = self._inicio_monotono + self._ranura * self.periodo
+        ahora = self._reloj.monotono()
+        if ahora > objetivo:
+            if ahora > self._arranque + self.periodo:  # el tick en curso tardó más de un periodo
+                self.desbordes += 1
+            vencidas = int((ahora - objetivo) // self.periodo)  # ranuras completas ya perdidas
+            if self.politica == "saltar" or vencidas >= MAX_RANURAS_ALCANCE:
+                self._ranura += vencidas + 1
+                self.ranuras_saltadas += vencidas + 1
+                objetivo += (vencidas + 1) * self.periodo
+        if objetivo > ahora:
+            await self._reloj.dormir(objetivo - ahora)
+        self._arranque = self._reloj.monotono()
+        retraso = max(0.0, self._arranque - objetivo)
+        self.ticks += 1
+        self.ultimo_retraso_s = retraso
+        self.max_retraso_s = max(self.max_retraso_s, retraso)
+        return retraso
+
+    def metricas(self) -> dict:
+        return dict(
+            periodo_s=self.periodo,
+            politica=self.politica,
+            ticks=self.ticks,
+            desbordes=self.desbordes,
+            ranuras_saltadas=self.ranuras_saltadas,
+            ultimo_retraso_s=round(self.ultimo_retraso_s, 4),
+            max_retraso_s=round(self.max_retraso_s, 4),
+        )
@@ -0,0 +1,63 @@
+# app/services/respuestas.py
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+MAX_VARIANTES = 32   # combinaciones (ruta, parámetros) retenidas
+
+
+class CacheRespuestas:
+    """
+    Cuerpos JSON ya validados y codificados, por (ruta, parámetros).
+
+    Cada entrada guarda la versión de datos con la que se produjo; si la
+    versión vigente es otra, es un fallo. Así servir una ruta caliente en
+    estado estable es una búsqueda en diccionario. LRU acotado a
+    `max_variantes` para que parámetros arbitrarios no crezcan la memoria.
+
+    Las claves `fijas` (rutas calientes que se rehacen tras cada tick) viven
+    fuera del LRU: ninguna variante nueva las expulsa.
+    """
+
+    def __init__(self, max_variantes: int = MAX_VARIANTES, fijas: Iterable[Hashable] = ()):
+        self.max_variantes = max_variantes
+        self.fijas = tuple(fijas)
+        self._fijas: Dict[Hashable, Tuple[str, bytes]] = {}
+        self._entradas: "OrderedDict[Hashable, Tuple[str, bytes]]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def obtener(self, clave: Hashable, version: str) -> Optional[bytes]:
+        entrada = self._fijas.get(clave) or self._entradas.get(clave)
+        if entrada is None or entrada[0] != version:
+            self.fallos += 1
+            return None
+        if clave in self._entradas:
+            self._entradas.move_to_end(clave)
+        self.aciertos += 1
+        return entrada[1]
+
+    def guardar(self, clave: Hashable, version: str, cuerpo: bytes) -> None:
+        if clave in self.fijas:
+            self._fijas[clave] = (version, cuerpo)
+            return
+        self._entradas[clave] = (version, cuerpo)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_variantes:
+            self._entradas.popitem(last=False)
+            self.expulsiones += 1
+
+    def invalidar_variantes(self) -> None:
+        """Descarta las variantes del LRU (ya viejas tras un cambio); las fijas se rehacen aparte."""
+        self._entradas.clear()
+
+    def metricas(self) -> dict:
+        return dict(
+            variantes=len(self._entradas),
+            fijas=len(self._fijas),
+            max_variantes=self.max_variantes,
+            aciertos=self.aciertos,
+            fallos=self.fallos,
+            expulsiones=self.expulsiones,
+            bytes=sum(len(c) for _, c in [*self._fijas.values(), *self._entradas.values()]),
+        )
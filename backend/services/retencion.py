@@ -0,0 +1,254 @@
+# app/services/retencion.py
+"""
+Retención: las filas de Reading, Alert y ActionLog más viejas que el
+horizonte salen de SQLite a Parquet particionado por fecha (estilo Hive),
+se borran en lotes acotados y el espacio se devuelve con incremental_vacuum.
+En la misma corrida se podan los rollups por minuto y por hora según su
+propio horizonte (`rollups.HORIZONTE_DIAS`); no se archivan porque salen de
+las lecturas ya archivadas.
+Así el archivo caliente se queda del tamaño de unos días y cabe en la caché
+de páginas; lo archivado sigue consultable con polars.
+
+    <SAPAL_ARCHIVO_DIR>/<tabla>/fecha=AAAA-MM-DD/part-<primer id del lote>.parquet
+
+Cada lote se escribe (archivo temporal + rename) antes de borrar sus filas;
+si el proceso cae entre ambos pasos, la siguiente corrida elige el mismo lote
+y sobrescribe el mismo archivo. Las alertas abiertas nunca se archivan.
+
+Uso por línea de comandos (desde la raíz del repo):
+    python -m backend.services.retencion --dias 30
+    python -m backend.services.retencion --vacuum-completo   # una vez, con la app detenida
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Type
+
+import polars as pl
+from sqlalchemy import Boolean, DateTime, Float, Integer, delete, literal_column
+from sqlmodel import SQLModel, select
+
+from ..db import ASYNC_ENGINE, DB_PATH, SessionLectura, SessionLocal, cerrar_db, init_db
+from ..migraciones import asegurar_vacuum_incremental
+from ..models import ActionLog, Alert, Reading
+from . import rollups
+
+DIAS_RETENCION = float(os.environ.get("SAPAL_RETENCION_DIAS", "30"))  # 0 = no archivar
+DIR_ARCHIVO = Path(os.environ.get("SAPAL_ARCHIVO_DIR", DB_PATH.parent / "archivo")).resolve()
+INTERVALO_SEGUNDOS = float(os.environ.get("SAPAL_RETENCION_INTERVALO_S", "3600"))
+RETRASO_INICIAL_SEGUNDOS = 60.0  # la primera corrida no compite con el arranque
+LOTE_FILAS = 5000        # filas por lote (un DELETE corto: el escritor del tick no espera)
+PAGINAS_VACUUM = 2000    # páginas liberadas por paso de incremental_vacuum
+
+TABLAS: Dict[str, Type[SQLModel]] = {"reading": Reading, "alert": Alert, "actionlog": ActionLog}
+
+
+def _esquema_polars(modelo: Type[SQLModel]) -> Dict[str, pl.DataType]:
+    """Tipos fijos por columna: un lote con todo NULL no cambia el esquema del Parquet."""
+    esquema = {}
+    for columna in modelo.__table__.columns:
+        if isinstance(columna.type, Boolean):
+            esquema[columna.name] = pl.Boolean
+        elif isinstance(columna.type, Integer):
+            esquema[columna.name] = pl.Int64
+        elif isinstance(columna.type, Float):
+            esquema[columna.name] = pl.Float64
+        elif isinstance(columna.type, DateTime):
+            esquema[columna.name] = pl.Datetime("us")
+        else:
+            esquema[columna.name] = pl.Utf8
+    return esquema
+
+
+def _consulta_vencidas(tabla: str, corte: datetime, limite: int = LOTE_FILAS):
+    """Lote más viejo por (ts, id) anterior al corte; el mismo mientras no se borre."""
+    modelo = TABLAS[tabla]
+    consulta = select(*modelo.__table__.columns).where(modelo.ts < corte)
+    if modelo is Alert:
+        consulta = consulta.where(Alert.estado != "abierta")  # siguen vivas: panel y deduplicación
+    return consulta.order_by(modelo.ts, modelo.id).limit(limite)
+
+
+def _archivar(tabla: str, filas: list, directorio: Path) -> int:
+    """Escribe un lote en sus particiones por fecha; devuelve cuántos archivos."""
+    df = pl.DataFrame(filas, schema=_esquema_polars(TABLAS[tabla]), orient="row")
+    primer_id = df["id"].min()
+    particiones = df.with_columns(pl.col("ts").dt.date().alias("fecha")).partition_by("fecha", as_dict=True)
+    for (fecha,), parte in particiones.items():
+        carpeta = directorio / tabla / f"fecha={fecha.isoformat()}"
+        carpeta.mkdir(parents=True, exist_ok=True)
+        destino = carpeta / f"part-{primer_id:012d}.parquet"
+        temporal = destino.with_suffix(".tmp")
+        parte.drop("fecha").write_parquet(temporal)
+        os.replace(temporal, destino)
+    return len(particiones)
+
+
+async def _podar_rollups(ahora: datetime, lote: int) -> Dict[str, int]:
+    """Borra, en lotes por rowid, las cubetas fuera del horizonte de cada resolución."""
+    podadas: Dict[str, int] = {}
+    for resolucion, dias in rollups.HORIZONTE_DIAS.items():
+        if not dias:
+            continue
+        tabla = rollups.RESOLUCIONES[resolucion][0]
+        corte = (ahora - timedelta(days=dias)).astimezone(timezone.utc).replace(tzinfo=None)
+        podadas[tabla.__tablename__] = 0
+        while True:
+            async with SessionLocal() as sesion:
+                async with sesion.begin():
+                    res = await sesion.execute(
+                        delete(tabla).where(literal_column("rowid").in_(rollups._consulta_rollups_vencidos(resolucion, corte, lote)))
+                    )
+            podadas[tabla.__tablename__] += res.rowcount
+            if res.rowcount < lote:
+                break
+    return podadas
+
+
+async def vacuum_incremental(paginas_por_paso: int = PAGINAS_VACUUM) -> int:
+    """Devuelve al sistema las páginas libres, en pasos cortos. 0 si la base no está en INCREMENTAL."""
+    liberadas = 0
+    while True:
+        async with ASYNC_ENGINE.connect() as conn:
+            if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar_one() != 2:
+                return liberadas
+            libres = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar_one()
+            if not libres:
+                return liberadas
+            paso = min(libres, paginas_por_paso)
+            # execute() de sqlite3 da un solo paso (una página); executescript corre el pragma completo
+            crudo = await conn.get_raw_connection()
+            await crudo.driver_connection.executescript(f"PRAGMA incremental_vacuum({paso})")
+        liberadas += paso
+        await asyncio.sleep(0)
+
+
+async def aplicar_retencion(
+    dias: float = DIAS_RETENCION,
+    ahora: Optional[datetime] = None,
+    directorio: Path = DIR_ARCHIVO,
+    lote: int = LOTE_FILAS,
+) -> dict:
+    """Archiva y borra todo lo anterior a `ahora - dias`; devuelve un resumen."""
+    if dias < 1:
+        raise ValueError("El horizonte de retención debe ser de al menos 1 día (KPIs de 24 h)")
+    ahora = ahora or datetime.now(timezone.utc)
+    corte = (ahora - timedelta(days=dias)).astimezone(timezone.utc).replace(tzinfo=None)
+    inicio = time.monotonic()
+    archivadas = {tabla: 0 for tabla in TABLAS}
+    archivos = 0
+    for tabla, modelo in TABLAS.items():
+        while True:
+            async with SessionLectura() as sesion:
+                filas = (await sesion.execute(_consulta_vencidas(tabla, corte, lote))).all()
+            if not filas:
+                break
+            archivos += await asyncio.to_thread(_archivar, tabla, filas, directorio)
+            async with SessionLocal() as sesion:
+                async with sesion.begin():
+                    await sesion.execute(delete(modelo).where(modelo.id.in_([fila.id for fila in filas])))
+            archivadas[tabla] += len(filas)
+            if len(filas) < lote:
+                break
+    podadas = await _podar_rollups(ahora, lote)
+    paginas = await vacuum_incremental()
+    return dict(
+        corte=corte,
+        filas_archivadas=archivadas,
+        rollups_podados=podadas,
+        archivos_escritos=archivos,
+        paginas_liberadas=paginas,
+        segundos=round(time.monotonic() - inicio, 2),
+    )
+
+
+class TareaRetencion:
+    """Corre `aplicar_retencion` cada `intervalo` segundos (sólo en el worker líder)."""
+
+    def __init__(self, dias: float = DIAS_RETENCION, intervalo: float = INTERVALO_SEGUNDOS):
+        self.dias = dias
+        self.intervalo = intervalo
+        self._tarea: Optional[asyncio.Task] = None
+        self.corridas = 0
+        self.ultima: Optional[dict] = None
+        self.ultimo_error: Optional[str] = None
+
+    def iniciar(self, al_terminar: Callable[[dict], Awaitable[None]]) -> None:
+        if self.dias <= 0 or (self._tarea is not None and not self._tarea.done()):
+            return
+        self._tarea = asyncio.create_task(self._ciclo(al_terminar))
+
+    async def detener(self) -> None:
+        if self._tarea is not None and not self._tarea.done():
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+        self._tarea = None
+
+    async def _ciclo(self, al_terminar: Callable[[dict], Awaitable[None]]) -> None:
+        await asyncio.sleep(RETRASO_INICIAL_SEGUNDOS)
+        while True:
+            try:
+                resumen = await aplicar_retencion(self.dias)
+                self.corridas += 1
+                self.ultima = resumen
+                self.ultimo_error = None
+                await al_terminar(resumen)
+            except Exception as exc:  # se reintenta en la siguiente corrida
+                self.ultimo_error = repr(exc)
+                print(f"[ERROR] Retención: {exc!r}")
+            await asyncio.sleep(self.intervalo)
+
+    def metricas(self) -> dict:
+        return dict(
+            activa=self._tarea is not None and not self._tarea.done(),
+            dias=self.dias,
+            intervalo_s=self.intervalo,
+            directorio=str(DIR_ARCHIVO),
+            corridas=self.corridas,
+            ultima=self.ultima,
+            ultimo_error=self.ultimo_error,
+        )
+
+
+# ─────────────────────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────────────────────
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Archiva en Parquet y borra de SQLite las filas viejas.")
+    parser.add_argument("--dias", type=float, default=DIAS_RETENCION, help="horizonte: se conserva lo de los últimos N días")
+    parser.add_argument("--dir", type=Path, default=DIR_ARCHIVO, help="carpeta raíz del archivo Parquet")
+    parser.add_argument(
+        "--vacuum-completo", action="store_true",
+        help="pasa una base existente a auto_vacuum=INCREMENTAL (VACUUM completo: detener la app antes)",
+    )
+    args = parser.parse_args(argv)
+
+    async def _correr():
+        await init_db()
+        try:
+            if args.vacuum_completo:
+                async with ASYNC_ENGINE.connect() as conn:
+                    conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                    await conn.run_sync(asegurar_vacuum_incremental, True)
+            return await aplicar_retencion(args.dias, directorio=args.dir)
+        finally:
+            await cerrar_db()
+
+    resumen = asyncio.run(_correr())
+    filas = " · ".join(
+        f"{n} {tabla}" for tabla, n in {**resumen["filas_archivadas"], **resumen["rollups_podados"]}.items()
+    )
+    print(
+        f"[retencion] corte {resumen['corte']:%Y-%m-%d %H:%M} · {filas} · "
+        f"{resumen['archivos_escritos']} archivos · {resumen['paginas_liberadas']} páginas en {resumen['segundos']} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# app/services/rollups.py
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import Connection, func, literal_column, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from ..models import ReadingRollupDia, ReadingRollupHora, ReadingRollupMinuto
+
+METRICAS = ("inyeccion_m3", "consumo_m3", "presion_psi", "eficiencia")
+
+# resolución → (tabla, tamaño de cubeta, formato strftime de SQLite para truncar `ts`)
+RESOLUCIONES: Dict[str, Tuple[Type, timedelta, str]] = {
+    "minuto": (ReadingRollupMinuto, timedelta(minutes=1), "%Y-%m-%d %H:%M:00.000000"),
+    "hora": (ReadingRollupHora, timedelta(hours=1), "%Y-%m-%d %H:00:00.000000"),
+    "dia": (ReadingRollupDia, timedelta(days=1), "%Y-%m-%d 00:00:00.000000"),
+}
+PUNTOS_MAX_HISTORIAL = 500
+
+# Horizonte de cada resolución en SQLite (días; 0 = sin poda). La retención
+# borra las cubetas más viejas; el día se conserva siempre (es pequeño).
+HORIZONTE_DIAS: Dict[str, float] = {
+    "minuto": float(os.environ.get("SAPAL_RETENCION_ROLLUP_MINUTO_DIAS", "7")),
+    "hora": float(os.environ.get("SAPAL_RETENCION_ROLLUP_HORA_DIAS", "90")),
+    "dia": 0.0,
+}
+
+
+def truncar(ts: datetime, resolucion: str) -> datetime:
+    if resolucion == "minuto":
+        return ts.replace(second=0, microsecond=0)
+    if resolucion == "hora":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def elegir_resolucion(
+    desde: datetime,
+    hasta: datetime,
+    puntos_max: int = PUNTOS_MAX_HISTORIAL,
+    ahora: Optional[datetime] = None,
+) -> str:
+    """
+    La resolución más fina cuyo número de cubetas en el rango cabe en
+    `puntos_max` y que todavía conserva `desde` (ver HORIZONTE_DIAS).
+    Marcas en UTC, todas con zona o todas sin ella.
+    """
+    ahora = ahora or (datetime.now(timezone.utc) if desde.tzinfo else datetime.now(timezone.utc).replace(tzinfo=None))
+    rango = hasta - desde
+    for nombre, (_, paso, _) in RESOLUCIONES.items():
+        horizonte = HORIZONTE_DIAS[nombre]
+        if horizonte and desde < ahora - timedelta(days=horizonte):
+            continue  # ya podada por la retención
+        if rango / paso <= puntos_max:
+            return nombre
+    return "dia"
+
+
+def agregar(filas: List[dict], resolucion: str) -> List[dict]:
+    """Pre-agrega lecturas (dicts de Reading) por (sector, cubeta) antes del upsert."""
+    acumulado: Dict[Tuple[int, datetime], dict] = {}
+    for fila in filas:
+        clave = (fila["sector_id"], truncar(fila["ts"], resolucion))
+        a = acumulado.get(clave)
+        if a is None:
+            a = acumulado[clave] = {"sector_id": clave[0], "bucket": clave[1], "conteo": 0}
+            for m in METRICAS:
+                a[f"{m}_suma"] = 0.0
+                a[f"{m}_min"] = fila[m]
+                a[f"{m}_max"] = fila[m]
+        a["conteo"] += 1
+        for m in METRICAS:
+            valor = fila[m]
+            a[f"{m}_suma"] += valor
+            if valor < a[f"{m}_min"]:
+                a[f"{m}_min"] = valor
+            if valor > a[f"{m}_max"]:
+                a[f"{m}_max"] = valor
+    return list(acumulado.values())
+
+
+def _upsert(tabla):
+    """INSERT ... ON CONFLICT(sector_id, bucket) DO UPDATE acumulando conteo/suma/min/max."""
+    stmt = sqlite_insert(tabla)
+    ex = stmt.excluded
+    valores = {"conteo": tabla.conteo + ex.conteo}
+    for m in METRICAS:
+        valores[f"{m}_suma"] = getattr(tabla, f"{m}_suma") + getattr(ex, f"{m}_suma")
+        valores[f"{m}_min"] = func.min(getattr(tabla, f"{m}_min"), getattr(ex, f"{m}_min"))
+        valores[f"{m}_max"] = func.max(getattr(tabla, f"{m}_max"), getattr(ex, f"{m}_max"))
+    return stmt.on_conflict_do_update(index_elements=["sector_id", "bucket"], set_=valores)
+
+
+async def actualizar_rollups(sesion: AsyncSession, filas: List[dict]) -> None:
+    """Aplica un lote de lecturas recién escritas a las tres resoluciones (misma transacción)."""
+    if not filas:
+        return
+    for nombre, (tabla, _, _) in RESOLUCIONES.items():
+        await sesion.execute(_upsert(tabla), agregar(filas, nombre))
+
+
+def poblar_desde_lecturas(conn: Connection) -> None:
+    """
+    Llena rollups vacíos a partir de Reading con un INSERT ... SELECT agrupado
+    (bases creadas antes de los rollups). Síncrono: corre como migración.
+    """
+    for tabla, _, formato in RESOLUCIONES.values():
+        if conn.execute(select(tabla.sector_id).limit(1)).first() is not None:
+            continue
+        agregados = ", ".join(f"sum({m}), min({m}), max({m})" for m in METRICAS)
+        columnas = ", ".join(f"{m}_suma, {m}_min, {m}_max" for m in METRICAS)
+        conn.execute(text(
+            f"INSERT INTO {tabla.__tablename__} (sector_id, bucket, conteo, {columnas}) "
+            f"SELECT sector_id, strftime('{formato}', ts) AS b, count(*), {agregados} "
+            f"FROM reading GROUP BY sector_id, b"
+        ))
+
+
+def _consulta_rollups_vencidos(resolucion: str, corte: datetime, limite: int = 5000):
+    """rowid de un lote de cubetas anteriores al corte (índice por `bucket`)."""
+    tabla = RESOLUCIONES[resolucion][0]
+    return select(literal_column("rowid")).select_from(tabla).where(tabla.bucket < corte).limit(limite)
+
+
+def _consulta_historial(resolucion: str, sector_id: int, desde: datetime, hasta: datetime):
+    tabla = RESOLUCIONES[resolucion][0]
+    return (
+        select(tabla)
+        .where(
+            tabla.sector_id == sector_id,
+            tabla.bucket >= truncar(desde, resolucion),
+            tabla.bucket <= hasta,
+        )
+        .order_by(tabla.bucket)
+    )
+
+
+async def historial(
+    sesion: AsyncSession,
+    sector_id: int,
+    desde: datetime,
+    hasta: datetime,
+    puntos_max: int = PUNTOS_MAX_HISTORIAL,
+    resolucion: Optional[str] = None,
+) -> Tuple[str, List[dict]]:
+    """Serie agregada del sector en [desde, hasta] desde el rollup adecuado."""
+    resolucion = resolucion or elegir_resolucion(desde, hasta, puntos_max)
+    res = await sesion.execute(_consulta_historial(resolucion, sector_id, desde, hasta))
+    puntos = []
+    for r in res.scalars().all():
+        puntos.append({
+            "ts": r.bucket.replace(tzinfo=timezone.utc),
+            "conteo": r.conteo,
+            "inyeccion_m3": r.inyeccion_m3_suma,
+            "consumo_m3": r.consumo_m3_suma,
+            "presion_psi_prom": r.presion_psi_suma / r.conteo,
+            "presion_psi_min": r.presion_psi_min,
+            "presion_psi_max": r.presion_psi_max,
+            "eficiencia_prom": r.eficiencia_suma / r.conteo,
+            "eficiencia_min": r.eficiencia_min,
+            "eficiencia_max": r.eficiencia_max,
+        })
+    return resolucion, puntos
@@ -1,19 +1,42 @@
 # app/services/sim.py
 import asyncio
+import base64
+import binascii
 import json
 import math
+import os
 import random
+import secrets
+import time
 from collections import defaultdict, deque
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import func
+import numpy as np
+from sqlalchemy import func, insert, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from ..db import SessionLocal
+from ..db import DB_PATH, SessionLectura, SessionLocal, metricas_pools
 from ..models import ActionLog, Alert, Reading, Sector
+from ..schemas import AlertsResponse, KPIResponse, SectorsResponse
+from . import catalogo, reglas
+from .alertas_abiertas import IndiceAlertasAbiertas
+from .deltas import DiarioDeltas
+from .enfriamientos import RegistroEnfriamientos
+from .escritor import EscritorDiferido, TickPendiente
+from .eventos import LATIDO_SEGUNDOS, MAX_SUSCRIPTORES, DifusorEventos
+from .kpis import EstadoKPIs
+from .liderazgo import Coordinador
+from .metricas import ALERTAS_EMITIDAS, ALERTAS_SUPRIMIDAS, REGISTRO, TICK_FASES, TICK_RETRASO, TICK_SEGUNDOS
+from .motor import MotorVectorial
+from .respuestas import CacheRespuestas
+from .retencion import TareaRetencion
+from .reloj import ProgramadorFijo, RelojReal, RelojVirtual
+from . import rollups
 
 
 # ─────────────────────────────────────────────────────────────
@@ -21,21 +44,29 @@ from ..models import ActionLog, Alert, Reading, Sector
 # ─────────────────────────────────────────────────────────────
 INCIDENT_PROB = 0.002           # antes 0.01
 INCIDENT_TICKS = (2, 4)         # antes (3, 6)
-REQUIRE_CONSEC_TICKS = 4        # antes 2
-PRESSURE_JUMP = 0.25            # antes 0.20
-NO_FACT_THRESHOLD = 0.20        # antes 0.15
-ALERT_COOLDOWN_MIN = 15         # minutos
-
-# deduplicación por ventana de tiempo (sector,tipo) → último ts
-_ULTIMA_ALERTA: Dict[Tuple[int, str], datetime] = {}
-
-def _puedo_emitir(sector_id: int, tipo: str, ahora: datetime) -> bool:
-    clave = (sector_id, tipo)
-    ts = _ULTIMA_ALERTA.get(clave)
-    if ts and (ahora - ts) < timedelta(minutes=ALERT_COOLDOWN_MIN):
-        return False
-    _ULTIMA_ALERTA[clave] = ahora
-    return True
+ALERT_COOLDOWN_MIN = 15         # minutos (reglas sin `enfriamiento_min`)
+PERIODO_TICK_SEGUNDOS = float(os.environ.get("SAPAL_TICK_PERIODO_S", "10"))  # ritmo fijo, mínimo 0.1
+POLITICA_DESBORDE = os.environ.get("SAPAL_TICK_POLITICA", "alcanzar")          # o "saltar"
+INTERVALO_PUNTO_CONTROL_SEGUNDOS = float(os.environ.get("SAPAL_PUNTO_CONTROL_S", "60"))
+RUTA_ESTADO_MOTOR = Path(os.environ.get("SAPAL_ESTADO_MOTOR_PATH", DB_PATH.with_name(DB_PATH.name + ".motor.npz")))
+
+# deduplicación por ventana de tiempo (sector,tipo): vence con el tick y sobrevive reinicios
+_ENFRIAMIENTOS = RegistroEnfriamientos()
+
+def _puedo_emitir(
+    sector_id: int,
+    tipo: str,
+    ahora: datetime,
+    registro: Optional[RegistroEnfriamientos] = None,
+    enfriamiento_min: float = ALERT_COOLDOWN_MIN,
+) -> bool:
+    en_vivo = registro is None  # backfill usa su propio registro y no cuenta en las métricas
+    registro = _ENFRIAMIENTOS if en_vivo else registro
+    if registro.puede_emitir(sector_id, tipo, ahora, enfriamiento_min):
+        return True
+    if en_vivo:
+        ALERTAS_SUPRIMIDAS.inc(tipo, "enfriamiento")
+    return False
 
 
 # ─────────────────────────────────────────────────────────────
@@ -43,17 +74,48 @@ def _puedo_emitir(sector_id: int, tipo: str, ahora: datetime) -> bool:
 # ─────────────────────────────────────────────────────────────
 @asynccontextmanager
 async def contexto_sesion():
+    """Sesión sobre la conexión escritora (única por proceso)."""
     sesion: AsyncSession = SessionLocal()
     try:
         yield sesion
     finally:
         await sesion.close()
 
+@asynccontextmanager
+async def contexto_lectura():
+    """Sesión de sólo lectura (pool aparte: no hace cola detrás del escritor)."""
+    sesion: AsyncSession = SessionLectura()
+    try:
+        yield sesion
+    finally:
+        await sesion.close()
+
 # ─────────────────────────────────────────────────────────────
 # Estado interno
 # ─────────────────────────────────────────────────────────────
 _TAREA_SIMULACION: Optional[asyncio.Task] = None
-_SUSCRIPTORES: "set[asyncio.Queue]" = set()
+_EVENTOS = DifusorEventos()
+_ABIERTAS = IndiceAlertasAbiertas()
+_KPIS = EstadoKPIs(_ABIERTAS)
+_DELTAS = DiarioDeltas()
+_ESCRITOR = EscritorDiferido()
+_RETENCION = TareaRetencion()
+_PROGRAMADOR = ProgramadorFijo(PERIODO_TICK_SEGUNDOS, POLITICA_DESBORDE)
+_MOTOR: Optional[MotorVectorial] = None  # el del bucle en curso (sólo en el líder)
+_VERSION_DATOS = 0  # sube con cada commit que cambia lo que ve el tablero (tick, ACK)
+_EPOCA_DATOS = _DELTAS.epoca  # con varios workers, la del líder (la comparten todos)
+
+def _marcar_cambio():
+    global _VERSION_DATOS
+    _VERSION_DATOS += 1
+
+def etag_datos() -> str:
+    """
+    ETag fuerte de /kpis, /sectors y /alerts: época + versión de datos + ACKs
+    de las últimas 24h. Ese conteo (en /kpis) cambia al vencer un ACK sin que
+    suba la versión; con él en el ETag, la caché y los 304 no lo congelan.
+    """
+    return f'"{_EPOCA_DATOS}-{_VERSION_DATOS}-{_KPIS.atendidas_24h()}"'
 
 class MediaMovilExponencial:
     def __init__(self, alpha: float, valor_inicial: Optional[float] = None):
@@ -82,7 +144,7 @@ class EstadoSimulacion:
     def __init__(self, ids_sectores: List[int]):
         self.medias_moviles_eficiencia: Dict[int, MediaMovilExponencial] = {sid: MediaMovilExponencial(0.3) for sid in ids_sectores}
         self.medias_moviles_presion: Dict[int, MediaMovilExponencial] = {sid: MediaMovilExponencial(0.3) for sid in ids_sectores}
-        self.conteo_baja_eficiencia: Dict[int, int] = defaultdict(int)
+        self.conteos_histeresis: Dict[Tuple[int, str], int] = defaultdict(int)  # (sector, tipo de regla)
         self.ventana_tendencia: Dict[int, deque] = {sid: deque(maxlen=4) for sid in ids_sectores}
 
 # ─────────────────────────────────────────────────────────────
@@ -93,21 +155,20 @@ def factor_estacional_por_hora(instante: datetime) -> float:
     base = 1.0 + 0.15 * math.sin(2 * math.pi * (hora / 24.0))
     return max(0.7, base)
 
+def _consulta_sectores():
+    return select(Sector.id).where(Sector.activo.is_(True)).order_by(Sector.id)
+
 async def asegurar_sectores_semilla() -> List[int]:
+    """Sincroniza `sector` con el catálogo (upsert masivo) y devuelve los ids activos."""
+    sectores = catalogo.cargar_catalogo()
     async with contexto_sesion() as sesion:
-        res = await sesion.execute(select(Sector))
-        existentes = res.scalars().all()
-        if not existentes:
-            sectores = [(233, "Sector 233"), (234, "Sector 234"), (145, "Sector 145"),
-                        (89, "Sector 089"), (156, "Sector 156"), (201, "Sector 201"),
-                        (312, "Sector 312"), (78, "Sector 078")]
-            async with sesion.begin():
-                for sid, nombre in sectores:
-                    sesion.add(Sector(id=sid, nombre=nombre, zona=None, activo=True))
-            return [sid for sid, _ in sectores]
-        return [sec.id for sec in existentes if sec.activo]
-
-# Perfiles e incidentes (se inicializan en _bucle_simulacion)
+        async with sesion.begin():
+            await catalogo.sembrar(sesion, sectores)
+            res = await sesion.execute(_consulta_sectores())
+            return list(res.scalars().all())
+
+# Perfiles e incidentes de la ruta escalar (referencia de `simular_lectura`;
+# el bucle en vivo usa MotorVectorial)
 _PERFILES: Dict[int, dict] = {}
 _INCIDENTES: Dict[int, dict] = {}
 
@@ -176,79 +237,116 @@ def simular_lectura(
         eficiencia=eficiencia,
     )
 
+# Reglas de alerta compiladas desde el JSON (services/reglas.py); un archivo
+# inválido detiene el arranque en vez de simular sin alertas
+REGLAS_ALERTA = reglas.cargar_reglas()
+
+def _alertas_de_regla(
+    regla: reglas.ReglaCompilada,
+    sector_ids: List[int],
+    ts: datetime,
+    detalles: List[dict],
+) -> List[Alert]:
+    return [
+        Alert(
+            sector_id=sector_id,
+            ts=ts,
+            nivel=regla.nivel,
+            tipo=regla.tipo,
+            mensaje=regla.mensaje,
+            explicacion=json.dumps(detalle),
+        )
+        for sector_id, detalle in zip(sector_ids, detalles)
+    ]
+
 def evaluar_reglas_alertas(
     lectura: Reading,
     media_mov_eficiencia: MediaMovilExponencial,
     media_mov_presion: MediaMovilExponencial,
-    conteo_baja_eficiencia: Dict[int, int],
+    conteos_histeresis: Dict[Tuple[int, str], int],
 ) -> List[Alert]:
+    """Ruta escalar de referencia: las mismas reglas compiladas, sobre una sola lectura."""
+    caracteristicas = {
+        "inyeccion_m3": np.array([lectura.inyeccion_m3]),
+        "consumo_m3": np.array([lectura.consumo_m3]),
+        "presion_psi": np.array([lectura.presion_psi]),
+        "eficiencia": np.array([lectura.eficiencia]),
+        "eficiencia_operativa": np.array([lectura.consumo_m3 / max(lectura.inyeccion_m3, 0.001)]),
+        "media_eficiencia": np.array([media_mov_eficiencia.actualizar(lectura.eficiencia)]),
+        "media_presion": np.array([media_mov_presion.actualizar(lectura.presion_psi)]),
+    }
     alertas: List[Alert] = []
+    for regla in REGLAS_ALERTA:
+        valor = regla.valor(caracteristicas)
+        cumple = bool(regla.cumple(valor)[0])
+        if regla.ventanas > 1:
+            # histeresis: si está mal, suma; si está bien, baja 1 sin resetear en seco
+            clave = (lectura.sector_id, regla.tipo)
+            conteos_histeresis[clave] = conteos_histeresis[clave] + 1 if cumple else max(0, conteos_histeresis[clave] - 1)
+            cumple = conteos_histeresis[clave] >= regla.ventanas
+        if cumple and _puedo_emitir(lectura.sector_id, regla.tipo, lectura.ts, enfriamiento_min=regla.enfriamiento_min):
+            detalles = reglas.explicaciones(regla, valor, caracteristicas, np.array([0]))
+            alertas.extend(_alertas_de_regla(regla, [lectura.sector_id], lectura.ts, detalles))
+    return alertas
 
-    media_eficiencia = media_mov_eficiencia.actualizar(lectura.eficiencia)
-    media_presion = media_mov_presion.actualizar(lectura.presion_psi)
-
-    eficiencia_operativa = lectura.consumo_m3 / max(lectura.inyeccion_m3, 0.001)
-    loss_pct = max(0.0, lectura.inyeccion_m3 - lectura.consumo_m3) / lectura.consumo_m3
-
-    # histeresis: si está mal, suma; si está bien, baja 1 sin resetear en seco
-    if eficiencia_operativa < 0.85:
-        conteo_baja_eficiencia[lectura.sector_id] += 1
-    else:
-        conteo_baja_eficiencia[lectura.sector_id] = max(0, conteo_baja_eficiencia[lectura.sector_id] - 1)
-
-    # 1) Baja eficiencia sostenida
-    if conteo_baja_eficiencia[lectura.sector_id] >= REQUIRE_CONSEC_TICKS:
-        if _puedo_emitir(lectura.sector_id, "baja_eficiencia", lectura.ts):
-            detalle = {
-                "base": "historial_propio",
-                "caracteristica": "eficiencia_operativa",
-                "valor": eficiencia_operativa,
-                "umbral": 0.85,
-            }
-            alertas.append(Alert(
-                sector_id=lectura.sector_id,
-                nivel="alta",
-                tipo="baja_eficiencia",
-                mensaje=f"Eficiencia operativa < 85% sostenida (≥{REQUIRE_CONSEC_TICKS} ventanas).",
-                explicacion=json.dumps(detalle),
-            ))
-
-    # 2) Presión desviada ±25% vs EWMA
-    if media_presion and abs(lectura.presion_psi - media_presion) / media_presion > PRESSURE_JUMP:
-        if _puedo_emitir(lectura.sector_id, "sobrepresion", lectura.ts):
-            detalle = {
-                "base": "historial_propio",
-                "caracteristica": "presion",
-                "valor": lectura.presion_psi,
-                "media": media_presion,
-            }
-            alertas.append(Alert(
-                sector_id=lectura.sector_id,
-                nivel="media",
-                tipo="sobrepresion",
-                mensaje=f"Presión ±{int(PRESSURE_JUMP*100)}% vs su histórico (EWMA).",
-                explicacion=json.dumps(detalle),
-            ))
-
-    # 3) No facturable alto > 20%
-    if loss_pct > NO_FACT_THRESHOLD:
-        if _puedo_emitir(lectura.sector_id, "no_facturable", lectura.ts):
-            detalle = {
-                "base": "historial_propio",
-                "caracteristica": "no_facturable_pct",
-                "valor": loss_pct,
-                "umbral": NO_FACT_THRESHOLD,
-            }
-            alertas.append(Alert(
-                sector_id=lectura.sector_id,
-                nivel="alta",
-                tipo="no_facturable",
-                mensaje=f"Consumo no facturable > {int(NO_FACT_THRESHOLD*100)}% respecto a consumo.",
-                explicacion=json.dumps(detalle),
-            ))
+def crear_motor(ids_sectores: List[int], semilla: Optional[int] = None) -> MotorVectorial:
+    """Motor vectorizado con los parámetros de simulación y las reglas compiladas."""
+    return MotorVectorial(
+        ids_sectores,
+        prob_incidente=INCIDENT_PROB,
+        ticks_incidente=INCIDENT_TICKS,
+        reglas=REGLAS_ALERTA,
+        semilla=semilla,
+    )
 
+def alertas_desde_motor(
+    motor: MotorVectorial,
+    candidatos: dict,
+    instante: datetime,
+    registro: Optional[RegistroEnfriamientos] = None,
+) -> List[Alert]:
+    """
+    Convierte los disparos de `MotorVectorial.evaluar` en `Alert`, aplicando
+    el enfriamiento de cada regla (`_puedo_emitir`), igual que la ruta escalar.
+    Sólo recorre en Python los sectores que dispararon alguna regla.
+    `registro` permite usar un enfriamiento aislado (p. ej. backfill).
+    """
+    alertas: List[Alert] = []
+    ids = motor.ids
+    for regla in motor.reglas:
+        indices = [
+            i for i in candidatos["disparos"][regla.tipo].tolist()
+            if _puedo_emitir(int(ids[i]), regla.tipo, instante, registro, regla.enfriamiento_min)
+        ]
+        if not indices:
+            continue
+        posiciones = np.asarray(indices, dtype=np.int64)
+        detalles = reglas.explicaciones(regla, candidatos["valores"][regla.tipo], candidatos["caracteristicas"], posiciones)
+        alertas.extend(_alertas_de_regla(regla, ids[posiciones].tolist(), instante, detalles))
     return alertas
 
+def calcular_tick(
+    motor: MotorVectorial,
+    instante: datetime,
+    intervalo_segundos: float,
+    registro: Optional[RegistroEnfriamientos] = None,
+    fases: Optional[Dict[str, float]] = None,
+) -> Tuple[dict, List[Alert]]:
+    """
+    Un tick completo en memoria: incidentes, lecturas y alertas candidatas.
+    Si se pasa `fases`, deja ahí los segundos de "simulacion" y "reglas".
+    """
+    inicio = time.perf_counter()
+    motor.gestionar_incidentes(instante, intervalo_segundos)
+    lecturas = motor.simular(instante, factor_estacional_por_hora(instante))
+    simulado = time.perf_counter()
+    candidatos = motor.evaluar(lecturas)
+    alertas = alertas_desde_motor(motor, candidatos, instante, registro)
+    if fases is not None:
+        fases["simulacion"] = simulado - inicio
+        fases["reglas"] = time.perf_counter() - simulado
+    return lecturas, alertas
+
 # ─────────────────────────────────────────────────────────────
 # Funciones llamadas por las rutas
 # ─────────────────────────────────────────────────────────────
@@ -259,77 +357,87 @@ async def calcular_kpis() -> dict:
       - eficiencia_trend: promedio global por tick (últimos N)
       - sectores_en_riesgo: sectores con alertas abiertas
       - alertas_atendidas_24h: conteo en las últimas 24h
+    Lectura O(1) del estado en memoria que mantiene el bucle de simulación
+    (reconstruido desde DB al arrancar); no consulta SQLite.
     """
-    async with contexto_sesion() as sesion:
-        res = await sesion.execute(
-            select(Reading).order_by(Reading.ts.desc()).limit(500)
-        )
-        lecturas = res.scalars().all()
-
-        if not lecturas:
-            ahora = datetime.now(timezone.utc)
-            return dict(
-                ts=ahora.isoformat(),
-                eficiencia=1.0,
-                eficiencia_trend=[1.0],
-                sectores_en_riesgo=0,
-                alertas_atendidas_24h=0,
-                tiempo_decision_min=12,
-            )
-
-        por_ts: dict[datetime, list[float]] = defaultdict(list)
-        for l in lecturas:
-            por_ts[l.ts].append(float(l.eficiencia))
-
-        ts_ordenados = sorted(por_ts.keys())
-        proms = [sum(vals)/len(vals) for _, vals in sorted(por_ts.items())]
-
-        N = 16
-        eficiencia_trend = proms[-N:] if len(proms) > N else proms
-        eficiencia = eficiencia_trend[-1]
-        ts_reciente = ts_ordenados[-1].isoformat()
-
-        q_abiertas = await sesion.execute(
-            select(Alert).where(Alert.estado == "abierta")
-        )
-        alertas_abiertas = q_abiertas.scalars().all()
-        sectores_en_riesgo = len({a.sector_id for a in alertas_abiertas})
-
-        hace_24 = datetime.now(timezone.utc) - timedelta(hours=24)
-        atendidas_24h = await sesion.execute(
-            select(func.count(Alert.id)).where(
-                Alert.estado == "atendida",
-                Alert.atendida_en >= hace_24
-            )
-        )
-        alertas_atendidas_24h = int(atendidas_24h.scalar_one())
-
-        return dict(
-            ts=ts_reciente,
-            eficiencia=eficiencia,
-            eficiencia_trend=eficiencia_trend,
-            sectores_en_riesgo=sectores_en_riesgo,
-            alertas_atendidas_24h=alertas_atendidas_24h,
-            tiempo_decision_min=12,
+    return _KPIS.instantanea()
+
+def kpis_tablero() -> dict:
+    """KPIs redondeados tal como los ve el tablero (REST y deltas)."""
+    datos = _KPIS.instantanea()
+    return {
+        "ts": datos["ts"],
+        "eficiencia": round(datos["eficiencia"], 4),
+        "eficiencia_trend": [round(x, 4) for x in datos["eficiencia_trend"]],
+        "sectores_en_riesgo": datos["sectores_en_riesgo"],
+        "alertas_atendidas_24h": datos["alertas_atendidas_24h"],
+        "tiempo_decision_min": datos["tiempo_decision_min"],
+    }
+
+async def _recargar_desde_db():
+    async with contexto_lectura() as sesion:
+        await _ABIERTAS.cargar(sesion)
+        await _KPIS.reconstruir(sesion)
+    _DELTAS.invalidar()  # lo guardado cambió por fuera del tick: instantánea para todos
+
+async def reconstruir_estado():
+    """Recarga desde DB el índice de alertas abiertas y los KPIs en memoria (este proceso)."""
+    await _recargar_desde_db()
+    _marcar_cambio()
+
+async def notificar_reconstruccion():
+    """La DB cambió por fuera del tick (p. ej. backfill): todos los workers recargan."""
+    await _emitir_cambio({"type": "reconstruir"})
+
+LECTURAS_TENDENCIA = 4  # puntos del sparkline por sector
+
+def _consulta_cuadricula_sectores():
+    """
+    Una sola consulta para toda la cuadrícula:
+      - por sector activo, sus últimas LECTURAS_TENDENCIA lecturas (subconsulta
+        correlacionada con LIMIT → búsqueda por índice, no escaneo de Reading),
+        numeradas con ROW_NUMBER() OVER (PARTITION BY sector ORDER BY ts DESC);
+      - LEFT JOIN con el conteo agrupado de alertas abiertas por sector.
+    """
+    ultimas_ids = (
+        select(Reading.id)
+        .where(Reading.sector_id == Sector.id)
+        .order_by(Reading.ts.desc())
+        .limit(LECTURAS_TENDENCIA)
+        .correlate(Sector)
+    )
+    abiertas = (
+        select(Alert.sector_id, func.count(Alert.id).label("n"))
+        .where(Alert.estado == "abierta")
+        .group_by(Alert.sector_id)
+        .subquery()
+    )
+    rn = func.row_number().over(partition_by=Sector.id, order_by=Reading.ts.desc()).label("rn")
+    return (
+        select(
+            Sector.id,
+            Sector.nombre,
+            Sector.zona,
+            Reading.inyeccion_m3,
+            Reading.consumo_m3,
+            Reading.presion_psi,
+            rn,
+            func.coalesce(abiertas.c.n, 0).label("alertas_abiertas"),
         )
+        .join(Reading, Reading.id.in_(ultimas_ids))
+        .outerjoin(abiertas, abiertas.c.sector_id == Sector.id)
+        .where(Sector.activo.is_(True))
+        .order_by(Sector.id, rn)
+    )
 
 async def construir_cuadricula_sectores() -> List[dict]:
-    async with contexto_sesion() as sesion:
-        resp_sec = await sesion.execute(select(Sector).where(Sector.activo.is_(True)))
-        sectores = resp_sec.scalars().all()
+    async with contexto_lectura() as sesion:
+        res = await sesion.execute(_consulta_cuadricula_sectores())
         salida: List[dict] = []
 
-        for sector in sectores:
-            resp_lect = await sesion.execute(
-                select(Reading)
-                .where(Reading.sector_id == sector.id)
-                .order_by(Reading.ts.desc())
-                .limit(4)
-            )
-            lecturas = resp_lect.scalars().all()
-            if not lecturas:
-                continue
-
+        # filas ordenadas por sector y de la más reciente a la más antigua
+        for (sector_id, nombre, zona), filas in groupby(res.all(), key=lambda f: (f.id, f.nombre, f.zona)):
+            lecturas = list(filas)
             lectura_reciente = lecturas[0]
             eficiencia_operativa = float(lectura_reciente.consumo_m3 / max(lectura_reciente.inyeccion_m3, 0.001))
             presion_actual = float(lectura_reciente.presion_psi)
@@ -341,85 +449,178 @@ async def construir_cuadricula_sectores() -> List[dict]:
             if loss_pct > 0.2 or eficiencia_operativa < 0.85:
                 estado = "critico"
 
-            res_cnt = await sesion.execute(
-                select(func.count(Alert.id)).where(
-                    Alert.sector_id == sector.id,
-                    Alert.estado == "abierta",
-                )
-            )
-            cantidad_alertas_abiertas = res_cnt.scalar_one()
-
             tendencia = [float(r.consumo_m3 / max(r.inyeccion_m3, 0.001)) for r in reversed(lecturas)]
 
             salida.append({
-                "id": sector.id,
-                "nombre": sector.nombre,
+                "id": sector_id,
+                "nombre": nombre,
+                "zona": zona,
                 "estado": estado,
                 "eficiencia": round(eficiencia_operativa, 3),
                 "presion_psi": round(presion_actual, 1),
-                "alertas_abiertas": int(cantidad_alertas_abiertas),
+                "alertas_abiertas": int(lectura_reciente.alertas_abiertas),
                 "tendencia": tendencia,
             })
 
         return salida
 
-async def listar_alertas(estado: str = "abierta") -> List[dict]:
-    estado = (estado or "").lower()
-    estados_validos = {"abierta", "atendida", "escalada"}
-    if estado not in estados_validos:
-        estado = "abierta"
-
-    titulo_por_tipo = {
-        "no_facturable": "Posible fuga",
-        "baja_eficiencia": "Baja eficiencia",
-        "sobrepresion": "Anomalía de presión",
+LIMITE_ALERTAS = 50
+LIMITE_ALERTAS_MAX = 500
+
+def codificar_cursor(ts: datetime, id_alerta: int) -> str:
+    """Cursor opaco de paginación: la clave (ts, id) de la última alerta entregada."""
+    return base64.urlsafe_b64encode(f"{ts.isoformat()}|{id_alerta}".encode()).decode()
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverso de `codificar_cursor`; ValueError si el cursor no es válido."""
+    try:
+        ts, id_alerta = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(ts), int(id_alerta)
+    except (UnicodeDecodeError, binascii.Error, ValueError) as exc:
+        raise ValueError("cursor inválido") from exc
+
+def _utc(ts: datetime) -> datetime:
+    """Marca del cliente en UTC con zona; sin zona se asume UTC (como se guarda)."""
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+def _utc_naive(ts: Optional[datetime]) -> Optional[datetime]:
+    """Las marcas se guardan en UTC sin zona: normaliza los filtros del cliente."""
+    if ts is None or ts.tzinfo is None:
+        return ts
+    return ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _consulta_alertas(
+    estado: str,
+    limite: int = LIMITE_ALERTAS,
+    sector_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    nivel: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    despues_de: Optional[Tuple[datetime, int]] = None,
+):
+    """
+    Página de alertas por keyset sobre (ts, id) descendente: la página N
+    cuesta lo mismo que la primera (búsqueda por índice, sin OFFSET).
+    `estado='todas'` no filtra por estado.
+    """
+    consulta = select(Alert)
+    if estado != "todas":
+        consulta = consulta.where(Alert.estado == estado)
+    if sector_id is not None:
+        consulta = consulta.where(Alert.sector_id == sector_id)
+    if tipo is not None:
+        consulta = consulta.where(Alert.tipo == tipo)
+    if nivel is not None:
+        consulta = consulta.where(Alert.nivel == nivel)
+    if desde is not None:
+        consulta = consulta.where(Alert.ts >= _utc_naive(desde))
+    if hasta is not None:
+        consulta = consulta.where(Alert.ts <= _utc_naive(hasta))
+    if despues_de is not None:
+        ts, id_alerta = despues_de
+        consulta = consulta.where(tuple_(Alert.ts, Alert.id) < tuple_(_utc_naive(ts), id_alerta))
+    return consulta.order_by(Alert.ts.desc(), Alert.id.desc()).limit(limite)
+
+_TITULO_POR_TIPO = {
+    "no_facturable": "Posible fuga",
+    "baja_eficiencia": "Baja eficiencia",
+    "sobrepresion": "Anomalía de presión",
+}
+
+def _elemento_alerta(alerta: Alert) -> dict:
+    """Alerta como la muestra el panel (listado REST y deltas)."""
+    titulo = _TITULO_POR_TIPO.get(alerta.tipo, "Alerta")
+    recomendacion = (
+        "Inspección en válvula 17. Prioridad alta. Hoy."
+        if alerta.nivel == "alta"
+        else "Monitoreo y verificación en sitio."
+    )
+    explicacion_dict = None
+    if alerta.explicacion:
+        try:
+            explicacion_dict = json.loads(alerta.explicacion)
+        except Exception:
+            explicacion_dict = {"raw": alerta.explicacion}
+
+    return {
+        "id": alerta.id,
+        "nivel": alerta.nivel,
+        "tipo": alerta.tipo,
+        "titulo": f"{titulo} en Sector {alerta.sector_id}",
+        "resumen": alerta.mensaje,
+        "impacto_m3_mes": 4800.0 if alerta.tipo in ("no_facturable", "baja_eficiencia") else None,
+        "recomendacion": recomendacion,
+        "sector_id": alerta.sector_id,
+        "created_at": alerta.ts,
+        "estado": alerta.estado,
+        "explicacion": explicacion_dict,
     }
 
-    async with contexto_sesion() as sesion:
-        res = await sesion.execute(
-            select(Alert)
-            .where(Alert.estado == estado)
-            .order_by(Alert.ts.desc())
-            .limit(50)
-        )
+def _estado_alertas(estado: Optional[str]) -> str:
+    estado = (estado or "").lower()
+    estados_validos = {"abierta", "atendida", "escalada", "todas"}
+    return estado if estado in estados_validos else "abierta"
+
+async def pagina_alertas(
+    estado: str = "abierta",
+    sector_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    nivel: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: int = LIMITE_ALERTAS,
+) -> dict:
+    """
+    Una página del listado de alertas (más recientes primero) y el cursor de
+    la siguiente. Lanza ValueError si `cursor` no es válido.
+    """
+    estado = _estado_alertas(estado)
+    limite = max(1, min(limite, LIMITE_ALERTAS_MAX))
+    despues_de = decodificar_cursor(cursor) if cursor else None
+    consulta = _consulta_alertas(estado, limite + 1, sector_id, tipo, nivel, desde, hasta, despues_de)
+
+    async with contexto_lectura() as sesion:
+        res = await sesion.execute(consulta)
         alertas = res.scalars().all()
 
-        elementos: list[dict] = []
-        for alerta in alertas:
-            titulo = titulo_por_tipo.get(alerta.tipo, "Alerta")
-            recomendacion = (
-                "Inspección en válvula 17. Prioridad alta. Hoy."
-                if alerta.nivel == "alta"
-                else "Monitoreo y verificación en sitio."
-            )
-            explicacion_dict = None
-            if alerta.explicacion:
-                try:
-                    explicacion_dict = json.loads(alerta.explicacion)
-                except Exception:
-                    explicacion_dict = {"raw": alerta.explicacion}
-
-            elementos.append({
-                "id": alerta.id,
-                "nivel": alerta.nivel,
-                "tipo": alerta.tipo,
-                "titulo": f"{titulo} en Sector {alerta.sector_id}",
-                "resumen": alerta.mensaje,
-                "impacto_m3_mes": 4800.0 if alerta.tipo in ("no_facturable", "baja_eficiencia") else None,
-                "recomendacion": recomendacion,
-                "sector_id": alerta.sector_id,
-                "created_at": alerta.ts,
-                "estado": alerta.estado,
-                "explicacion": explicacion_dict,
-            })
+    siguiente_cursor = None
+    if len(alertas) > limite:  # se pidió una de más sólo para saber si hay otra página
+        alertas = alertas[:limite]
+        siguiente_cursor = codificar_cursor(alertas[-1].ts, alertas[-1].id)
+    return {"items": [_elemento_alerta(a) for a in alertas], "siguiente_cursor": siguiente_cursor}
 
-        return elementos
+async def listar_alertas(estado: str = "abierta") -> List[dict]:
+    """Primera página de alertas de un estado (instantánea del tablero)."""
+    return (await pagina_alertas(estado))["items"]
+
+async def historial_sector(
+    sector_id: int,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    puntos_max: int = rollups.PUNTOS_MAX_HISTORIAL,
+) -> dict:
+    """
+    Serie histórica de un sector leída de los rollups (minuto/hora/día):
+    se usa la resolución más fina que no exceda `puntos_max` cubetas.
+    """
+    hasta = _utc(hasta) if hasta else datetime.now(timezone.utc)
+    desde = _utc(desde) if desde else hasta - timedelta(hours=24)
+    async with contexto_lectura() as sesion:
+        resolucion, puntos = await rollups.historial(
+            sesion, sector_id, _utc_naive(desde), _utc_naive(hasta), puntos_max,
+        )
+    return dict(sector_id=sector_id, resolucion=resolucion, desde=desde, hasta=hasta, items=puntos)
+
+def _consulta_alerta(id_alerta: int):
+    return select(Alert).where(Alert.id == id_alerta)
 
 async def atender_alerta(id_alerta: int, correo_usuario: str, nota: Optional[str]):
     ahora = datetime.now(timezone.utc)
     async with contexto_sesion() as sesion:
         async with sesion.begin():
-            res = await sesion.execute(select(Alert).where(Alert.id == id_alerta))
+            res = await sesion.execute(_consulta_alerta(id_alerta))
             alerta = res.scalar_one_or_none()
             if not alerta or alerta.estado != "abierta":
                 return None
@@ -427,114 +628,514 @@ async def atender_alerta(id_alerta: int, correo_usuario: str, nota: Optional[str
             alerta.atendida_por = correo_usuario
             alerta.atendida_en = ahora
             sesion.add(ActionLog(alert_id=id_alerta, actor=correo_usuario, accion="ack", nota=nota))
+        await _emitir_cambio({"type": "ack", "ts": ahora.isoformat(), "filas": [[alerta.id, alerta.sector_id, alerta.tipo]]})
         return {"status": "acknowledged", "by_user": correo_usuario, "ts": ahora}
 
+TAMANO_LOTE_ACK = 500  # ids por UPDATE (muy por debajo del límite de variables de SQLite)
+
+def _sentencia_atender(ids: List[int], correo_usuario: str, ahora: datetime):
+    """UPDATE sólo de las que siguen abiertas; RETURNING dice exactamente cuáles cambiaron."""
+    return (
+        update(Alert)
+        .where(Alert.id.in_(ids), Alert.estado == "abierta")
+        .values(estado="atendida", atendida_por=correo_usuario, atendida_en=ahora)
+        .returning(Alert.id, Alert.sector_id, Alert.tipo)
+        .execution_options(synchronize_session=False)
+    )
+
+async def atender_alertas(ids: List[int], correo_usuario: str, nota: Optional[str] = None) -> List[int]:
+    """
+    ACK masivo por conjuntos: por cada lote de TAMANO_LOTE_ACK ids, un
+    UPDATE ... RETURNING y un INSERT masivo de su ActionLog, todo en una
+    transacción. No carga alertas en la sesión; devuelve los ids que cambiaron.
+    """
+    ahora = datetime.now(timezone.utc)
+    unicos = list(dict.fromkeys(ids))
+    atendidas = []
+    async with contexto_sesion() as sesion:
+        async with sesion.begin():
+            for i in range(0, len(unicos), TAMANO_LOTE_ACK):
+                res = await sesion.execute(_sentencia_atender(unicos[i:i + TAMANO_LOTE_ACK], correo_usuario, ahora))
+                lote = res.all()
+                if not lote:
+                    continue
+                await sesion.execute(insert(ActionLog), [
+                    dict(alert_id=fila.id, actor=correo_usuario, accion="ack", nota=nota, ts=ahora)
+                    for fila in lote
+                ])
+                atendidas.extend(lote)
+    if atendidas:
+        await _emitir_cambio({
+            "type": "ack",
+            "ts": ahora.isoformat(),
+            "filas": [[fila.id, fila.sector_id, fila.tipo] for fila in atendidas],
+        })
+    return [fila.id for fila in atendidas]
+
 # ─────────────────────────────────────────────────────────────
-# SSE (opcional, sigue funcionando para toasts)
+# SSE (toasts y aviso de tick)
 # ─────────────────────────────────────────────────────────────
-async def suscribirse_eventos():
-    cola: asyncio.Queue = asyncio.Queue()
-    _SUSCRIPTORES.add(cola)
-    try:
+async def suscribirse_eventos(espera: float = LATIDO_SEGUNDOS):
+    """
+    Tramas SSE ya serializadas para un cliente. Produce None cada `espera`
+    segundos sin eventos (latido: permite detectar desconexiones).
+    Cola acotada por cliente: ticks coalescidos, alertas con drop-oldest.
+    """
+    with _EVENTOS.suscripcion() as suscriptor:
         while True:
-            dato = await cola.get()
-            yield dato
-    finally:
-        _SUSCRIPTORES.discard(cola)
+            yield await suscriptor.siguiente(espera)
+
+def eventos_saturados() -> bool:
+    return not _EVENTOS.admite()
 
 def _difundir(payload: dict):
-    for cola in list(_SUSCRIPTORES):
-        if not cola.full():
-            cola.put_nowait(payload)
+    _EVENTOS.publicar(payload)
+
+# ─────────────────────────────────────────────────────────────
+# Respuestas pre-serializadas de las rutas calientes
+# ─────────────────────────────────────────────────────────────
+def _clave_respuesta(ruta: str, parametros: dict) -> Tuple[str, tuple]:
+    """
+    Clave de caché canónica: estado y límite normalizados y sin parámetros
+    en su valor por defecto, así `/alerts` y `/alerts?limite=50` comparten entrada.
+    """
+    parametros = dict(parametros)
+    if ruta == "alertas":
+        parametros["estado"] = _estado_alertas(parametros.get("estado"))
+        limite = max(1, min(parametros.get("limite") or LIMITE_ALERTAS, LIMITE_ALERTAS_MAX))
+        parametros["limite"] = None if limite == LIMITE_ALERTAS else limite
+    return ruta, tuple(sorted((k, v) for k, v in parametros.items() if v is not None))
+
+# Rutas calientes: fijas en la caché (fuera del LRU) y rehechas tras cada tick
+_RUTAS_PRECALENTADAS = (
+    _clave_respuesta("kpis", {}),
+    _clave_respuesta("sectores", {}),
+    _clave_respuesta("alertas", {"estado": "abierta"}),
+)
+_RESPUESTAS = CacheRespuestas(fijas=_RUTAS_PRECALENTADAS)
+
+async def _serializar(ruta: str, parametros: dict, tarjetas: Optional[List[dict]] = None) -> bytes:
+    if ruta == "kpis":
+        modelo = KPIResponse.model_validate(kpis_tablero())
+    elif ruta == "sectores":
+        if tarjetas is None:
+            tarjetas = await construir_cuadricula_sectores()
+        modelo = SectorsResponse.model_validate({"items": tarjetas})
+    else:
+        modelo = AlertsResponse.model_validate(await pagina_alertas(**parametros))
+    return modelo.model_dump_json().encode()
+
+async def respuesta_json(ruta: str, **parametros) -> bytes:
+    """
+    Cuerpo JSON final de /kpis/current, /sectors o /alerts para la versión de
+    datos vigente. La versión se toma antes de producir: si entra un tick a
+    mitad, la entrada queda marcada como vieja y la próxima lectura la rehace.
+    """
+    clave = _clave_respuesta(ruta, parametros)
+    version = etag_datos()
+    cuerpo = _RESPUESTAS.obtener(clave, version)
+    if cuerpo is None:
+        cuerpo = await _serializar(ruta, dict(clave[1]))
+        _RESPUESTAS.guardar(clave, version, cuerpo)
+    return cuerpo
+
+async def _precalentar_respuestas(tarjetas: List[dict]):
+    """
+    Tras el commit del tick: rehace sólo las rutas calientes (reusa la
+    cuadrícula del delta) y descarta las demás variantes, que se rehacen si
+    se vuelven a pedir.
+    """
+    version = etag_datos()
+    _RESPUESTAS.invalidar_variantes()
+    for clave in _RUTAS_PRECALENTADAS:
+        ruta, parametros = clave
+        cuerpo = await _serializar(ruta, dict(parametros), tarjetas)
+        _RESPUESTAS.guardar(clave, version, cuerpo)
+
+# ─────────────────────────────────────────────────────────────
+# WebSocket del tablero (deltas versionados)
+# ─────────────────────────────────────────────────────────────
+def _publicar_delta_tick(ts: str, alertas_nuevas: List[dict], tarjetas: List[dict]):
+    """Un delta por tick: tarjetas que cambiaron, alertas nuevas y el KPI nuevo."""
+    sectores, retirados = _DELTAS.cambios_tarjetas(tarjetas)
+    _DELTAS.publicar({
+        "ts": ts,
+        "sectores": sectores,
+        "sectores_retirados": retirados,
+        "alertas_nuevas": alertas_nuevas,
+        "alertas_atendidas": [],
+        "kpis": kpis_tablero(),
+    })
+
+def _publicar_delta_atenciones(ids: List[int], sectores_afectados: List[int], ts: str):
+    """Delta fuera del tick tras un ACK: ids atendidos, conteos por sector y KPIs."""
+    sectores = []
+    for sector_id in sorted(set(sectores_afectados)):
+        tarjeta = _DELTAS.ajustar_tarjeta(sector_id, alertas_abiertas=_ABIERTAS.por_sector.get(sector_id, 0))
+        if tarjeta is not None:
+            sectores.append(tarjeta)
+    _DELTAS.publicar({
+        "ts": ts,
+        "sectores": sectores,
+        "sectores_retirados": [],
+        "alertas_nuevas": [],
+        "alertas_atendidas": ids,
+        "kpis": kpis_tablero(),
+    })
+
+async def instantanea_tablero() -> str:
+    """Estado completo del tablero para un cliente que no puede reanudar."""
+    version = _DELTAS.version  # antes de leer: si entra un tick, el delta se reaplica sin efecto
+    return json.dumps({
+        "type": "snapshot",
+        "epoca": _DELTAS.epoca,
+        "version": version,
+        "payload": {
+            "kpis": kpis_tablero(),
+            "sectores": await construir_cuadricula_sectores(),
+            "alertas": await listar_alertas("abierta"),
+        },
+    }, default=str)
+
+def tablero_saturado() -> bool:
+    return _DELTAS.clientes >= MAX_SUSCRIPTORES
+
+async def suscribirse_tablero(
+    desde: Optional[int] = None,
+    epoca: Optional[str] = None,
+    espera: float = LATIDO_SEGUNDOS,
+):
+    """
+    Mensajes ya serializados para un cliente WebSocket: instantánea o los
+    deltas pendientes desde `desde` (misma `epoca`), luego cada delta nuevo.
+    Si el cliente se atrasa más que el anillo, recibe otra instantánea.
+    Produce None cada `espera` segundos sin cambios (latido).
+    """
+    _DELTAS.clientes += 1
+    try:
+        if _DELTAS.reanudable(desde, epoca):
+            version = desde
+        else:
+            version = _DELTAS.version
+            yield await instantanea_tablero()
+        while True:
+            if not await _DELTAS.esperar(version, espera):
+                yield None
+                continue
+            pendientes = _DELTAS.pendientes(version)
+            version = _DELTAS.version
+            if pendientes is None:
+                yield await instantanea_tablero()
+                continue
+            for trama in pendientes:
+                yield trama
+    finally:
+        _DELTAS.clientes -= 1
 
 # ─────────────────────────────────────────────────────────────
 # Bucle de simulación
 # ─────────────────────────────────────────────────────────────
-async def _bucle_simulacion():
-    ids_sectores = await asegurar_sectores_semilla()
-    estado = EstadoSimulacion(ids_sectores)
+async def _tras_escritura(ticks: List[TickPendiente]):
+    """
+    Post-commit de un lote del escritor diferido (las alertas ya tienen id):
+    un solo cambio "tick" para todo el lote.
+    """
+    inicio = time.perf_counter()
+    alertas = []
+    for tick in ticks:
+        for alerta in tick.alertas:
+            elemento = _elemento_alerta(alerta)
+            elemento["created_at"] = alerta.ts.isoformat()
+            alertas.append(elemento)
+    await _emitir_cambio({
+        "type": "tick",
+        "ticks": [[tick.instante.isoformat(), tick.eficiencia] for tick in ticks],
+        "alertas": alertas,
+    })
+    TICK_FASES.observar(time.perf_counter() - inicio, "post_commit")
+
+def _tras_descarte(ticks: List[TickPendiente]):
+    """Lote perdido: sus alertas nunca se escribieron, no deben seguir marcadas como abiertas."""
+    for tick in ticks:
+        for alerta in tick.alertas:
+            _ABIERTAS.quitar(alerta.sector_id, alerta.tipo)
+
+async def _restaurar_punto_de_control(motor: MotorVectorial, ahora: datetime):
+    """Arranque en caliente: estado del motor y enfriamientos del último punto de control."""
+    try:
+        sectores = await asyncio.to_thread(motor.cargar, RUTA_ESTADO_MOTOR)
+    except Exception as exc:  # instantánea dañada: se arranca en frío
+        print(f"[ERROR] Estado del motor ilegible ({RUTA_ESTADO_MOTOR}), arranque en frío: {exc!r}")
+        sectores = 0
+    try:
+        vigentes = _ENFRIAMIENTOS.cargar(ahora)
+    except Exception as exc:  # nunca impide arrancar el bucle: se empieza sin enfriamientos
+        print(f"[ERROR] Enfriamientos ilegibles, se empieza vacío: {exc!r}")
+        _ENFRIAMIENTOS.limpiar()
+        vigentes = 0
+    print(f"[DEBUG] Arranque en caliente: {sectores}/{len(motor)} sectores restaurados, {vigentes} enfriamientos vigentes")
 
-    global _PERFILES, _INCIDENTES
-    _PERFILES = _crear_perfiles(ids_sectores)
-    _INCIDENTES = {}
+_CANDADO_PUNTO_CONTROL = asyncio.Lock()  # un solo volcado a la vez sobre los mismos .tmp
 
-    procesos_inyeccion = {sid: ProcesoAR1(0.7, 5.0, 120.0) for sid in ids_sectores}
-    procesos_consumo   = {sid: ProcesoAR1(0.7, 5.0, 110.0) for sid in ids_sectores}
-    procesos_presion   = {sid: ProcesoAR1(0.6, 1.5, _PERFILES[sid]["pressure_nom"]) for sid in ids_sectores}
+async def _volcar_estado(motor: MotorVectorial):
+    await asyncio.to_thread(motor.guardar, RUTA_ESTADO_MOTOR)
+    await _ENFRIAMIENTOS.guardar()
 
-    ahora = datetime.now(timezone.utc)
-    async with contexto_sesion() as sesion:
-        async with sesion.begin():
-            for sid in ids_sectores:
-                datos = simular_lectura(sid, ahora, procesos_inyeccion[sid], procesos_consumo[sid], procesos_presion[sid])
-                sesion.add(Reading(**datos))
-        await sesion.commit()
+async def _guardar_punto_de_control():
+    """
+    Vuelca el estado del motor (en un hilo) y los enfriamientos; lo retoma el
+    próximo arranque. Cancelar al que espera no corta el volcado (el hilo
+    seguiría escribiendo el .tmp): se espera a que termine antes de soltar
+    el candado, así el guardado final del apagado nunca se le cruza.
+    """
+    if _MOTOR is None:
+        return
+    async with _CANDADO_PUNTO_CONTROL:
+        volcado = asyncio.create_task(_volcar_estado(_MOTOR))
+        try:
+            await asyncio.shield(volcado)
+        except asyncio.CancelledError:
+            await volcado
+            raise
 
-    intervalo_segundos = 10  # demo
+async def _bucle_simulacion(reloj: Optional[RelojReal | RelojVirtual] = None):
+    """
+    Sólo cómputo: cada tick se simula, se deduplica contra el índice de
+    abiertas y se encola en el escritor diferido, que lo escribe en lote.
+    El ritmo lo marca `_PROGRAMADOR` (periodo fijo, sin deriva); un tick que
+    no termina a tiempo, incluida la espera por un escritor lleno, cuenta
+    como desborde. Arranca desde el último punto de control (si lo hay) y
+    deja uno nuevo cada INTERVALO_PUNTO_CONTROL_SEGUNDOS.
+    """
+    global _MOTOR
+    reloj = reloj or RelojReal()
+    ids_sectores = await asegurar_sectores_semilla()
+    motor = crear_motor(ids_sectores)
+
+    _PROGRAMADOR.iniciar(reloj)
+    ahora = _PROGRAMADOR.instante()
+    await _restaurar_punto_de_control(motor, ahora)
+    _MOTOR = motor
+    proximo_punto_control = time.monotonic() + INTERVALO_PUNTO_CONTROL_SEGUNDOS
+    lecturas = motor.simular(ahora, factor_estacional_por_hora(ahora))
+    await _ESCRITOR.encolar(ahora, motor.filas(lecturas, ahora), [], float(lecturas["eficiencia"].mean()))
 
     while True:
-        instante = datetime.now(timezone.utc)
-
-        # gestionar incidentes por sector
-        for sid in ids_sectores:
-            inc = _INCIDENTES.get(sid)
-            if inc and inc["hasta"] <= instante:
-                _INCIDENTES.pop(sid, None)
-            if sid not in _INCIDENTES and random.random() < INCIDENT_PROB:
-                _levanta_incidente(sid, instante, intervalo_segundos)
-
-        async with contexto_sesion() as sesion:
-            async with sesion.begin():
-                for sid in ids_sectores:
-                    datos = simular_lectura(sid, instante, procesos_inyeccion[sid], procesos_consumo[sid], procesos_presion[sid])
-                    lectura = Reading(**datos)
-                    sesion.add(lectura)
-
-                    nuevas = evaluar_reglas_alertas(
-                        lectura,
-                        estado.medias_moviles_eficiencia[sid],
-                        estado.medias_moviles_presion[sid],
-                        estado.conteo_baja_eficiencia
-                    )
-
-                    # deduplicación en DB: no abrir (sector,tipo) si ya hay una 'abierta'
-                    for alerta in nuevas:
-                        existe = await sesion.execute(
-                            select(func.count(Alert.id)).where(
-                                Alert.sector_id == alerta.sector_id,
-                                Alert.tipo == alerta.tipo,
-                                Alert.estado == "abierta",
-                            )
-                        )
-                        if existe.scalar_one():
-                            continue  # ya hay una abierta de este tipo en el sector
-                        sesion.add(alerta)
-                        _difundir({
-                            "type": "alert",
-                            "payload": {
-                                "id": alerta.id,
-                                "sector_id": alerta.sector_id,
-                                "nivel": alerta.nivel,
-                                "tipo": alerta.tipo,
-                                "ts": alerta.ts.isoformat() if hasattr(alerta.ts, "isoformat") else instante.isoformat(),
-                            }
-                        })
-
-                    estado.ventana_tendencia[sid].append(lectura.consumo_m3 / max(lectura.inyeccion_m3, 0.001))
-
-        _difundir({"type": "tick", "payload": {"ts": instante.isoformat()}})
-        await asyncio.sleep(intervalo_segundos)
+        TICK_RETRASO.observar(await _PROGRAMADOR.esperar_siguiente())
+        instante = _PROGRAMADOR.instante()
+        inicio = time.perf_counter()
+
+        # un solo paso vectorizado para todos los sectores
+        fases: Dict[str, float] = {}
+        lecturas, nuevas = calcular_tick(motor, instante, _PROGRAMADOR.periodo, fases=fases)
+        calculado = time.perf_counter()
+
+        # deduplicación en memoria: no abrir (sector,tipo) si ya hay una 'abierta'.
+        # Se marca abierta al encolar, así los ticks aún sin escribir ya la ven.
+        emitidas: List[Alert] = []
+        for alerta in nuevas:
+            if _ABIERTAS.existe(alerta.sector_id, alerta.tipo):
+                ALERTAS_SUPRIMIDAS.inc(alerta.tipo, "abierta")
+                continue  # ya hay una abierta de este tipo en el sector
+            _ABIERTAS.agregar(alerta.sector_id, alerta.tipo)
+            ALERTAS_EMITIDAS.inc(alerta.tipo)
+            emitidas.append(alerta)
+        deduplicado = time.perf_counter()
+
+        await _ESCRITOR.encolar(instante, motor.filas(lecturas, instante), emitidas, float(lecturas["eficiencia"].mean()))
+        fin = time.perf_counter()
+        fases.update(deduplicacion=deduplicado - calculado, encolado=fin - deduplicado)
+        for fase, segundos in fases.items():
+            TICK_FASES.observar(segundos, fase)
+        TICK_SEGUNDOS.observar(fin - inicio)
+        if time.monotonic() >= proximo_punto_control:
+            proximo_punto_control = time.monotonic() + INTERVALO_PUNTO_CONTROL_SEGUNDOS
+            await _guardar_punto_de_control()
 
-async def iniciar_simulacion_segundo_plano():
-    global _TAREA_SIMULACION
+# ─────────────────────────────────────────────────────────────
+# Cambios de estado compartidos entre workers
+# ─────────────────────────────────────────────────────────────
+async def _aplicar_tick(mensaje: dict):
+    """Eventos por alerta, cada tick a los KPIs y un solo delta/caché por lote (la cuadrícula se lee una vez)."""
+    alertas = mensaje["alertas"]
+    if not _COORDINADOR.es_lider:  # en el líder el bucle ya las marcó abiertas al encolar
+        for elemento in alertas:
+            _ABIERTAS.agregar(elemento["sector_id"], elemento["tipo"])
+    for ts, eficiencia in mensaje["ticks"]:
+        _KPIS.registrar_tick(datetime.fromisoformat(ts), eficiencia)
+    for elemento in alertas:
+        _difundir({
+            "type": "alert",
+            "payload": {
+                "id": elemento["id"],
+                "sector_id": elemento["sector_id"],
+                "nivel": elemento["nivel"],
+                "tipo": elemento["tipo"],
+                "ts": elemento["created_at"],
+            }
+        })
+    ts = mensaje["ticks"][-1][0]
+    _difundir({"type": "tick", "payload": {"ts": ts}})
+    tarjetas = await construir_cuadricula_sectores()
+    _publicar_delta_tick(ts, alertas, tarjetas)
+    await _precalentar_respuestas(tarjetas)
+
+def _aplicar_ack(mensaje: dict):
+    ahora = datetime.fromisoformat(mensaje["ts"])
+    for _, sector_id, tipo in mensaje["filas"]:
+        _ABIERTAS.quitar(sector_id, tipo)
+        _KPIS.registrar_atencion(ahora)
+    _publicar_delta_atenciones([f[0] for f in mensaje["filas"]], [f[1] for f in mensaje["filas"]], mensaje["ts"])
+
+async def _aplicar_cambio(mensaje: dict):
+    """Aplica un cambio a la memoria de este proceso (índice, KPIs, SSE, deltas, caché)."""
+    global _VERSION_DATOS, _EPOCA_DATOS
+    if "version" in mensaje:
+        _EPOCA_DATOS, _VERSION_DATOS = mensaje["epoca"], mensaje["version"]
+    else:
+        _marcar_cambio()
+    if mensaje["type"] == "tick":
+        await _aplicar_tick(mensaje)
+    elif mensaje["type"] == "ack":
+        _aplicar_ack(mensaje)
+    elif mensaje["type"] == "reconstruir":
+        await _recargar_desde_db()
+    # "retencion": sólo la versión (el listado de alertas atendidas cambió)
+
+async def _emitir_cambio(mensaje: dict):
+    """
+    Cambio de estado ya confirmado en DB. El líder lo sella con la siguiente
+    versión, lo reparte a los seguidores y lo aplica; un seguidor se lo manda
+    al líder (que se lo devolverá sellado) o, sin conexión, lo aplica solo.
+    """
+    if _COORDINADOR.es_lider:
+        mensaje.update(epoca=_EPOCA_DATOS, version=_VERSION_DATOS + 1)
+        _COORDINADOR.difundir(mensaje)
+        await _aplicar_cambio(mensaje)
+    elif not _COORDINADOR.enviar_al_lider(mensaje):
+        await _aplicar_cambio(mensaje)
+
+async def _recibir_mensaje(mensaje: dict):
+    if _COORDINADOR.es_lider:
+        await _emitir_cambio(mensaje)  # de un seguidor: sellar y repartir a todos
+    else:
+        await _aplicar_cambio(mensaje)
+
+async def _arrancar_como_lider():
+    global _TAREA_SIMULACION, _EPOCA_DATOS
     if _TAREA_SIMULACION is None or _TAREA_SIMULACION.done():
+        _EPOCA_DATOS = _DELTAS.epoca
+        if _COORDINADOR.fue_seguidor:
+            await reconstruir_estado()  # relevo: pudieron perderse cambios del líder caído
+        _ESCRITOR.iniciar(_tras_escritura, _tras_descarte)
+        _RETENCION.iniciar(_tras_retencion)
         _TAREA_SIMULACION = asyncio.create_task(_bucle_simulacion())
 
+async def _conectar_como_seguidor():
+    """Al (re)conectar con un líder: época propia nueva hasta el primer cambio sellado."""
+    global _EPOCA_DATOS
+    _EPOCA_DATOS = secrets.token_hex(4)  # ninguna versión vieja puede repetir un ETag
+    await reconstruir_estado()
+
+_COORDINADOR = Coordinador(
+    DB_PATH.with_name(DB_PATH.name + ".lider"),
+    DB_PATH.with_name(DB_PATH.name + ".sock"),
+    al_ser_lider=_arrancar_como_lider,
+    al_recibir=_recibir_mensaje,
+    al_conectar=_conectar_como_seguidor,
+)
+
+async def _tras_retencion(resumen: dict):
+    if resumen["filas_archivadas"]["alert"]:
+        await _emitir_cambio({"type": "retencion"})
+
+def diagnostico() -> dict:
+    """
+    Estado detallado de cada componente de este worker, en un solo documento
+    (lo que /metrics no puede expresar como número: política, versiones,
+    última corrida de retención, ...).
+    """
+    return dict(
+        coordinacion=_COORDINADOR.metricas(),
+        programador=_PROGRAMADOR.metricas(),
+        escritor=dict(_ESCRITOR.metricas(), pools=metricas_pools()),
+        enfriamientos=_ENFRIAMIENTOS.metricas(),
+        eventos=_EVENTOS.metricas(),
+        tablero=_DELTAS.metricas(),
+        cache=_RESPUESTAS.metricas(),
+        retencion=_RETENCION.metricas(),
+    )
+
+def _recolectar_metricas():
+    """Lo que ya cuentan programador, escritor, SSE, WebSocket, caché, pools y coordinación, para /metrics."""
+    escritor = _ESCRITOR.metricas()
+    eventos = _EVENTOS.metricas()
+    respuestas = _RESPUESTAS.metricas()
+    coordinacion = _COORDINADOR.metricas()
+    yield ("sapal_proceso", "gauge", "Worker y su rol en la simulación (siempre 1)",
+           {"pid": str(coordinacion["pid"]), "rol": coordinacion["rol"]}, 1)
+    for campo, ayuda in (
+        ("ticks_escritos", "Ticks confirmados por el escritor diferido"),
+        ("filas_escritas", "Lecturas escritas"),
+        ("alertas_escritas", "Alertas escritas"),
+        ("lotes", "Transacciones del escritor diferido"),
+        ("reintentos", "Reintentos de lotes fallidos"),
+        ("lotes_descartados", "Lotes descartados tras agotar los reintentos"),
+    ):
+        yield (f"sapal_escritor_{campo}_total", "counter", ayuda, {}, escritor[campo])
+    programador = _PROGRAMADOR.metricas()
+    yield ("sapal_tick_periodo_segundos", "gauge", "Periodo fijo del tick", {}, programador["periodo_s"])
+    yield ("sapal_tick_desbordes_total", "counter", "Ticks lentos: uno por tick que se pasó de su ranura (la ráfaga de alcance no cuenta)", {}, programador["desbordes"])
+    yield ("sapal_tick_ranuras_saltadas_total", "counter", "Ranuras de tick descartadas por atraso", {}, programador["ranuras_saltadas"])
+    enfriamientos = _ENFRIAMIENTOS.metricas()
+    yield ("sapal_enfriamientos_vigentes", "gauge", "Claves (sector, tipo) en enfriamiento", {}, enfriamientos["entradas"])
+    yield ("sapal_enfriamientos_desalojados_total", "counter", "Enfriamientos descartados por tope de memoria", {}, enfriamientos["desalojadas"])
+    yield ("sapal_escritor_cola_ticks", "gauge", "Ticks en cola sin escribir", {}, escritor["profundidad_cola"])
+    yield ("sapal_escritor_retraso_segundos", "gauge", "Edad del tick más viejo sin escribir", {}, escritor["retraso_pendiente_s"])
+    yield ("sapal_sse_suscriptores", "gauge", "Clientes SSE conectados", {}, eventos["suscriptores"])
+    yield ("sapal_sse_rechazados_total", "counter", "Conexiones SSE rechazadas por cupo", {}, eventos["rechazados"])
+    yield ("sapal_sse_eventos_publicados_total", "counter", "Eventos SSE publicados", {}, eventos["eventos_publicados"])
+    yield ("sapal_sse_eventos_descartados_total", "counter", "Eventos SSE descartados por cola llena", {}, eventos["eventos_descartados"])
+    yield ("sapal_sse_ticks_coalescidos_total", "counter", "Avisos de tick reemplazados por uno más nuevo en la cola", {}, eventos["ticks_coalescidos"])
+    yield ("sapal_ws_clientes", "gauge", "Clientes WebSocket del tablero", {}, _DELTAS.clientes)
+    yield ("sapal_ws_version", "gauge", "Versión de datos publicada al tablero", {}, _DELTAS.version)
+    yield ("sapal_cache_respuestas_total", "counter", "Consultas a la caché de respuestas", {"resultado": "acierto"}, respuestas["aciertos"])
+    yield ("sapal_cache_respuestas_total", "counter", "Consultas a la caché de respuestas", {"resultado": "fallo"}, respuestas["fallos"])
+    yield ("sapal_cache_expulsiones_total", "counter", "Variantes expulsadas por el LRU de respuestas", {}, respuestas["expulsiones"])
+    for pool, datos in metricas_pools().items():
+        yield ("sapal_db_conexiones_en_uso", "gauge", "Conexiones prestadas por pool", {"pool": pool}, datos["en_uso"])
+    yield ("sapal_retencion_corridas_total", "counter", "Corridas de retención terminadas", {}, _RETENCION.corridas)
+    for campo, ayuda in (
+        ("mensajes_enviados", "Mensajes enviados por el canal entre workers"),
+        ("mensajes_recibidos", "Mensajes recibidos por el canal entre workers"),
+        ("desconectados_por_lentitud", "Seguidores desconectados por no leer a tiempo"),
+        ("errores", "Errores atrapados en la coordinación entre workers"),
+    ):
+        yield (f"sapal_coordinacion_{campo}_total", "counter", ayuda, {}, coordinacion[campo])
+    yield ("sapal_coordinacion_seguidores", "gauge", "Seguidores conectados a este líder", {}, coordinacion["seguidores"])
+
+REGISTRO.recolector(_recolectar_metricas)
+
+async def iniciar_simulacion_segundo_plano():
+    """
+    Con varios workers sólo uno (el que toma el candado junto a app.db)
+    simula; los demás reciben sus cambios por el socket Unix.
+    """
+    await reconstruir_estado()
+    await _COORDINADOR.iniciar()
+
 async def detener_simulacion_segundo_plano():
     global _TAREA_SIMULACION
-    if _TAREA_SIMULACION and not _TAREA_SIMULACION.done():
+    simulaba = _TAREA_SIMULACION is not None and not _TAREA_SIMULACION.done()
+    if simulaba:
         _TAREA_SIMULACION.cancel()
         try:
-            await _TAREA_SIMULACION
+            await _TAREA_SIMULACION  # incluye un punto de control a medio volcar
         except asyncio.CancelledError:
-            pass
\ No newline at end of file
+            pass
+    await _RETENCION.detener()
+    await _ESCRITOR.detener()  # escribe los ticks que quedaban en cola
+    if simulaba:
+        # después de vaciar el escritor: la DB ya tiene todo lo que el motor simuló
+        await _guardar_punto_de_control()  # el próximo líder retoma desde aquí
+    await _COORDINADOR.detener()
\ No newline at end of file
@@ -0,0 +1,406 @@
+# benchmarks/micro.py
+"""
+Micro-benchmarks de SAPAL: ruta escalar de simulación y reglas, tick
+vectorizado, tick completo del bucle en vivo (cómputo + escritor diferido +
+post-commit) y funciones de servicio del tablero, contra bases sembradas de
+tamaño creciente.
+
+Cada tamaño corre en un subproceso con su propia base temporal
+(SAPAL_DB_PATH) y un catálogo sintético de N sectores, sembrado con el
+backfill (`--horas` de historia, un tick cada `--intervalo` s). Los
+resultados se guardan en JSON para comparar corridas y trazar curvas de escala.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.micro correr --sectores 100 1000 10000
+    python -m benchmarks.micro comparar base.json nuevo.json --tolerancia 0.25
+
+`comparar` sale con código 1 si algún caso empeora más que la tolerancia
+(mediana), para usarlo como compuerta antes de desplegar.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+RAIZ = Path(__file__).resolve().parent.parent
+DIR_RESULTADOS = RAIZ / "benchmarks" / "resultados"
+VERSION_FORMATO = 1
+
+Medible = Callable[[], Union[None, Awaitable[None]]]
+
+
+# ─────────────────────────────────────────────────────────────
+# Medición
+# ─────────────────────────────────────────────────────────────
+def _estadisticas(muestras: List[float]) -> dict:
+    """Milisegundos por llamada (las muestras vienen en segundos)."""
+    ms = sorted(m * 1000 for m in muestras)
+    p95 = statistics.quantiles(ms, n=20)[18] if len(ms) >= 2 else ms[0]
+    return dict(
+        min_ms=round(ms[0], 4),
+        mediana_ms=round(statistics.median(ms), 4),
+        p95_ms=round(p95, 4),
+        media_ms=round(statistics.fmean(ms), 4),
+        desv_ms=round(statistics.stdev(ms), 4) if len(ms) >= 2 else 0.0,
+    )
+
+
+async def _medir(
+    caso: str,
+    sectores: int,
+    llamada: Medible,
+    repeticiones: int,
+    numero: int = 1,
+    calentamiento: int = 1,
+    preparar: Optional[Callable[[], None]] = None,
+) -> dict:
+    """
+    `repeticiones` muestras de `numero` llamadas cada una (síncronas o
+    corrutinas); `preparar` corre antes de cada muestra, fuera del cronómetro.
+    """
+    muestras: List[float] = []
+    for i in range(calentamiento + repeticiones):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        for _ in range(numero):
+            resultado = llamada()
+            if inspect.isawaitable(resultado):
+                await resultado
+        transcurrido = time.perf_counter() - inicio
+        if i >= calentamiento:
+            muestras.append(transcurrido / numero)
+    fila = dict(caso=caso, sectores=sectores, repeticiones=repeticiones, numero=numero)
+    fila.update(_estadisticas(muestras))
+    print(f"[bench] {caso:<32} N={sectores:<6} mediana {fila['mediana_ms']:.4f} ms · p95 {fila['p95_ms']:.4f} ms", flush=True)
+    return fila
+
+
+# ─────────────────────────────────────────────────────────────
+# Casos (subproceso por tamaño)
+# ─────────────────────────────────────────────────────────────
+async def _casos_simulacion(sectores: int, ids: List[int], repeticiones: int, semilla: int) -> List[dict]:
+    """Ruta escalar de referencia (por sector) y tick vectorizado (todos los sectores)."""
+    from backend.models import Reading
+    from backend.services import sim
+    from backend.services.enfriamientos import RegistroEnfriamientos
+
+    random.seed(semilla)
+    ahora = datetime.now(timezone.utc)
+    sim._PERFILES.update(sim._crear_perfiles(ids))
+    procesos = {
+        sid: (sim.ProcesoAR1(0.7, 5.0, 120.0), sim.ProcesoAR1(0.7, 5.0, 110.0), sim.ProcesoAR1(0.6, 1.5, 40.0))
+        for sid in ids
+    }
+    estado = sim.EstadoSimulacion(ids)
+    lecturas = [Reading(**sim.simular_lectura(sid, ahora, *procesos[sid])) for sid in ids]
+    resultados = []
+
+    pendientes_lectura = iter(())
+
+    def _preparar_lecturas():
+        nonlocal pendientes_lectura
+        pendientes_lectura = iter(ids)
+
+    def _una_lectura():
+        sid = next(pendientes_lectura)
+        sim.simular_lectura(sid, ahora, *procesos[sid])
+
+    resultados.append(await _medir(
+        "simular_lectura", sectores, _una_lectura, repeticiones, numero=len(ids), preparar=_preparar_lecturas,
+    ))
+
+    pendientes_reglas = iter(())
+
+    def _preparar_reglas():
+        nonlocal pendientes_reglas
+        sim._ENFRIAMIENTOS.limpiar()  # mismo trabajo en cada muestra: sin enfriamientos previos
+        pendientes_reglas = iter(lecturas)
+
+    def _una_regla():
+        lectura = next(pendientes_reglas)
+        sim.evaluar_reglas_alertas(
+            lectura,
+            estado.medias_moviles_eficiencia[lectura.sector_id],
+            estado.medias_moviles_presion[lectura.sector_id],
+            estado.conteos_histeresis,
+        )
+
+    resultados.append(await _medir(
+        "evaluar_reglas_alertas", sectores, _una_regla, repeticiones, numero=len(ids), preparar=_preparar_reglas,
+    ))
+    sim._ENFRIAMIENTOS.limpiar()
+
+    motor = sim.crear_motor(ids, semilla)
+    reloj_tick = [ahora]
+
+    def _calcular_tick():
+        reloj_tick[0] += timedelta(seconds=10)
+        lecturas_tick, _ = sim.calcular_tick(motor, reloj_tick[0], 10, registro=RegistroEnfriamientos())
+        motor.filas(lecturas_tick, reloj_tick[0])
+
+    resultados.append(await _medir("calcular_tick", sectores, _calcular_tick, repeticiones))
+    return resultados
+
+
+async def _casos_servicios(sectores: int, repeticiones: int) -> List[dict]:
+    """Funciones que atienden al tablero, sobre la base ya sembrada."""
+    from backend.services import sim
+
+    return [
+        await _medir("reconstruir_estado", sectores, sim.reconstruir_estado, max(3, repeticiones // 4)),
+        await _medir("calcular_kpis", sectores, sim.calcular_kpis, repeticiones, numero=100),
+        await _medir("construir_cuadricula_sectores", sectores, sim.construir_cuadricula_sectores, repeticiones),
+        await _medir("listar_alertas[abierta]", sectores, lambda: sim.listar_alertas("abierta"), repeticiones),
+        await _medir("listar_alertas[atendida]", sectores, lambda: sim.listar_alertas("atendida"), repeticiones),
+    ]
+
+
+async def _caso_tick_completo(sectores: int, ticks: int) -> dict:
+    """
+    `_bucle_simulacion` real con reloj virtual y un escritor que confirma
+    tick por tick con cola de 1: el bucle queda frenado por la escritura, así
+    el intervalo entre ticks es el costo sostenido de un tick (cómputo +
+    INSERT + rollups + post-commit).
+    """
+    from backend.services import sim
+    from backend.services.escritor import EscritorDiferido
+    from backend.services.reloj import RelojVirtual
+
+    class _RelojCronometrado(RelojVirtual):
+        def __init__(self, inicio: datetime, total: int):
+            super().__init__(inicio)
+            self.marcas: List[float] = []
+            self.total = total
+            self.listo = asyncio.Event()
+
+        async def dormir(self, segundos: float) -> None:
+            self.marcas.append(time.perf_counter())
+            if len(self.marcas) > self.total:
+                self.listo.set()
+                await asyncio.Event().wait()  # se queda aquí hasta que lo cancelen
+            self.avanzar(segundos)
+
+    calentamiento = 2  # el primer intervalo incluye sembrar sectores y crear el motor
+    reloj = _RelojCronometrado(datetime.now(timezone.utc), ticks + calentamiento)
+    sim._ESCRITOR = EscritorDiferido(capacidad=1, max_filas=1)
+    sim._ESCRITOR.iniciar(sim._tras_escritura, sim._tras_descarte)
+    tarea = asyncio.create_task(sim._bucle_simulacion(reloj))
+    await reloj.listo.wait()
+    tarea.cancel()
+    try:
+        await tarea
+    except asyncio.CancelledError:
+        pass
+    await sim._ESCRITOR.detener()
+
+    marcas = reloj.marcas[calentamiento:]
+    muestras = [b - a for a, b in zip(marcas, marcas[1:])]
+    fila = dict(caso="tick_completo", sectores=sectores, repeticiones=len(muestras), numero=1)
+    fila.update(_estadisticas(muestras))
+    print(f"[bench] {'tick_completo':<32} N={sectores:<6} mediana {fila['mediana_ms']:.4f} ms · p95 {fila['p95_ms']:.4f} ms", flush=True)
+    return fila
+
+
+async def _correr_tamano(args: argparse.Namespace) -> dict:
+    """Subproceso: siembra su base (ya apuntada por SAPAL_DB_PATH) y corre todos los casos."""
+    from sqlalchemy import func
+    from sqlmodel import select
+
+    from backend.db import cerrar_db, init_db
+    from backend.models import Alert, Reading
+    from backend.services import backfill, sim
+
+    await init_db()
+    try:
+        ids = await sim.asegurar_sectores_semilla()
+        inicio = time.perf_counter()
+        hasta = datetime.now(timezone.utc)
+        await backfill.generar_historial(
+            hasta - timedelta(hours=args.horas), hasta,
+            intervalo_segundos=args.intervalo, semilla=args.semilla,
+        )
+        siembra_s = time.perf_counter() - inicio
+        async with sim.contexto_lectura() as sesion:
+            lecturas = (await sesion.execute(select(func.count()).select_from(Reading))).scalar_one()
+            alertas = (await sesion.execute(select(func.count()).select_from(Alert))).scalar_one()
+        print(f"[bench] base N={args.sectores}: {lecturas} lecturas, {alertas} alertas en {siembra_s:.1f} s", flush=True)
+
+        resultados = await _casos_simulacion(args.sectores, ids, args.repeticiones, args.semilla)
+        await sim.reconstruir_estado()
+        resultados += await _casos_servicios(args.sectores, args.repeticiones)
+        resultados.append(await _caso_tick_completo(args.sectores, args.ticks))
+    finally:
+        await cerrar_db()
+    return dict(
+        base=dict(sectores=args.sectores, lecturas=lecturas, alertas=alertas, siembra_s=round(siembra_s, 2)),
+        resultados=resultados,
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# Orquestación
+# ─────────────────────────────────────────────────────────────
+def _commit_actual() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        sucio = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=RAIZ, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+    return f"{commit}-sucio" if sucio else commit
+
+
+def _entorno() -> dict:
+    import numpy
+    import sqlalchemy
+
+    return dict(
+        python=platform.python_version(),
+        plataforma=platform.platform(),
+        procesador=platform.processor() or platform.machine(),
+        cpus=os.cpu_count(),
+        numpy=numpy.__version__,
+        sqlalchemy=sqlalchemy.__version__,
+    )
+
+
+def correr(args: argparse.Namespace) -> Path:
+    """Un subproceso por tamaño (cada uno con su base y su catálogo) y un JSON con todo."""
+    informe = dict(
+        version=VERSION_FORMATO,
+        fecha=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        commit=_commit_actual(),
+        entorno=_entorno(),
+        parametros=dict(
+            sectores=args.sectores, horas=args.horas, intervalo=args.intervalo,
+            repeticiones=args.repeticiones, ticks=args.ticks, semilla=args.semilla,
+        ),
+        bases=[],
+        resultados=[],
+    )
+    with tempfile.TemporaryDirectory(prefix="sapal-bench-") as temporal:
+        carpeta = Path(temporal)
+        for n in args.sectores:
+            catalogo = carpeta / f"sectores-{n}.csv"
+            salida = carpeta / f"resultado-{n}.json"
+            subprocess.run(
+                [sys.executable, "-m", "backend.services.catalogo", "--generar", str(n),
+                 "--semilla", str(args.semilla), "--salida", str(catalogo)],
+                cwd=RAIZ, check=True,
+            )
+            entorno = dict(
+                os.environ,
+                SAPAL_DB_PATH=str(carpeta / f"bench-{n}.db"),
+                SAPAL_CATALOGO_SECTORES=str(catalogo),
+                SAPAL_ARCHIVO_DIR=str(carpeta / "archivo"),
+                SAPAL_RETENCION_DIAS="0",
+            )
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.micro", "_tamano", "--sectores", str(n),
+                 "--horas", str(args.horas), "--intervalo", str(args.intervalo),
+                 "--repeticiones", str(args.repeticiones), "--ticks", str(args.ticks),
+                 "--semilla", str(args.semilla), "--salida", str(salida)],
+                cwd=RAIZ, env=entorno, check=True,
+            )
+            parcial = json.loads(salida.read_text(encoding="utf-8"))
+            informe["bases"].append(parcial["base"])
+            informe["resultados"] += parcial["resultados"]
+
+    destino = args.salida or DIR_RESULTADOS / f"{datetime.now():%Y%m%d-%H%M%S}-{informe['commit']}.json"
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    destino.write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding="utf-8")
+    _imprimir_curvas(informe)
+    print(f"[bench] resultados en {destino}")
+    return destino
+
+
+def _imprimir_curvas(informe: dict) -> None:
+    """Mediana (ms) de cada caso por número de sectores: la curva de escala."""
+    tamanos = sorted({fila["sectores"] for fila in informe["resultados"]})
+    curvas: Dict[str, Dict[int, float]] = {}
+    for fila in informe["resultados"]:
+        curvas.setdefault(fila["caso"], {})[fila["sectores"]] = fila["mediana_ms"]
+    print(f"\n{'caso (mediana ms)':<32}" + "".join(f"{n:>14}" for n in tamanos))
+    for caso, puntos in curvas.items():
+        print(f"{caso:<32}" + "".join(f"{puntos[n]:>14.4f}" if n in puntos else f"{'-':>14}" for n in tamanos))
+
+
+def comparar(base: Path, nuevo: Path, tolerancia: float) -> int:
+    """Compara medianas caso por caso; devuelve cuántos empeoraron más que la tolerancia."""
+    anterior = json.loads(base.read_text(encoding="utf-8"))
+    actual = json.loads(nuevo.read_text(encoding="utf-8"))
+    referencia = {(f["caso"], f["sectores"]): f for f in anterior["resultados"]}
+    print(f"base {anterior['commit']} ({anterior['fecha']}) → nuevo {actual['commit']} ({actual['fecha']})")
+    print(f"{'caso':<32}{'N':>8}{'base ms':>14}{'nuevo ms':>14}{'razón':>9}")
+    regresiones = 0
+    for fila in actual["resultados"]:
+        previa = referencia.get((fila["caso"], fila["sectores"]))
+        if previa is None:
+            print(f"{fila['caso']:<32}{fila['sectores']:>8}{'-':>14}{fila['mediana_ms']:>14.4f}{'nuevo':>9}")
+            continue
+        razon = fila["mediana_ms"] / previa["mediana_ms"] if previa["mediana_ms"] else float("inf")
+        marca = ""
+        if razon > 1 + tolerancia:
+            regresiones += 1
+            marca = "  ← regresión"
+        print(f"{fila['caso']:<32}{fila['sectores']:>8}{previa['mediana_ms']:>14.4f}{fila['mediana_ms']:>14.4f}{razon:>8.2f}x{marca}")
+    print(f"{regresiones} regresiones (tolerancia {tolerancia:.0%})")
+    return regresiones
+
+
+# ─────────────────────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────────────────────
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de simulación, reglas y almacenamiento.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    def _comunes(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--horas", type=float, default=24, help="historia sembrada por base (horas virtuales)")
+        p.add_argument("--intervalo", type=int, default=300, help="segundos virtuales por tick al sembrar")
+        p.add_argument("--repeticiones", type=int, default=20, help="muestras por caso")
+        p.add_argument("--ticks", type=int, default=10, help="ticks medidos del bucle completo")
+        p.add_argument("--semilla", type=int, default=42)
+
+    p_correr = sub.add_parser("correr", help="siembra una base por tamaño y corre todos los casos")
+    p_correr.add_argument("--sectores", type=int, nargs="+", default=[100, 1000, 5000])
+    p_correr.add_argument("--salida", type=Path, default=None, help="JSON de resultados (por defecto benchmarks/resultados/)")
+    _comunes(p_correr)
+
+    p_comparar = sub.add_parser("comparar", help="compara dos corridas; código 1 si hay regresiones")
+    p_comparar.add_argument("base", type=Path)
+    p_comparar.add_argument("nuevo", type=Path)
+    p_comparar.add_argument("--tolerancia", type=float, default=0.25, help="empeoramiento admitido de la mediana (0.25 = 25%%)")
+
+    p_tamano = sub.add_parser("_tamano")  # interno: un tamaño, en su propio proceso
+    p_tamano.add_argument("--sectores", type=int, required=True)
+    p_tamano.add_argument("--salida", type=Path, required=True)
+    _comunes(p_tamano)
+
+    args = parser.parse_args(argv)
+    if args.comando == "correr":
+        correr(args)
+    elif args.comando == "comparar":
+        sys.exit(1 if comparar(args.base, args.nuevo, args.tolerancia) else 0)
+    else:
+        resultado = asyncio.run(_correr_tamano(args))
+        args.salida.write_text(json.dumps(resultado), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,10 @@ import { Card } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { Button } from "@/components/ui/button";
 import { AlertTriangle, TrendingUp, Droplets, Clock } from "lucide-react";
-import type { AlertsResponse, AlertItem } from "@/lib/api";
-import { usePoll } from "@/hooks/use-poll";
+import type { AlertItem } from "@/lib/api";
+import { useTablero, quitarAlertaLocal, restaurarAlertaLocal } from "@/hooks/use-tablero";
 import { ackAlert } from "@/lib/api";
-import { useEffect, useMemo, useState } from "react";
+import { useMemo, useState } from "react";
 
 const iconFor = (tipo?: string) => {
   if (tipo === "no_facturable") return Droplets;
@@ -16,16 +16,10 @@ const iconFor = (tipo?: string) => {
 };
 
 export function AlertsPanel() {
-  const { data, refetch, setData } = usePoll<AlertsResponse>("/sim/alerts?estado=abierta", 10_000);
-  const serverItems = data?.items ?? [];
-  const [items, setItems] = useState<AlertItem[]>(serverItems);
+  // alertas abiertas vía WebSocket (snapshot + deltas con nuevas/atendidas)
+  const { alertas: items } = useTablero();
   const [working, setWorking] = useState<number | null>(null);
 
-  // sincroniza cuando el servidor trae una nueva foto
-  useEffect(() => {
-    setItems(serverItems);
-  }, [serverItems]);
-
   const sorted = useMemo(
     () =>
       [...items].sort((a, b) => {
@@ -44,18 +38,12 @@ export function AlertsPanel() {
   async function onAck(a: AlertItem) {
     try {
       setWorking(a.id);
-      // optimista: quita de UI ya
-      setItems((prev) => prev.filter((x) => x.id !== a.id));
-      // también actualiza el snapshot del hook para que no “reviva” antes del próximo poll
-      setData((prev) => (prev ? { ...prev, items: prev.items.filter((x) => x.id !== a.id) } : prev));
-      // call
+      // optimista: quita de UI ya; el delta del ACK llega por el WebSocket
+      quitarAlertaLocal(a.id);
       await ackAlert(a.id, "2131", "Atendida desde UI");
-      // resíncora desde el servidor por si hubo carreras
-      await refetch();
     } catch {
       // si falló, vuelve a insertarla
-      setItems((prev) => [...prev, a]);
-      await refetch();
+      restaurarAlertaLocal(a);
     } finally {
       setWorking(null);
     }
@@ -2,12 +2,11 @@
 "use client";
 import { Card } from "@/components/ui/card";
 import { Activity, Clock, AlertTriangle, TrendingUp, TrendingDown } from "lucide-react";
-import type { KPIResponse } from "@/lib/api";
-import { usePoll } from "@/hooks/use-poll";
+import { useTablero } from "@/hooks/use-tablero";
 import { Sparkline } from "@/components/sparkline";
 
 export function DashboardHeader() {
-  const { data: kpis } = usePoll<KPIResponse>("/sim/kpis/current", 10_000);
+  const { kpis } = useTablero();
   if (!kpis) return null;
 
   const fmtPct = (x: number) => `${(x * 100).toFixed(1)}%`;
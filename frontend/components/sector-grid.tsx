@@ -4,15 +4,14 @@ import { useState, useMemo } from "react";
 import { Badge } from "@/components/ui/badge";
 import { SectorDetail } from "@/components/sector-detail";
 import { TrendingUp, TrendingDown, Minus } from "lucide-react";
-import type { SectorsResponse, SectorItem } from "@/lib/api";
-import { usePoll } from "@/hooks/use-poll";
+import type { SectorItem } from "@/lib/api";
+import { useTablero } from "@/hooks/use-tablero";
 import { AnimatedCard } from "@/components/ui/animated-card";
 
 type VisualLevel = "normal" | "warning" | "critical";
 
 export function SectorGrid() {
-  const { data } = usePoll<SectorsResponse>("/sim/sectors", 10_000);
-  const sectors = data?.items ?? [];
+  const { sectores: sectors } = useTablero();
   const [selected, setSelected] = useState<SectorItem | null>(null);
 
   const mapped = useMemo(() => {
@@ -74,6 +73,7 @@ export function SectorGrid() {
                 <div className="flex items-start justify-between">
                   <div>
                     <p className="font-heading font-semibold text-sm tracking-tight">{sector.nombre}</p>
+                    {sector.zona && <p className="text-xs text-muted-foreground">{sector.zona}</p>}
                     <div className="mt-1">{statusChip(sector.level)}</div>
                   </div>
                   {getTrendIcon(sector.trend)}
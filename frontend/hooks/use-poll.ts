@@ -6,6 +6,7 @@ import { API } from "@/lib/api";
 export function usePoll<T>(path: string, intervalMs = 10_000) {
   const [data, setData] = useState<T | null>(null);
   const ctrlRef = useRef<AbortController | null>(null);
+  const etagRef = useRef<string | null>(null);
 
   const refetch = useCallback(async () => {
     try {
@@ -14,8 +15,12 @@ export function usePoll<T>(path: string, intervalMs = 10_000) {
       ctrlRef.current = ctrl;
 
       const url = path.startsWith("http") ? path : `${API}${path}`;
-      const res = await fetch(url, { cache: "no-store", signal: ctrl.signal });
+      // revalidación por ETag: 304 = sin cambios desde el último tick/ACK
+      const headers: HeadersInit = etagRef.current ? { "If-None-Match": etagRef.current } : {};
+      const res = await fetch(url, { cache: "no-store", headers, signal: ctrl.signal });
+      if (res.status === 304) return;
       if (!res.ok) throw new Error(`${res.status} ${res.statusText}`);
+      etagRef.current = res.headers.get("ETag");
       const json = (await res.json()) as T;
       setData(json);
     } catch {
@@ -23,6 +28,10 @@ export function usePoll<T>(path: string, intervalMs = 10_000) {
     }
   }, [path]);
 
+  useEffect(() => {
+    etagRef.current = null;
+  }, [path]);
+
   useEffect(() => {
     refetch();
     const id = setInterval(refetch, intervalMs);
@@ -0,0 +1,147 @@
+// hooks/use-tablero.ts
+"use client";
+import { useSyncExternalStore } from "react";
+import { API } from "@/lib/api";
+import type { AlertItem, KPIResponse, SectorItem } from "@/lib/api";
+
+// Estado del tablero alimentado por /sim/ws (snapshot + deltas versionados).
+// Una sola conexión por pestaña, compartida por todos los componentes.
+export type Tablero = {
+  kpis: KPIResponse | null;
+  sectores: SectorItem[];
+  alertas: AlertItem[];
+  conectado: boolean;
+};
+
+type Snapshot = {
+  type: "snapshot";
+  epoca: string;
+  version: number;
+  payload: { kpis: KPIResponse; sectores: SectorItem[]; alertas: AlertItem[] };
+};
+type Delta = {
+  type: "delta";
+  epoca: string;
+  version: number;
+  base: number;
+  payload: {
+    ts: string;
+    sectores: SectorItem[];
+    sectores_retirados: number[];
+    alertas_nuevas: AlertItem[];
+    alertas_atendidas: number[];
+    kpis: KPIResponse;
+  };
+};
+
+let estado: Tablero = { kpis: null, sectores: [], alertas: [], conectado: false };
+let version: number | null = null;
+let epoca: string | null = null;
+let socket: WebSocket | null = null;
+let reintento: ReturnType<typeof setTimeout> | null = null;
+let espera = 1_000;
+const oyentes = new Set<() => void>();
+
+function emitir(parcial: Partial<Tablero>) {
+  estado = { ...estado, ...parcial };
+  oyentes.forEach((f) => f());
+}
+
+function aplicar(msg: Snapshot | Delta) {
+  if (msg.type === "snapshot") {
+    epoca = msg.epoca;
+    version = msg.version;
+    emitir({ kpis: msg.payload.kpis, sectores: msg.payload.sectores, alertas: msg.payload.alertas });
+    return;
+  }
+  // ya aplicado (los deltas son idempotentes, pero no hace falta re-renderizar)
+  if (msg.epoca === epoca && version !== null && msg.version <= version) return;
+
+  const { sectores, sectores_retirados, alertas_nuevas, alertas_atendidas, kpis } = msg.payload;
+  const cambios = new Map(sectores.map((s) => [s.id, s]));
+  const retirados = new Set(sectores_retirados);
+  const conocidos = new Set(estado.sectores.map((s) => s.id));
+  const nuevosSectores = [
+    ...estado.sectores.filter((s) => !retirados.has(s.id)).map((s) => cambios.get(s.id) ?? s),
+    ...sectores.filter((s) => !conocidos.has(s.id)),
+  ].sort((a, b) => a.id - b.id);
+
+  const atendidas = new Set(alertas_atendidas);
+  const nuevas = new Set(alertas_nuevas.map((a) => a.id));
+  const alertas = [
+    ...alertas_nuevas,
+    ...estado.alertas.filter((a) => !atendidas.has(a.id) && !nuevas.has(a.id)),
+  ];
+
+  epoca = msg.epoca;
+  version = msg.version;
+  emitir({ kpis, sectores: nuevosSectores, alertas });
+}
+
+function urlSocket() {
+  const base = API || window.location.origin;
+  const url = new URL(`${base.replace(/^http/, "ws")}/sim/ws`);
+  if (version !== null && epoca !== null) {
+    url.searchParams.set("desde", String(version));
+    url.searchParams.set("epoca", epoca);
+  }
+  return url.toString();
+}
+
+function conectar() {
+  if (socket || typeof window === "undefined") return;
+  const ws = new WebSocket(urlSocket());
+  socket = ws;
+  ws.onopen = () => {
+    espera = 1_000;
+    emitir({ conectado: true });
+  };
+  ws.onmessage = (ev) => {
+    try {
+      const msg = JSON.parse(ev.data);
+      if (msg.type === "snapshot" || msg.type === "delta") aplicar(msg);
+    } catch {
+      /* ignore */
+    }
+  };
+  ws.onclose = () => {
+    socket = null;
+    emitir({ conectado: false });
+    if (oyentes.size === 0) return;
+    // reconexión con backoff; al volver se reanuda desde `version`
+    reintento = setTimeout(() => {
+      reintento = null;
+      conectar();
+    }, espera);
+    espera = Math.min(espera * 2, 30_000);
+  };
+}
+
+function suscribir(oyente: () => void) {
+  oyentes.add(oyente);
+  conectar();
+  return () => {
+    oyentes.delete(oyente);
+    if (oyentes.size === 0) {
+      if (reintento) clearTimeout(reintento);
+      reintento = null;
+      socket?.close();
+    }
+  };
+}
+
+const leer = () => estado;
+
+export function useTablero(): Tablero {
+  return useSyncExternalStore(suscribir, leer, leer);
+}
+
+// Quita una alerta localmente (ACK optimista); el delta del servidor lo confirma.
+export function quitarAlertaLocal(id: number) {
+  emitir({ alertas: estado.alertas.filter((a) => a.id !== id) });
+}
+
+export function restaurarAlertaLocal(a: AlertItem) {
+  if (estado.alertas.some((x) => x.id === a.id)) return;
+  emitir({ alertas: [a, ...estado.alertas] });
+}
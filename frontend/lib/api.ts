@@ -13,6 +13,7 @@ export type KPIResponse = {
 export type SectorItem = {
   id: number;
   nombre: string;
+  zona?: string | null;
   estado: "normal" | "alerta" | "critico";
   eficiencia: number;
   presion_psi: number;
@@ -34,7 +35,7 @@ export type AlertItem = {
   estado: "abierta" | "atendida" | "escalada";
   explicacion: Record<string, unknown> | null;
 };
-export type AlertsResponse = { items: AlertItem[] };
+export type AlertsResponse = { items: AlertItem[]; siguiente_cursor?: string | null };
 
 export async function apiGet<T>(path: string, init?: RequestInit): Promise<T> {
   const res = await fetch(path.startsWith("http") ? path : `${API}${path}`, {
@@ -0,0 +1,44 @@
+# tests/conftest.py
+"""
+Configuración común: la base y los archivos de estado de las pruebas van a un
+directorio temporal (nunca a backend/app.db). Se fija antes de importar
+`backend`, que lee SAPAL_DB_PATH al cargarse.
+"""
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_DIRECTORIO = Path(tempfile.mkdtemp(prefix="sapal-pruebas-"))
+os.environ.setdefault("SAPAL_DB_PATH", str(_DIRECTORIO / "app.db"))
+os.environ.setdefault("SAPAL_ARCHIVO_DIR", str(_DIRECTORIO / "archivo"))
+os.environ.setdefault("SAPAL_ENFRIAMIENTOS_PATH", str(_DIRECTORIO / "enfriamientos.json"))
+os.environ.setdefault("SAPAL_ESTADO_MOTOR_PATH", str(_DIRECTORIO / "motor.npz"))
+
+
+@pytest.fixture
+def en_base():
+    """
+    Corre `escenario()` (corrutina) sobre un esquema migrado y vacío, en su
+    propio event loop, y cierra los pools al terminar.
+    """
+    from sqlmodel import SQLModel
+
+    from backend.db import ASYNC_ENGINE, cerrar_db, init_db
+
+    def correr(escenario):
+        async def _completo():
+            await init_db()
+            async with ASYNC_ENGINE.begin() as conn:
+                for tabla in reversed(SQLModel.metadata.sorted_tables):
+                    await conn.execute(tabla.delete())
+            try:
+                return await escenario()
+            finally:
+                await cerrar_db()
+
+        return asyncio.run(_completo())
+
+    return correr
@@ -0,0 +1,103 @@
+# tests/test_alertas.py
+"""Listado de alertas por cursor (ts, id) y ACK masivo."""
+import asyncio
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import select
+
+from backend.db import SessionLocal
+from backend.models import ActionLog, Alert, Sector
+from backend.routers import sim as rutas_sim
+from backend.services import sim
+
+T0 = datetime(2026, 10, 15, 12, 0)
+
+
+async def _sembrar(alertas):
+    """Dos sectores y las alertas dadas como (sector_id, ts, estado); devuelve sus ids en orden."""
+    async with SessionLocal() as sesion:
+        async with sesion.begin():
+            sesion.add_all([Sector(id=1, nombre="Sector 1"), Sector(id=2, nombre="Sector 2")])
+            await sesion.flush()
+            filas = [
+                Alert(sector_id=sector_id, ts=ts, nivel="alta", tipo="no_facturable", mensaje="m", estado=estado)
+                for sector_id, ts, estado in alertas
+            ]
+            sesion.add_all(filas)
+            await sesion.flush()
+            return [a.id for a in filas]
+
+
+async def _recorrer(limite: int, **filtros):
+    ids, cursor, paginas = [], None, 0
+    while True:
+        pagina = await sim.pagina_alertas(cursor=cursor, limite=limite, **filtros)
+        ids.extend(item["id"] for item in pagina["items"])
+        paginas += 1
+        cursor = pagina["siguiente_cursor"]
+        if cursor is None:
+            return ids, paginas
+
+
+def test_cursor_con_marcas_iguales_no_repite_ni_salta(en_base):
+    async def escenario():
+        ids = await _sembrar([(1, T0, "abierta")] * 5 + [(1, T0 + timedelta(minutes=1), "abierta")])
+        return ids, await _recorrer(2, estado="todas")
+
+    ids, (recorridos, paginas) = en_base(escenario)
+    assert recorridos == [ids[5]] + sorted(ids[:5], reverse=True)  # ts desc, y a igual ts, id desc
+    assert paginas == 3
+
+
+def test_cursor_respeta_los_filtros(en_base):
+    async def escenario():
+        sembradas = [(1 + i % 2, T0 + timedelta(minutes=i), "abierta" if i % 3 else "atendida") for i in range(12)]
+        ids = await _sembrar(sembradas)
+        recorridos, _ = await _recorrer(2, estado="abierta", sector_id=2, desde=T0 + timedelta(minutes=2))
+        esperados = [
+            ids[i] for i in reversed(range(12))
+            if sembradas[i][0] == 2 and sembradas[i][2] == "abierta" and i >= 2
+        ]
+        return recorridos, esperados
+
+    recorridos, esperados = en_base(escenario)
+    assert recorridos == esperados and len(esperados) == 3
+
+
+@pytest.mark.parametrize("cursor", [
+    "no-es-un-cursor!",
+    base64.urlsafe_b64encode(b"sin-separador").decode(),
+    base64.urlsafe_b64encode(b"2026-10-15T12:00:00|abc").decode(),
+    base64.urlsafe_b64encode(b"ayer|12").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe|1").decode(),
+])
+def test_cursor_invalido_responde_400(cursor):
+    with pytest.raises(ValueError):
+        sim.decodificar_cursor(cursor)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(rutas_sim.obtener_alertas(request=None, cursor=cursor))
+    assert error.value.status_code == 400
+
+
+def test_ack_masivo_solo_cambia_las_abiertas(en_base):
+    async def escenario():
+        abierta_1, atendida, abierta_2 = await _sembrar([
+            (1, T0, "abierta"), (1, T0, "atendida"), (2, T0, "abierta"),
+        ])
+        cambiadas = await sim.atender_alertas(
+            [abierta_1, atendida, 999_999, abierta_2, abierta_1], "operador@sapal.mx", nota="lote",
+        )
+        repetidas = await sim.atender_alertas([abierta_1, abierta_2], "operador@sapal.mx")
+        async with SessionLocal() as sesion:
+            estados = dict((await sesion.execute(select(Alert.id, Alert.atendida_por))).all())
+            bitacora = (await sesion.execute(select(ActionLog.alert_id, ActionLog.nota))).all()
+        return (abierta_1, atendida, abierta_2), cambiadas, repetidas, estados, bitacora
+
+    (abierta_1, atendida, abierta_2), cambiadas, repetidas, estados, bitacora = en_base(escenario)
+    assert sorted(cambiadas) == sorted([abierta_1, abierta_2])
+    assert repetidas == []
+    assert estados[atendida] is None  # ya estaba atendida: no se reescribe quién la atendió
+    assert sorted(bitacora) == sorted([(abierta_1, "lote"), (abierta_2, "lote")])
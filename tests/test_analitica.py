@@ -0,0 +1,66 @@
+# tests/test_analitica.py
+"""Analítica sobre el archivo Parquet: límites de rango con y sin zona, y agregado por cubeta."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.models import Reading
+from backend.services import analitica, retencion
+
+DIA = datetime(2026, 10, 14)  # sin zona: así se archivan las marcas (UTC)
+CST = timezone(timedelta(hours=-6))
+
+
+def _archivar(tmp_path):
+    columnas = [c.name for c in Reading.__table__.columns]
+    filas = []
+    for i, (sector_id, hora) in enumerate([(1, 1), (1, 1), (2, 1), (1, 5), (1, 30)]):
+        lectura = dict(
+            id=i + 1, sector_id=sector_id, ts=DIA + timedelta(hours=hora),
+            inyeccion_m3=120.0, consumo_m3=100.0 + i, presion_psi=40.0 + i, eficiencia=1.2,
+        )
+        filas.append(tuple(lectura[c] for c in columnas))
+    retencion._archivar("reading", filas, tmp_path)
+
+
+def test_desde_sin_zona_y_sin_hasta(tmp_path):
+    resultado = asyncio.run(analitica.historial_agregado(desde=datetime.now() - timedelta(days=2), directorio=tmp_path))
+    assert resultado["desde"].tzinfo is not None and resultado["hasta"].tzinfo is not None
+    assert resultado["items"] == []
+
+
+def test_limites_mezclados_con_y_sin_zona(tmp_path):
+    _archivar(tmp_path)
+    # 2026-10-13 18:00 en CST = 2026-10-14 00:00 UTC; `hasta` sin zona = UTC
+    resultado = asyncio.run(analitica.historial_agregado(
+        desde=datetime(2026, 10, 13, 18, 0, tzinfo=CST), hasta=DIA + timedelta(hours=6),
+        cubeta="1h", directorio=tmp_path,
+    ))
+    assert resultado["desde"] == datetime(2026, 10, 14, tzinfo=timezone.utc)
+    assert [(item["ts"], item["conteo"]) for item in resultado["items"]] == [
+        (DIA + timedelta(hours=1), 3), (DIA + timedelta(hours=5), 1),
+    ]
+    assert resultado["lecturas"] == 4
+
+
+def test_agregado_por_sector(tmp_path):
+    _archivar(tmp_path)
+    resultado = asyncio.run(analitica.historial_agregado(
+        desde=DIA, hasta=DIA + timedelta(days=2), cubeta="1d", sector_ids=[1], por_sector=True, directorio=tmp_path,
+    ))
+    assert [(item["ts"], item["sector_id"], item["conteo"]) for item in resultado["items"]] == [
+        (DIA, 1, 3), (DIA + timedelta(days=1), 1, 1),
+    ]
+    assert resultado["items"][0]["perdida_m3"] == pytest.approx(3 * 120.0 - (100 + 101 + 103))
+
+
+@pytest.mark.parametrize("kwargs", [
+    dict(desde=DIA + timedelta(hours=1), hasta=DIA),
+    dict(desde=datetime(2026, 10, 14, 0, 0, tzinfo=CST), hasta=DIA + timedelta(hours=6)),  # 06:00 UTC
+    dict(desde=DIA - timedelta(days=400), hasta=DIA, cubeta="15m"),
+    dict(cubeta="2h"),
+])
+def test_rangos_invalidos(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        asyncio.run(analitica.historial_agregado(directorio=tmp_path, **kwargs))
@@ -0,0 +1,41 @@
+# tests/test_backfill.py
+"""Backfill: lotes acotados por filas y bitácora ligada a la alerta correcta."""
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import select
+
+from backend.db import SessionLocal
+from backend.models import ActionLog, Alert
+from backend.services import backfill
+
+HASTA = datetime(2026, 10, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def test_lotes_por_filas_y_ack_de_cada_alerta(en_base, monkeypatch):
+    lotes = []
+    insertar = backfill._insertar_lote
+
+    async def registrar(lecturas, alertas):
+        lotes.append(len(lecturas))
+        await insertar(lecturas, alertas)
+
+    monkeypatch.setattr(backfill, "_insertar_lote", registrar)
+
+    async def escenario():
+        resumen = await backfill.generar_historial(
+            HASTA - timedelta(hours=6), HASTA, intervalo_segundos=60,
+            atender_tras_min=30, filas_por_lote=1000, semilla=3,
+        )
+        async with SessionLocal() as sesion:
+            atendidas = dict((await sesion.execute(
+                select(Alert.id, Alert.atendida_en).where(Alert.estado == "atendida")
+            )).all())
+            bitacora = dict((await sesion.execute(select(ActionLog.alert_id, ActionLog.ts))).all())
+        return resumen, atendidas, bitacora
+
+    resumen, atendidas, bitacora = en_base(escenario)
+    sectores = resumen["sectores"]
+    assert max(lotes) <= max(1000, sectores) and sum(lotes) == resumen["lecturas"]
+    assert len(lotes) > 1
+    assert atendidas, "la semilla debería generar alertas atendidas"
+    assert bitacora == atendidas  # cada ACK apunta a su alerta, con su instante
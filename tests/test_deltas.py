@@ -0,0 +1,100 @@
+# tests/test_deltas.py
+"""Diario de deltas del tablero: reanudar desde versión/época o caer a instantánea."""
+import asyncio
+import json
+
+from backend.services import sim
+from backend.services.deltas import DiarioDeltas
+
+INSTANTANEA = json.dumps({"type": "snapshot"})
+
+
+def _versiones(tramas) -> list:
+    return [json.loads(trama)["version"] for trama in tramas]
+
+
+def test_pendientes_segun_el_anillo():
+    diario = DiarioDeltas(capacidad=3)
+    for n in range(5):
+        diario.publicar({"n": n})
+    assert _versiones(diario.pendientes(2)) == [3, 4, 5]  # el anillo guarda 3..5
+    assert _versiones(diario.pendientes(4)) == [5]
+    assert diario.pendientes(5) == []
+    assert diario.pendientes(1) is None  # faltaría la 2: ya salió del anillo
+    assert diario.pendientes(9) is None  # versión de otro proceso
+    assert diario.metricas()["reanudable_desde"] == 2
+
+    assert diario.reanudable(2, diario.epoca)
+    assert not diario.reanudable(2, "otra-epoca")
+    assert not diario.reanudable(None, diario.epoca)
+    assert not diario.reanudable(1, diario.epoca)
+
+    delta = json.loads(diario.pendientes(4)[0])
+    assert (delta["epoca"], delta["version"], delta["base"], delta["payload"]) == (diario.epoca, 5, 4, {"n": 4})
+
+
+def test_invalidar_corta_la_continuidad():
+    diario = DiarioDeltas()
+    diario.publicar({"n": 0})
+    diario.invalidar()
+    assert diario.version == 2 and diario.pendientes(1) is None
+    assert not diario.reanudable(1, diario.epoca)
+
+
+def _suscripcion(monkeypatch, diario: DiarioDeltas, desde, epoca):
+    monkeypatch.setattr(sim, "_DELTAS", diario)
+
+    async def instantanea():
+        return INSTANTANEA
+
+    monkeypatch.setattr(sim, "instantanea_tablero", instantanea)
+    return sim.suscribirse_tablero(desde, epoca, espera=0.01)
+
+
+def test_reanuda_y_cae_a_instantanea_si_se_atrasa_mas_que_el_anillo(monkeypatch):
+    diario = DiarioDeltas(capacidad=2)
+
+    async def escenario():
+        for n in range(3):
+            diario.publicar({"n": n})
+        flujo = _suscripcion(monkeypatch, diario, 2, diario.epoca)
+        recibidos = [await flujo.__anext__()]  # sólo lo que le faltaba: la 3
+        recibidos.append(await flujo.__anext__())  # sin cambios: latido
+        for n in range(3):  # 4..6; el anillo ya no tiene la 4
+            diario.publicar({"n": n})
+        recibidos.append(await flujo.__anext__())
+        diario.publicar({"n": 9})
+        recibidos.append(await flujo.__anext__())  # tras la instantánea sigue con deltas
+        clientes = diario.clientes
+        await flujo.aclose()
+        return recibidos, clientes
+
+    recibidos, clientes = asyncio.run(escenario())
+    assert _versiones(recibidos[:1]) == [3] and recibidos[1] is None
+    assert recibidos[2] == INSTANTANEA and _versiones(recibidos[3:]) == [7]
+    assert clientes == 1 and diario.clientes == 0
+
+
+def test_otra_epoca_o_version_vieja_recibe_instantanea(monkeypatch):
+    diario = DiarioDeltas(capacidad=2)
+
+    async def primera(desde, epoca):
+        flujo = _suscripcion(monkeypatch, diario, desde, epoca)
+        try:
+            return await flujo.__anext__()
+        finally:
+            await flujo.aclose()
+
+    async def escenario():
+        for n in range(4):
+            diario.publicar({"n": n})
+        return [
+            await primera(3, "otra-epoca"),
+            await primera(1, diario.epoca),
+            await primera(None, None),
+            await primera(3, diario.epoca),
+        ]
+
+    recibidos = asyncio.run(escenario())
+    assert recibidos[:3] == [INSTANTANEA] * 3
+    assert _versiones(recibidos[3:]) == [4]
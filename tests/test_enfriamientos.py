@@ -0,0 +1,92 @@
+# tests/test_enfriamientos.py
+"""Registro de enfriamientos: vencimiento, tope con desalojo y instantáneas."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.services.enfriamientos import RegistroEnfriamientos
+
+T0 = datetime(2026, 10, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def _min(m: float) -> datetime:
+    return T0 + timedelta(minutes=m)
+
+
+def test_vence_al_cumplirse_el_enfriamiento():
+    registro = RegistroEnfriamientos()
+    assert registro.puede_emitir(1, "fuga", T0, 15)
+    assert not registro.puede_emitir(1, "fuga", _min(14.9), 15)
+    assert registro.puede_emitir(2, "fuga", _min(1), 15)  # otra clave, independiente
+    assert registro.puede_emitir(1, "fuga", _min(15), 15)
+    assert registro.expiradas == 1 and len(registro) == 2
+
+
+def test_tope_desaloja_la_que_vence_primero():
+    registro = RegistroEnfriamientos(max_entradas=2)
+    registro.puede_emitir(1, "fuga", T0, 30)
+    registro.puede_emitir(2, "fuga", T0, 10)  # vence primero
+    registro.puede_emitir(3, "fuga", T0, 20)
+    assert len(registro) == 2 and registro.desalojadas == 1
+    assert registro.puede_emitir(2, "fuga", _min(1), 10)  # desalojada: vuelve a emitir
+    assert not registro.puede_emitir(1, "fuga", _min(1), 30)
+
+
+def test_clave_renovada_no_deja_entrada_vieja_en_el_monticulo():
+    registro = RegistroEnfriamientos(max_entradas=2)
+    registro.puede_emitir(1, "fuga", T0, 5)
+    registro.puede_emitir(1, "fuga", _min(6), 60)  # venció y se renueva hasta el minuto 66
+    registro.puede_emitir(2, "fuga", _min(6), 10)
+    assert len(registro._monticulo) == len(registro) == 2
+    # lleno: el desalojo toma la de menor vencimiento vigente (2), no la entrada vieja de 1
+    registro.puede_emitir(3, "fuga", _min(7), 30)
+    assert not registro.puede_emitir(1, "fuga", _min(8), 60)
+    assert registro.puede_emitir(2, "fuga", _min(8), 10)
+
+
+def test_instantanea_ida_y_vuelta(tmp_path):
+    ruta = tmp_path / "enfriamientos.json"
+    origen = RegistroEnfriamientos()
+    origen.puede_emitir(1, "fuga", T0, 5)
+    origen.puede_emitir(2, "sobrepresion", T0, 30)
+    origen.puede_emitir(3, "fuga", T0, 60)
+    asyncio.run(origen.guardar(ruta))
+    assert origen.instantaneas == 1 and not ruta.with_suffix(".json.tmp").exists()
+
+    destino = RegistroEnfriamientos(max_entradas=1)
+    assert destino.cargar(_min(10), ruta) == 1  # la de 5 min venció; con tope 1 queda la más tardía
+    assert not destino.puede_emitir(3, "fuga", _min(11), 60)
+    assert destino.puede_emitir(2, "sobrepresion", _min(11), 30)
+
+    restaurado = RegistroEnfriamientos()
+    assert restaurado.cargar(_min(10), ruta) == 2
+    assert not restaurado.puede_emitir(2, "sobrepresion", _min(29), 30)
+    assert restaurado.puede_emitir(2, "sobrepresion", _min(30), 30)
+
+
+@pytest.mark.parametrize("contenido", [
+    '[[1, "fuga", 1e12]]',                                            # lista en vez de objeto
+    '{"version": 1}',                                                 # sin entradas
+    '{"version": 1, "entradas": [[1, "fuga"]]}',                      # entrada de 2 campos
+    '{"version": 1, "entradas": [[1, "fuga", null]]}',                # vencimiento nulo
+    '{"version": 1, "entradas": [[1, "fuga", "mañana"]]}',            # vencimiento no numérico
+    '{"version": 1, "entradas": [["uno", "fuga", 1e12]]}',            # sector no numérico
+    '{"version": 1, "entradas": 7}',
+])
+def test_instantanea_corrupta_empieza_vacio(tmp_path, contenido):
+    ruta = tmp_path / "enfriamientos.json"
+    ruta.write_text(contenido, encoding="utf-8")
+    registro = RegistroEnfriamientos()
+    registro.puede_emitir(1, "fuga", T0, 15)
+    assert registro.cargar(T0, ruta) == 0 and len(registro) == 0
+    assert registro.puede_emitir(1, "fuga", T0, 15)
+
+
+def test_instantanea_ilegible_empieza_vacio(tmp_path):
+    ruta = tmp_path / "enfriamientos.json"
+    ruta.write_text("{no es json", encoding="utf-8")
+    registro = RegistroEnfriamientos()
+    registro.puede_emitir(1, "fuga", T0, 15)
+    assert registro.cargar(T0, ruta) == 0 and len(registro) == 0
+    assert registro.cargar(T0, tmp_path / "no_existe.json") == 0
@@ -0,0 +1,118 @@
+# tests/test_escritor.py
+"""EscritorDiferido sin base: lotes por filas y por espera, reintentos, descarte y drenado al detener."""
+import asyncio
+from types import SimpleNamespace
+
+from backend.services.escritor import EscritorDiferido
+
+
+def _escritor(fallas: int = 0, **kwargs) -> tuple:
+    """Escritor cuya transacción falla las primeras `fallas` veces; devuelve (escritor, lotes confirmados, descartados)."""
+    escritor = EscritorDiferido(**kwargs)
+    intentos = []
+    confirmados = []
+    descartados = []
+
+    async def transaccion(filas, alertas):
+        intentos.append(len(filas))
+        if len(intentos) <= fallas:
+            raise RuntimeError("database is locked")
+        for alerta in alertas:
+            alerta.id = len(intentos)
+
+    async def al_confirmar(lote):
+        confirmados.append([tick.instante for tick in lote])
+
+    escritor._transaccion = transaccion
+    escritor.iniciar(al_confirmar, lambda lote: descartados.append([tick.instante for tick in lote]))
+    return escritor, confirmados, descartados
+
+
+async def _encolar(escritor: EscritorDiferido, instantes, filas_por_tick: int = 4, alertas=None) -> None:
+    for instante in instantes:
+        await escritor.encolar(instante, [{}] * filas_por_tick, alertas or [], 1.0)
+
+
+def test_lote_por_filas_y_drenado_al_detener():
+    async def escenario():
+        escritor, confirmados, _ = _escritor(max_filas=10, max_espera=60)
+        await _encolar(escritor, range(5))
+        await escritor.detener()  # no espera los 60 s: escribe lo pendiente y termina
+        return escritor.metricas(), confirmados
+
+    metricas, confirmados = asyncio.run(escenario())
+    assert confirmados == [[0, 1, 2], [3, 4]]  # el primero corta al pasar de 10 filas
+    assert metricas["lotes"] == 2 and metricas["filas_escritas"] == 20
+    assert not metricas["corriendo"] and metricas["profundidad_cola"] == 0 and metricas["retraso_pendiente_s"] == 0.0
+
+
+def test_lote_por_espera_sin_mas_ticks():
+    async def escenario():
+        escritor, confirmados, _ = _escritor(max_filas=1000, max_espera=0.01)
+        await _encolar(escritor, [0])
+        await asyncio.sleep(0.2)
+        antes_de_detener = list(confirmados)
+        await escritor.detener()
+        return antes_de_detener
+
+    assert asyncio.run(escenario()) == [[0]]
+
+
+def test_reintenta_con_espera_creciente_y_luego_confirma(monkeypatch):
+    esperas = []
+    dormir = asyncio.sleep
+
+    async def registrar(segundos, *args):
+        if segundos:
+            esperas.append(segundos)
+        await dormir(0)
+
+    async def escenario():
+        escritor, confirmados, descartados = _escritor(fallas=2, reintentos=3, espera_reintento=0.5)
+        alerta = SimpleNamespace(id=None)
+        await _encolar(escritor, [0], alertas=[alerta])
+        monkeypatch.setattr(asyncio, "sleep", registrar)
+        await escritor.detener()
+        return escritor.metricas(), confirmados, descartados, alerta
+
+    metricas, confirmados, descartados, alerta = asyncio.run(escenario())
+    assert esperas == [0.5, 1.0]
+    assert confirmados == [[0]] and descartados == []
+    assert metricas["reintentos"] == 2 and metricas["lotes"] == 1 and alerta.id == 3
+
+
+def test_descarta_tras_agotar_reintentos_y_sigue():
+    async def escenario():
+        escritor, confirmados, descartados = _escritor(
+            fallas=3, max_filas=8, max_espera=60, reintentos=2, espera_reintento=0.001,
+        )
+        alerta = SimpleNamespace(id=None)
+        await _encolar(escritor, [0, 1], alertas=[alerta])
+        await asyncio.sleep(0.1)  # el primer lote agota sus 3 intentos
+        alerta_fallida = alerta.id
+        await _encolar(escritor, [2])
+        await escritor.detener()
+        return escritor.metricas(), confirmados, descartados, alerta_fallida
+
+    metricas, confirmados, descartados, alerta_fallida = asyncio.run(escenario())
+    assert descartados == [[0, 1]] and confirmados == [[2]]
+    assert alerta_fallida is None  # la transacción se deshizo: sin id
+    assert metricas["lotes_descartados"] == 1 and metricas["ticks_descartados"] == 2
+    assert metricas["reintentos"] == 2 and metricas["ticks_escritos"] == 1
+    assert metricas["retraso_pendiente_s"] == 0.0
+
+
+def test_descarte_que_falla_no_detiene_al_escritor():
+    async def escenario():
+        escritor, confirmados, _ = _escritor(fallas=1, max_filas=4, reintentos=0)
+
+        def descartar_roto(lote):
+            raise ValueError("callback roto")
+
+        escritor._al_descartar = descartar_roto
+        await _encolar(escritor, [0, 1])
+        await escritor.detener()
+        return escritor.metricas(), confirmados
+
+    metricas, confirmados = asyncio.run(escenario())
+    assert confirmados == [[1]] and metricas["lotes_descartados"] == 1
@@ -0,0 +1,78 @@
+# tests/test_eventos.py
+"""Difusión SSE: buzón acotado por cliente (drop-oldest, ticks coalescidos) y tope de suscriptores."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend.routers import sim as rutas_sim
+from backend.services import sim
+from backend.services.eventos import DifusorEventos, Suscriptor, trama_sse
+
+
+def _alerta(n: int) -> dict:
+    return {"type": "alert", "payload": {"id": n}}
+
+
+def _tick(n: int) -> dict:
+    return {"type": "tick", "payload": {"ts": n}}
+
+
+def test_buzon_descarta_la_alerta_mas_vieja_y_coalesce_ticks():
+    suscriptor = Suscriptor(capacidad=2)
+    for n in range(3):
+        suscriptor.publicar("alert", trama_sse(_alerta(n)))
+        suscriptor.publicar("tick", trama_sse(_tick(n)))
+    assert suscriptor.descartados == 1 and suscriptor.coalescidos == 2
+
+    async def leer():
+        return [await suscriptor.siguiente(0.01) for _ in range(4)]
+
+    # primero las alertas que quedaron, luego sólo el tick más reciente; después, latido
+    assert asyncio.run(leer()) == [trama_sse(_alerta(1)), trama_sse(_alerta(2)), trama_sse(_tick(2)), None]
+
+
+def test_siguiente_despierta_al_publicar():
+    suscriptor = Suscriptor()
+
+    async def escenario():
+        espera = asyncio.create_task(suscriptor.siguiente(5))
+        await asyncio.sleep(0.01)
+        suscriptor.publicar("tick", trama_sse(_tick(1)))
+        return await asyncio.wait_for(espera, 1)
+
+    assert asyncio.run(escenario()) == trama_sse(_tick(1))
+
+
+def test_metricas_conservan_lo_de_clientes_cerrados():
+    difusor = DifusorEventos()
+    difusor.publicar(_tick(0))  # sin suscriptores no cuenta
+    with difusor.suscripcion(capacidad=1) as lento:
+        with difusor.suscripcion(capacidad=1):
+            for n in range(3):
+                difusor.publicar(_alerta(n))
+                difusor.publicar(_tick(n))
+        assert len(difusor) == 1
+    assert lento.descartados == 2
+    metricas = difusor.metricas()
+    assert metricas["suscriptores"] == 0 and metricas["conexiones_totales"] == 2
+    assert metricas["eventos_publicados"] == 6
+    assert metricas["eventos_descartados"] == 4 and metricas["ticks_coalescidos"] == 4
+
+
+def test_tope_de_suscriptores():
+    difusor = DifusorEventos(max_suscriptores=2)
+    with difusor.suscripcion(), difusor.suscripcion():
+        assert not difusor.admite() and not difusor.admite()
+    assert difusor.admite()
+    assert difusor.metricas()["rechazados"] == 2
+
+
+def test_ruta_sse_responde_503_al_tope(monkeypatch):
+    difusor = DifusorEventos(max_suscriptores=1)
+    monkeypatch.setattr(sim, "_EVENTOS", difusor)
+    with difusor.suscripcion():
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(rutas_sim.flujo_eventos(None))
+    assert error.value.status_code == 503
+    assert difusor.metricas()["rechazados"] == 1
@@ -0,0 +1,45 @@
+# tests/test_historial.py
+"""Historial por sector desde los rollups: normalización de `desde`/`hasta` a UTC."""
+from datetime import datetime, timedelta, timezone
+
+from backend.db import SessionLocal
+from backend.services import rollups, sim
+
+
+def _lectura(ts: datetime) -> dict:
+    return dict(sector_id=1, ts=ts, inyeccion_m3=120.0, consumo_m3=110.0, presion_psi=40.0, eficiencia=120 / 110)
+
+
+async def _sembrar(*marcas: datetime):
+    async with SessionLocal() as sesion:
+        async with sesion.begin():
+            await rollups.actualizar_rollups(sesion, [_lectura(ts) for ts in marcas])
+
+
+def test_desde_sin_zona_con_hasta_por_defecto(en_base):
+    hace_una_hora = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=1)
+
+    async def escenario():
+        await _sembrar(hace_una_hora)
+        return await sim.historial_sector(1, desde=hace_una_hora - timedelta(hours=1))
+
+    resultado = en_base(escenario)
+    assert resultado["resolucion"] == "minuto"
+    assert [p["ts"] for p in resultado["items"]] == [rollups.truncar(hace_una_hora, "minuto").replace(tzinfo=timezone.utc)]
+    assert resultado["desde"].tzinfo is not None and resultado["hasta"].tzinfo is not None
+
+
+def test_desde_hasta_con_otra_zona_se_convierten_a_utc(en_base):
+    menos_tres = timezone(timedelta(hours=-3))
+
+    async def escenario():
+        await _sembrar(datetime(2026, 10, 15, 10, 0), datetime(2026, 10, 15, 14, 0))  # UTC sin zona
+        return await sim.historial_sector(
+            1,
+            desde=datetime(2026, 10, 15, 8, 0, tzinfo=menos_tres),   # 11:00 UTC
+            hasta=datetime(2026, 10, 15, 12, 0, tzinfo=menos_tres),  # 15:00 UTC
+        )
+
+    resultado = en_base(escenario)
+    assert [p["ts"] for p in resultado["items"]] == [datetime(2026, 10, 15, 14, 0, tzinfo=timezone.utc)]
+    assert resultado["desde"] == datetime(2026, 10, 15, 11, 0, tzinfo=timezone.utc)
@@ -0,0 +1,90 @@
+# tests/test_liderazgo.py
+"""Coordinador: un solo líder por candado, canal líder ↔ seguidores, relevo y corte de seguidores lentos."""
+import asyncio
+import sys
+
+import pytest
+
+from backend.services import liderazgo
+from backend.services.liderazgo import Coordinador
+
+pytestmark = pytest.mark.skipif(liderazgo.fcntl is None or sys.platform == "win32", reason="requiere flock y sockets Unix")
+
+
+async def _nada():
+    return None
+
+
+async def _hasta(condicion, limite: float = 2.0) -> None:
+    fin = asyncio.get_running_loop().time() + limite
+    while not condicion():
+        assert asyncio.get_running_loop().time() < fin, "la condición no se cumplió a tiempo"
+        await asyncio.sleep(0.01)
+
+
+def _coordinador(tmp_path, recibidos: list, liderazgos: list) -> Coordinador:
+    async def al_recibir(mensaje):
+        recibidos.append(mensaje)
+
+    async def al_ser_lider():
+        liderazgos.append(True)
+
+    return Coordinador(tmp_path / "sim.lock", tmp_path / "sim.sock", al_ser_lider, al_recibir, _nada)
+
+
+def test_un_lider_canal_y_relevo(tmp_path, monkeypatch):
+    monkeypatch.setattr(liderazgo, "REINTENTO_SEGUNDOS", 0.02)
+    del_lider, del_seguidor = [], []
+    liderazgos_lider, liderazgos_seguidor = [], []
+
+    async def escenario():
+        lider = _coordinador(tmp_path, del_lider, liderazgos_lider)
+        seguidor = _coordinador(tmp_path, del_seguidor, liderazgos_seguidor)
+        await lider.iniciar()
+        await seguidor.iniciar()
+        try:
+            assert lider.es_lider and not seguidor.es_lider
+            await _hasta(lambda: lider.metricas()["seguidores"] == 1)
+
+            assert seguidor.enviar_al_lider({"type": "ack", "id": 1})
+            await _hasta(lambda: del_lider)
+            lider.difundir({"type": "tick", "n": 1})
+            await _hasta(lambda: del_seguidor)
+
+            await lider.detener()  # el candado se libera: el seguidor toma el relevo
+            await _hasta(lambda: seguidor.es_lider)
+            return seguidor.fue_seguidor, seguidor.enviar_al_lider({"type": "ack", "id": 2})
+        finally:
+            await seguidor.detener()
+            await lider.detener()
+
+    fue_seguidor, enviado = asyncio.run(escenario())
+    assert del_lider == [{"type": "ack", "id": 1}] and del_seguidor == [{"type": "tick", "n": 1}]
+    assert liderazgos_lider == [True] and liderazgos_seguidor == [True]
+    assert fue_seguidor and not enviado  # ya es líder: no hay a quién mandar
+
+
+def test_seguidor_lento_se_desconecta_al_pasar_el_buffer(tmp_path, monkeypatch):
+    monkeypatch.setattr(liderazgo, "MAX_BUFFER_SEGUIDOR", 64 * 1024)
+
+    async def escenario():
+        lider = _coordinador(tmp_path, [], [])
+        await lider.iniciar()
+        try:
+            # un seguidor que nunca lee: el buffer del kernel se llena y luego el del transporte
+            _, escritor = await asyncio.open_unix_connection(str(lider.ruta_socket))
+            await _hasta(lambda: lider.metricas()["seguidores"] == 1)
+            mensaje = {"type": "tick", "relleno": "x" * 32 * 1024}
+            for _ in range(1000):
+                lider.difundir(mensaje)
+                if not lider.metricas()["seguidores"]:
+                    break
+            metricas = lider.metricas()
+            escritor.close()
+            return metricas
+        finally:
+            await lider.detener()
+
+    metricas = asyncio.run(escenario())
+    assert metricas["seguidores"] == 0 and metricas["desconectados_por_lentitud"] == 1
+    assert metricas["mensajes_enviados"] < 1000
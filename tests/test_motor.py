@@ -0,0 +1,164 @@
+# tests/test_motor.py
+"""MotorVectorial frente a la ruta escalar de referencia (simular_lectura + evaluar_reglas_alertas)."""
+import asyncio
+import random
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from backend.models import Reading
+from backend.services import enfriamientos, sim
+from backend.services.enfriamientos import RegistroEnfriamientos
+
+SECTORES = list(range(1, 51))
+TICKS = 300
+INTERVALO = 60
+PROB_INCIDENTE = 0.05  # más alta que en vivo para que las alertas de incidente cuenten
+INICIO = datetime(2026, 10, 15, 6, 0, tzinfo=timezone.utc)
+VARIABLES = ("inyeccion_m3", "consumo_m3", "presion_psi")
+
+
+def _ruta_escalar(monkeypatch) -> tuple:
+    random.seed(1234)
+    monkeypatch.setattr(sim, "_PERFILES", sim._crear_perfiles(SECTORES))
+    monkeypatch.setattr(sim, "_INCIDENTES", {})
+    monkeypatch.setattr(sim, "_ENFRIAMIENTOS", RegistroEnfriamientos())
+    estado = sim.EstadoSimulacion(SECTORES)
+    procesos = {
+        sid: (
+            sim.ProcesoAR1(0.7, 5.0, 120.0),
+            sim.ProcesoAR1(0.7, 5.0, 110.0),
+            sim.ProcesoAR1(0.6, 1.5, sim._PERFILES[sid]["pressure_nom"]),
+        )
+        for sid in SECTORES
+    }
+    valores = {v: [] for v in VARIABLES}
+    alertas = Counter()
+    for k in range(TICKS):
+        instante = INICIO + timedelta(seconds=k * INTERVALO)
+        for sid in SECTORES:
+            incidente = sim._INCIDENTES.get(sid)
+            if incidente and incidente["hasta"] <= instante:
+                del sim._INCIDENTES[sid]
+            if sid not in sim._INCIDENTES and random.random() < PROB_INCIDENTE:
+                sim._levanta_incidente(sid, instante, INTERVALO)
+            lectura = sim.simular_lectura(sid, instante, *procesos[sid])
+            for v in VARIABLES:
+                valores[v].append(lectura[v])
+            for alerta in sim.evaluar_reglas_alertas(
+                Reading(**lectura),
+                estado.medias_moviles_eficiencia[sid],
+                estado.medias_moviles_presion[sid],
+                estado.conteos_histeresis,
+            ):
+                alertas[alerta.tipo] += 1
+    return {v: np.asarray(x) for v, x in valores.items()}, alertas
+
+
+def _ruta_vectorial(monkeypatch) -> tuple:
+    monkeypatch.setattr(sim, "INCIDENT_PROB", PROB_INCIDENTE)
+    motor = sim.crear_motor(SECTORES, semilla=1234)
+    registro = RegistroEnfriamientos()
+    valores = {v: [] for v in VARIABLES}
+    alertas = Counter()
+    for k in range(TICKS):
+        instante = INICIO + timedelta(seconds=k * INTERVALO)
+        lecturas, emitidas = sim.calcular_tick(motor, instante, INTERVALO, registro)
+        for v in VARIABLES:
+            valores[v].append(lecturas[v].copy())
+        alertas.update(a.tipo for a in emitidas)
+    return {v: np.concatenate(x) for v, x in valores.items()}, alertas
+
+
+def test_motor_equivale_en_distribucion_a_la_ruta_escalar(monkeypatch):
+    escalar, alertas_escalar = _ruta_escalar(monkeypatch)
+    vectorial, alertas_vectorial = _ruta_vectorial(monkeypatch)
+
+    for v in VARIABLES:
+        assert vectorial[v].mean() == pytest.approx(escalar[v].mean(), rel=0.02), v
+        # los incidentes engordan las colas: la varianza es más ruidosa que la media
+        assert vectorial[v].var() == pytest.approx(escalar[v].var(), rel=0.25), v
+
+    lecturas = len(SECTORES) * TICKS
+    for regla in sim.REGLAS_ALERTA:
+        tasa_escalar = alertas_escalar[regla.tipo] / lecturas
+        tasa_vectorial = alertas_vectorial[regla.tipo] / lecturas
+        assert tasa_vectorial == pytest.approx(tasa_escalar, rel=0.35, abs=0.002), regla.tipo
+    assert sum(alertas_escalar.values()) > 0 and sum(alertas_vectorial.values()) > 0
+
+
+def test_estado_ida_y_vuelta_sigue_la_misma_trayectoria(tmp_path):
+    ruta = tmp_path / "motor.npz"
+    original = sim.crear_motor(SECTORES, semilla=7)
+    for k in range(20):
+        sim.calcular_tick(original, INICIO + timedelta(seconds=k * INTERVALO), INTERVALO, RegistroEnfriamientos())
+    original.guardar(ruta)
+    assert not ruta.with_suffix(".npz.tmp").exists()
+
+    # otra semilla y un sector nuevo: los que estaban retoman su estado y el generador
+    restaurado = sim.crear_motor(SECTORES + [999], semilla=99)
+    assert restaurado.cargar(ruta) == len(SECTORES)
+    for campo, valor in original.exportar_estado().items():
+        if campo not in ("ids", "rng", "version", "pos_tendencia"):
+            np.testing.assert_array_equal(restaurado.exportar_estado()[campo][:len(SECTORES)], valor, err_msg=campo)
+
+    gemelo = sim.crear_motor(SECTORES, semilla=99)
+    assert gemelo.cargar(ruta) == len(SECTORES)
+    for k in range(20, 40):
+        instante = INICIO + timedelta(seconds=k * INTERVALO)
+        esperadas, _ = sim.calcular_tick(original, instante, INTERVALO, RegistroEnfriamientos())
+        obtenidas, _ = sim.calcular_tick(gemelo, instante, INTERVALO, RegistroEnfriamientos())
+        for v in VARIABLES:
+            np.testing.assert_array_equal(obtenidas[v], esperadas[v])
+
+
+def test_cancelar_durante_el_punto_de_control_espera_el_volcado(tmp_path, monkeypatch):
+    ruta = tmp_path / "motor.npz"
+    monkeypatch.setattr(sim, "RUTA_ESTADO_MOTOR", ruta)
+    monkeypatch.setattr(sim, "_ENFRIAMIENTOS", RegistroEnfriamientos())
+    monkeypatch.setattr(sim._ENFRIAMIENTOS, "guardar", lambda: asyncio.sleep(0))
+    motor = sim.crear_motor(SECTORES, semilla=7)
+    monkeypatch.setattr(sim, "_MOTOR", motor)
+    escribiendo = threading.Event()
+    soltar = threading.Event()
+    guardar = motor.guardar
+
+    def guardar_lento(destino):
+        escribiendo.set()
+        soltar.wait(5)
+        guardar(destino)
+
+    monkeypatch.setattr(motor, "guardar", guardar_lento)
+
+    async def escenario():
+        tarea = asyncio.create_task(sim._guardar_punto_de_control())
+        await asyncio.to_thread(escribiendo.wait, 5)
+        tarea.cancel()
+        await asyncio.sleep(0.05)
+        assert not tarea.done()  # sigue esperando al hilo que escribe el .tmp
+        soltar.set()
+        try:
+            await tarea
+        except asyncio.CancelledError:
+            pass
+        return tarea.cancelled()
+
+    assert asyncio.run(escenario())
+    assert ruta.exists() and not ruta.with_suffix(".npz.tmp").exists()
+
+
+def test_punto_de_control_corrupto_arranca_en_frio(tmp_path, monkeypatch):
+    ruta_motor = tmp_path / "motor.npz"
+    ruta_motor.write_bytes(b"no es un npz")
+    monkeypatch.setattr(sim, "RUTA_ESTADO_MOTOR", ruta_motor)
+    monkeypatch.setattr(sim, "_ENFRIAMIENTOS", RegistroEnfriamientos())
+    enfriamientos.RUTA_INSTANTANEA.write_text('{"version": 1, "entradas": [[1, "fuga"]]}', encoding="utf-8")
+    try:
+        motor = sim.crear_motor(SECTORES, semilla=7)
+        asyncio.run(sim._restaurar_punto_de_control(motor, INICIO))
+    finally:
+        enfriamientos.RUTA_INSTANTANEA.unlink()
+    assert len(sim._ENFRIAMIENTOS) == 0
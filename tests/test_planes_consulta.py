@@ -0,0 +1,142 @@
+# tests/test_planes_consulta.py
+"""
+Regresión de planes de consulta: corre EXPLAIN QUERY PLAN sobre cada consulta
+construida por los servicios (`_consulta_*`, y las escrituras `_sentencia_*`)
+contra un esquema recién migrado y falla si alguna recorre completa una tabla
+caliente: SCAN a secas o recorriendo un índice entero (`SCAN t USING ... INDEX`).
+
+Agregar una consulta nueva con esos prefijos la incluye aquí; si recibe
+argumentos obligatorios, hay que darle valores en PARAMETROS.
+"""
+import inspect
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import sqlite
+from sqlmodel import SQLModel
+
+from backend.migraciones import MIGRACIONES, aplicar_migraciones, version_actual
+from backend.services import alertas_abiertas, backfill, kpis, retencion, rollups, sim
+
+MODULOS = (sim, kpis, rollups, backfill, alertas_abiertas, retencion)
+
+# Tablas que crecen con el tiempo; `sector` es un catálogo y se lee completo.
+TABLAS_CALIENTES = {
+    "reading", "alert", "actionlog",
+    "reading_rollup_minuto", "reading_rollup_hora", "reading_rollup_dia",
+}
+
+AHORA = datetime(2025, 11, 7, 12, 0, tzinfo=timezone.utc)
+PREFIJOS = ("_consulta_", "_sentencia_")
+ESCANEO = re.compile(r"SCAN (\w+)\b")  # "SCAN t" y "SCAN t USING [COVERING] INDEX i"; no "SCAN (subquery-N)"
+PARAMETROS = {
+    "_consulta_alertas": [
+        dict(estado="abierta"),
+        dict(estado="atendida"),
+        dict(estado="todas", despues_de=(AHORA, 10_000)),
+        dict(estado="abierta", sector_id=233, despues_de=(AHORA, 10_000)),
+        dict(estado="todas", sector_id=233, tipo="sobrepresion", nivel="alta"),
+        dict(estado="atendida", desde=AHORA - timedelta(days=90), hasta=AHORA, despues_de=(AHORA, 10_000)),
+    ],
+    "_consulta_alerta": [dict(id_alerta=1)],
+    "_consulta_atenciones_desde": [dict(desde=AHORA - timedelta(hours=24))],
+    "_consulta_vencidas": [
+        dict(tabla=tabla, corte=AHORA - timedelta(days=30)) for tabla in retencion.TABLAS
+    ],
+    "_consulta_rollups_vencidos": [
+        dict(resolucion=r, corte=AHORA - timedelta(days=rollups.HORIZONTE_DIAS[r]))
+        for r in ("minuto", "hora")
+    ],
+    "_sentencia_atender": [dict(ids=[1, 2, 3], correo_usuario="operador@sapal.mx", ahora=AHORA)],
+    "_consulta_historial": [
+        dict(resolucion=r, sector_id=233, desde=AHORA - timedelta(days=7), hasta=AHORA)
+        for r in rollups.RESOLUCIONES
+    ],
+}
+
+
+def _consultas():
+    for modulo in MODULOS:
+        for nombre, funcion in inspect.getmembers(modulo, inspect.isfunction):
+            if not nombre.startswith(PREFIJOS) or funcion.__module__ != modulo.__name__:
+                continue
+            for i, kwargs in enumerate(PARAMETROS.get(nombre, [{}])):
+                yield pytest.param(funcion, kwargs, id=f"{modulo.__name__.rsplit('.', 1)[-1]}.{nombre}[{i}]")
+
+
+def _sql_y_parametros(consulta):
+    compilada = consulta.compile(dialect=sqlite.dialect(), compile_kwargs={"render_postcompile": True})
+    parametros = compilada.construct_params()
+    valores = []
+    for clave in compilada.positiontup:
+        valor = parametros[clave]
+        valores.append(str(valor) if isinstance(valor, datetime) else valor)
+    return str(compilada), tuple(valores)
+
+
+@pytest.fixture(scope="module")
+def conexion(tmp_path_factory):
+    ruta = tmp_path_factory.mktemp("planes") / "app.db"
+    motor = create_engine(f"sqlite:///{ruta}")
+    SQLModel.metadata.create_all(motor)
+    with motor.begin() as conn:
+        aplicar_migraciones(conn)
+    with motor.connect() as conn:
+        yield conn
+    motor.dispose()
+
+
+@pytest.mark.parametrize("funcion, kwargs", list(_consultas()))
+def test_sin_escaneo_completo(conexion, funcion, kwargs):
+    sql, valores = _sql_y_parametros(funcion(**kwargs))
+    plan = [fila[3] for fila in conexion.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, valores)]
+    escaneos = [
+        detalle for detalle in plan
+        if (m := ESCANEO.match(detalle)) and m.group(1) in TABLAS_CALIENTES
+    ]
+    assert not escaneos, f"escaneo completo en {escaneos}\nplan: {plan}\nsql: {sql}"
+
+
+def test_hay_consultas_registradas():
+    nombres = {p.id.split("[")[0] for p in _consultas()}
+    assert {
+        "sim._consulta_cuadricula_sectores", "sim._consulta_alertas", "kpis._consulta_tendencia", "sim._sentencia_atender",
+    } <= nombres
+
+
+def test_detecta_escaneos_de_indice_completo():
+    detalles = ("SCAN reading", "SCAN reading USING COVERING INDEX ix_reading_ts", "SCAN alert USING INDEX ix_alert_ts")
+    assert all(ESCANEO.match(d).group(1) in TABLAS_CALIENTES for d in detalles)
+    assert ESCANEO.match("SCAN (subquery-4)") is None
+
+
+def test_migraciones_sobre_base_existente(tmp_path):
+    """Una base con el esquema original (sólo índices simples) queda al día e idempotente."""
+    motor = create_engine(f"sqlite:///{tmp_path / 'previa.db'}")
+    with motor.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE reading (id INTEGER PRIMARY KEY, sector_id INTEGER NOT NULL, ts DATETIME NOT NULL, "
+            "inyeccion_m3 FLOAT NOT NULL, consumo_m3 FLOAT NOT NULL, presion_psi FLOAT NOT NULL, eficiencia FLOAT NOT NULL)"
+        )
+        conn.exec_driver_sql("CREATE INDEX ix_reading_sector_id ON reading (sector_id)")
+        conn.exec_driver_sql(
+            "INSERT INTO reading (sector_id, ts, inyeccion_m3, consumo_m3, presion_psi, eficiencia) VALUES "
+            "(233, '2025-11-07 10:00:05.000000', 120, 110, 40, 1.09), "
+            "(233, '2025-11-07 10:00:15.000000', 118, 112, 41, 1.05)"
+        )
+    SQLModel.metadata.create_all(motor)
+    with motor.begin() as conn:
+        conn.exec_driver_sql("CREATE INDEX ix_alert_abiertas ON alert (sector_id, tipo) WHERE estado = 'abierta'")
+        assert aplicar_migraciones(conn) == MIGRACIONES[-1][0]
+    with motor.begin() as conn:
+        assert aplicar_migraciones(conn) == MIGRACIONES[-1][0]
+        assert version_actual(conn) == MIGRACIONES[-1][0]
+        indices = {fila[1] for fila in conn.exec_driver_sql("PRAGMA index_list('reading')")}
+        assert "ix_reading_sector_ts" in indices
+        assert "ix_reading_sector_id" not in indices
+        assert "ix_alert_abiertas" not in {fila[1] for fila in conn.exec_driver_sql("PRAGMA index_list('alert')")}
+        fila = conn.exec_driver_sql("SELECT conteo, bucket FROM reading_rollup_minuto").one()
+        assert fila == (2, "2025-11-07 10:00:00.000000")
+    motor.dispose()
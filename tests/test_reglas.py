@@ -0,0 +1,76 @@
+# tests/test_reglas.py
+"""Reglas de alerta: gramática de expresiones, histéresis y valores no finitos."""
+import numpy as np
+import pytest
+
+from backend.services.motor import MotorVectorial
+from backend.services.reglas import compilar_expresion, compilar_regla
+
+
+@pytest.mark.parametrize("texto", [
+    "presion_psi(1)",                    # una característica no es una función
+    "abs(presion_psi, consumo_m3)",      # el segundo argumento sería `out=`
+    "maximo(presion_psi)",
+    "minimo(presion_psi, consumo_m3, eficiencia)",
+    "abs(x=presion_psi)",
+    "abs(*presion_psi)",
+    "abs",                               # función sin llamar
+    "np.abs(presion_psi)",
+    "presion_psi.sum()",
+    "__import__('os')",
+    "presion_psi ** 2",
+    "presion_psi > 1",
+    "True + presion_psi",
+    "'a' + presion_psi",
+    "2 + 3",                             # sin características
+    "presion_psi +",
+])
+def test_gramatica_rechaza(texto):
+    with pytest.raises(ValueError):
+        compilar_expresion(texto)
+
+
+def test_gramatica_acepta_funciones_con_su_aridad():
+    valor = compilar_expresion("maximo(abs(presion_psi - 40), minimo(consumo_m3, 2.5))")
+    resultado = valor(dict(presion_psi=np.array([38.0, 45.0]), consumo_m3=np.array([1.0, 9.0])))
+    np.testing.assert_allclose(resultado, [2.0, 5.0])
+
+
+def _motor(*definiciones) -> MotorVectorial:
+    return MotorVectorial([1], prob_incidente=0.0, ticks_incidente=(1, 1), reglas=[compilar_regla(d) for d in definiciones], semilla=0)
+
+
+def _lecturas(inyeccion: float, consumo: float, presion: float) -> dict:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eficiencia = np.float64(inyeccion) / np.float64(consumo)
+    return dict(
+        inyeccion_m3=np.array([inyeccion]), consumo_m3=np.array([consumo]),
+        presion_psi=np.array([presion]), eficiencia=np.array([eficiencia]),
+    )
+
+
+def test_histeresis_sube_y_baja_de_a_uno():
+    motor = _motor(dict(tipo="alta", expresion="presion_psi", comparador=">", umbral=50, ventanas=3))
+    disparos, conteos = [], []
+    for presion in (60, 60, 60, 40, 60, 40, 40, 60):
+        resultado = motor.evaluar(_lecturas(120.0, 110.0, presion))
+        disparos.append(resultado["disparos"]["alta"].size > 0)
+        conteos.append(int(motor.conteos["alta"][0]))
+    assert conteos == [1, 2, 3, 2, 3, 2, 1, 2]
+    assert disparos == [False, False, True, False, True, False, False, False]
+
+
+@pytest.mark.parametrize("comparador", [">", ">=", "<", "<="])
+def test_nan_e_infinito_nunca_disparan(comparador):
+    regla = compilar_regla(dict(tipo="t", expresion="consumo_m3 / inyeccion_m3", comparador=comparador, umbral=0.0))
+    valor = regla.valor(dict(inyeccion_m3=np.array([0.0, 0.0, 0.0]), consumo_m3=np.array([1.0, -1.0, 0.0])))
+    assert np.isinf(valor[:2]).all() and np.isnan(valor[2])
+    assert not regla.cumple(valor).any()
+
+
+def test_nan_no_suma_histeresis():
+    motor = _motor(dict(tipo="t", expresion="consumo_m3 / inyeccion_m3", comparador=">", umbral=0.5, ventanas=2))
+    for inyeccion in (0.0, 0.0, 0.0):
+        resultado = motor.evaluar(_lecturas(inyeccion, 110.0, 40.0))
+    assert resultado["disparos"]["t"].size == 0
+    assert int(motor.conteos["t"][0]) == 0
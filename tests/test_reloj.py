@@ -0,0 +1,69 @@
+# tests/test_reloj.py
+"""ProgramadorFijo con reloj virtual: ritmo sin deriva y política de desborde."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.services.reloj import MAX_RANURAS_ALCANCE, ProgramadorFijo, RelojVirtual
+
+INICIO = datetime(2026, 10, 15, 12, 0, tzinfo=timezone.utc)
+PERIODO = 10.0
+
+
+def _correr(politica: str, duraciones) -> tuple:
+    """Un tick por duración (en periodos); devuelve el programador y (ranura, arranque, retraso) de cada uno."""
+    reloj = RelojVirtual(INICIO)
+    programador = ProgramadorFijo(PERIODO, politica)
+    programador.iniciar(reloj)
+    ticks = []
+
+    async def bucle():
+        for duracion in duraciones:
+            reloj.avanzar(duracion * PERIODO)  # el trabajo del tick
+            retraso = await programador.esperar_siguiente()
+            ticks.append((programador.instante(), reloj.ahora(), retraso))
+
+    asyncio.run(bucle())
+    return programador, ticks
+
+
+def test_sin_deriva_aunque_cada_tick_cueste():
+    programador, ticks = _correr("alcanzar", [0.3, 0.9, 0.05, 0.5] * 5)
+    for k, (instante, arranque, retraso) in enumerate(ticks, start=1):
+        assert instante == arranque == INICIO + timedelta(seconds=k * PERIODO)
+        assert retraso == 0.0
+    assert programador.desbordes == 0 and programador.ranuras_saltadas == 0
+
+
+def test_alcanzar_cuenta_un_desborde_por_tick_lento():
+    programador, ticks = _correr("alcanzar", [3.5, 0.3, 0.3, 0.3, 0.3, 0.3])
+    retrasos = [round(r / PERIODO, 6) for _, _, r in ticks]
+    assert retrasos == [2.5, 1.8, 1.1, 0.4, 0.0, 0.0]  # ráfaga sin esperar hasta ponerse al día
+    assert [t[0] for t in ticks] == [INICIO + timedelta(seconds=k * PERIODO) for k in range(1, 7)]
+    assert programador.desbordes == 1 and programador.ranuras_saltadas == 0
+
+
+def test_alcanzar_un_tick_de_la_rafaga_tambien_lento_cuenta_aparte():
+    programador, _ = _correr("alcanzar", [2.5, 1.5, 0.1, 0.1, 0.1, 0.1])
+    assert programador.desbordes == 2 and programador.ranuras_saltadas == 0
+
+
+def test_alcanzar_con_demasiado_atraso_salta():
+    programador, ticks = _correr("alcanzar", [MAX_RANURAS_ALCANCE + 2.5, 0.1])
+    assert programador.desbordes == 1
+    assert programador.ranuras_saltadas == MAX_RANURAS_ALCANCE + 2
+    assert ticks[0][2] == 0.0 and ticks[0][0] == INICIO + timedelta(seconds=(MAX_RANURAS_ALCANCE + 3) * PERIODO)
+
+
+def test_saltar_descarta_las_ranuras_vencidas():
+    programador, ticks = _correr("saltar", [3.5, 0.3, 0.3])
+    assert [t[0] for t in ticks] == [INICIO + timedelta(seconds=k * PERIODO) for k in (4, 5, 6)]
+    assert [t[2] for t in ticks] == [0.0, 0.0, 0.0]
+    assert programador.desbordes == 1 and programador.ranuras_saltadas == 3
+
+
+@pytest.mark.parametrize("periodo, politica", [(0.05, "alcanzar"), (10.0, "esperar")])
+def test_parametros_invalidos(periodo, politica):
+    with pytest.raises(ValueError):
+        ProgramadorFijo(periodo, politica)
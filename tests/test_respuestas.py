@@ -0,0 +1,57 @@
+# tests/test_respuestas.py
+"""Caché de respuestas: claves canónicas, rutas calientes fijas fuera del LRU y ETag."""
+import asyncio
+import json
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from backend.services import kpis, sim
+from backend.services.respuestas import CacheRespuestas
+
+
+def test_fijas_no_las_expulsa_el_lru():
+    cache = CacheRespuestas(max_variantes=2, fijas=["kpis"])
+    cache.guardar("kpis", "v1", b"k")
+    for i in range(5):
+        cache.guardar(("alertas", i), "v1", b"a")
+    assert cache.obtener("kpis", "v1") == b"k"
+    assert cache.metricas()["variantes"] == 2 and cache.expulsiones == 3
+    cache.invalidar_variantes()
+    assert cache.obtener(("alertas", 4), "v1") is None
+    assert cache.obtener("kpis", "v1") == b"k"
+
+
+def test_clave_del_router_coincide_con_la_precalentada():
+    del_router = sim._clave_respuesta("alertas", dict(
+        estado="abierta", sector_id=None, tipo=None, nivel=None, desde=None, hasta=None, cursor=None, limite=50,
+    ))
+    assert del_router in sim._RUTAS_PRECALENTADAS
+    assert sim._clave_respuesta("alertas", dict(estado="abierta", limite=20)) not in sim._RUTAS_PRECALENTADAS
+
+
+def test_precalentado_sirve_la_peticion_por_defecto(en_base):
+    async def escenario():
+        await sim._precalentar_respuestas([])
+        aciertos = sim._RESPUESTAS.aciertos
+        cuerpo = await sim.respuesta_json(
+            "alertas", estado="abierta", sector_id=None, tipo=None, nivel=None,
+            desde=None, hasta=None, cursor=None, limite=50,
+        )
+        return sim._RESPUESTAS.aciertos - aciertos, cuerpo
+
+    aciertos, cuerpo = en_base(escenario)
+    assert aciertos == 1
+    assert cuerpo.startswith(b'{"items":[]')
+
+
+def test_etag_cambia_cuando_un_ack_sale_de_la_ventana(monkeypatch):
+    monkeypatch.setattr(sim._KPIS, "atenciones", deque())
+    sim._KPIS.registrar_atencion(datetime.now(timezone.utc) - timedelta(hours=1))
+    antes = sim.etag_datos()
+    cuerpo = asyncio.run(sim.respuesta_json("kpis"))
+    assert json.loads(cuerpo)["alertas_atendidas_24h"] == 1
+
+    monkeypatch.setattr(kpis, "VENTANA_ATENCIONES", timedelta(minutes=30))  # el ACK "cumple" la ventana
+    assert sim.etag_datos() != antes
+    cuerpo = asyncio.run(sim.respuesta_json("kpis"))
+    assert json.loads(cuerpo)["alertas_atendidas_24h"] == 0
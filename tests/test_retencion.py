@@ -0,0 +1,77 @@
+# tests/test_retencion.py
+"""Retención: poda de rollups minuto/hora por horizonte en la misma corrida, y auto_vacuum."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from backend.db import ASYNC_ENGINE, SessionLocal, cerrar_db, init_db
+from backend.models import ReadingRollupDia, ReadingRollupHora, ReadingRollupMinuto
+from backend.services import retencion, rollups
+
+AHORA = datetime(2026, 10, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def _lectura(ts: datetime) -> dict:
+    return dict(sector_id=1, ts=ts, inyeccion_m3=120.0, consumo_m3=110.0, presion_psi=40.0, eficiencia=120 / 110)
+
+
+async def _contar(tabla) -> int:
+    async with SessionLocal() as sesion:
+        return (await sesion.execute(select(func.count()).select_from(tabla))).scalar_one()
+
+
+def test_poda_rollups_fuera_de_horizonte(en_base, tmp_path, monkeypatch):
+    monkeypatch.setitem(rollups.HORIZONTE_DIAS, "minuto", 7)
+    monkeypatch.setitem(rollups.HORIZONTE_DIAS, "hora", 90)
+    base = AHORA.replace(tzinfo=None)
+    marcas = [base - timedelta(days=d) for d in (1, 8, 100)]
+
+    async def escenario():
+        async with SessionLocal() as sesion:
+            async with sesion.begin():
+                await rollups.actualizar_rollups(sesion, [_lectura(ts) for ts in marcas])
+        resumen = await retencion.aplicar_retencion(30, ahora=AHORA, directorio=tmp_path, lote=1)
+        return resumen, [await _contar(t) for t in (ReadingRollupMinuto, ReadingRollupHora, ReadingRollupDia)]
+
+    resumen, conteos = en_base(escenario)
+    assert resumen["rollups_podados"] == {"reading_rollup_minuto": 2, "reading_rollup_hora": 1}
+    assert conteos == [1, 2, 3]  # minuto: sólo el de ayer · hora: sin el de hace 100 días · día: intacto
+
+
+def test_resolucion_salta_lo_ya_podado(monkeypatch):
+    monkeypatch.setitem(rollups.HORIZONTE_DIAS, "minuto", 7)
+    desde = AHORA - timedelta(days=10)
+    assert rollups.elegir_resolucion(desde, desde + timedelta(hours=2), ahora=AHORA) == "hora"
+    assert rollups.elegir_resolucion(AHORA - timedelta(hours=2), AHORA, ahora=AHORA) == "minuto"
+
+
+async def _auto_vacuum() -> int:
+    async with ASYNC_ENGINE.connect() as conn:
+        return (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar_one()
+
+
+def test_vacuum_completo_solo_como_paso_explicito(en_base, tmp_path, capsys):
+    async def escenario():
+        nueva = await _auto_vacuum()
+        async with ASYNC_ENGINE.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.exec_driver_sql("PRAGMA auto_vacuum = NONE")
+            await conn.exec_driver_sql("VACUUM")
+        await init_db()  # base existente: el arranque no la convierte
+        return nueva, await _auto_vacuum()
+
+    assert en_base(escenario) == (2, 0)  # la base nueva nació INCREMENTAL sin VACUUM
+    assert "se omite la conversión" in capsys.readouterr().out
+
+    retencion.main(["--vacuum-completo", "--dir", str(tmp_path)])
+
+    async def verificar():
+        try:
+            return await _auto_vacuum()
+        finally:
+            await cerrar_db()
+
+    assert asyncio.run(verificar()) == 2
+    assert "auto_vacuum=INCREMENTAL aplicado" in capsys.readouterr().out